@@ -0,0 +1,106 @@
+import hashlib
+import os
+import posixpath
+import stat as stat_module
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from HashEngine import DEFAULT_HASH_ALGORITHM, _check_cancel, _reusable_buffer, hash_file
+
+
+#====================================================================================
+# Archives as virtual directories. With the walker's archives='members' policy a .zip or .tar(.gz/.bz2/.xz)
+# is not hashed as one file: every regular member is decompressed incrementally and streamed straight into
+# the hasher, through the same reusable per-thread buffers as plain files, with no extraction and no temp
+# files. Members are recorded as <archive rel path>/<member name>, next to the regular files of the tree.
+# Tars are read in stream mode ('r|*'), one sequential pass, so a compressed tar is decompressed once.
+# Nested archives are hashed as plain members.
+ARCHIVE_POLICIES = ('files', 'members')  # files: an archive is a regular file (the original behaviour)
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+MEMBER_READ_SIZE = 1024 * 1024  # decompressed bytes per read, whatever the member's size
+
+
+@dataclass
+class ArchiveHashes:
+    members: List[Tuple[str, os.stat_result, str]] = field(default_factory=list)  # (name, stat, hex digest)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)  # (name, reason), e.g. encrypted members
+    error: Optional[str] = None   # the archive is unreadable, or broke off after `members`
+    digest: Optional[str] = None  # with an error: the archive hashed as one plain file
+
+
+# ====================================================================================
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+def _member_stat(size: int, mtime: float) -> os.stat_result:
+    # just enough of a stat for the manifest, the checkpoint and the hardlink check (one link, read-only)
+    return os.stat_result((stat_module.S_IFREG | 0o444, 0, 0, 1, 0, 0, size, 0, int(mtime), 0),
+                          {"st_mtime_ns": int(mtime * 1_000_000_000)})
+
+
+# '/' separated, relative and normalised: './a/b' from 'tar c .' and 'a/b' from a zip are the same member
+def _member_name(name: str) -> str:
+    return posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+
+
+def _hash_stream(f, algorithm: str, cancel) -> str:
+    hash_object = hashlib.new(algorithm)
+    buffer = _reusable_buffer(MEMBER_READ_SIZE)
+    while n := f.readinto(buffer):
+        _check_cancel(cancel)
+        hash_object.update(buffer[:n])
+    return hash_object.hexdigest()
+
+
+# ====================================================================================
+# Hashes every regular member of an archive, in archive order. If the archive cannot be read as one, or
+# breaks off part way (truncated, corrupt), the members hashed so far are kept and the archive is also
+# hashed as one plain file, so the damage shows up as a failed file instead of aborting the run.
+def hash_members(path: str, algorithm: str = DEFAULT_HASH_ALGORITHM, cancel=None) -> ArchiveHashes:
+    import tarfile, zipfile  # imported lazily: together they pull in bz2, lzma and friends (CLI start-up)
+    result = ArchiveHashes()
+    try:
+        if path.lower().endswith(ZIP_SUFFIXES):
+            _hash_zip(path, algorithm, cancel, result)
+        else:
+            _hash_tar(path, algorithm, cancel, result)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError, ValueError) as e:
+        result.error = str(e) or type(e).__name__
+        result.digest = hash_file(path, cancel=cancel, algorithm=algorithm)
+    return result
+
+
+def _hash_zip(path: str, algorithm: str, cancel, result: ArchiveHashes) -> None:
+    import zipfile
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            _check_cancel(cancel)
+            if info.flag_bits & 0x1:
+                result.skipped.append((info.filename, "encrypted archive member"))
+                continue
+            try:
+                with archive.open(info) as f:
+                    digest = _hash_stream(f, algorithm, cancel)
+            except NotImplementedError as e:  # a compression method zipfile does not support
+                result.skipped.append((info.filename, str(e)))
+                continue
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            result.members.append((_member_name(info.filename), _member_stat(info.file_size, mtime), digest))
+
+
+def _hash_tar(path: str, algorithm: str, cancel, result: ArchiveHashes) -> None:
+    import tarfile
+    with tarfile.open(path, mode="r|*") as archive:
+        for info in archive:
+            _check_cancel(cancel)
+            if not info.isreg():
+                if not info.isdir():
+                    result.skipped.append((info.name, "not a regular archive member"))
+                continue
+            digest = _hash_stream(archive.extractfile(info), algorithm, cancel)
+            result.members.append((_member_name(info.name), _member_stat(info.size, info.mtime), digest))
@@ -0,0 +1,373 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from HashEngine import (SCHEDULER_REORDER_WINDOW, HashEngine, HashingCancelled, _check_cancel, _hash_batch,
+                        check_algorithm)
+from IoScheduler import IoScheduler
+from Model import METADATA_FOLDER
+from PresetIndex import build_preset_index
+
+
+#====================================================================================
+# Batch verification: many folder -> preset jobs in one run, sharing everything that can be shared.
+#   - every preset is loaded and indexed once, before the jobs start
+#   - every file is hashed at most once per run and algorithm: digests are remembered by (device, inode,
+#     size, mtime_ns, algorithm), so overlapping folders and jobs sharing a folder reuse them, and a file
+#     another job is hashing right now is waited for rather than read again
+#   - jobs run concurrently on one IoScheduler (one lane per device, whoever the reads are for), and at most
+#     io_budget files are read at a time across all jobs
+# Each job still writes its own comparison event, with its own counters (see JobHashEngine, JobHashCache);
+# the run also writes one consolidated report with the batch-wide ones.
+BATCH_REPORT_FORMAT = 'hit-batch-report'
+BATCH_REPORT_PREFIX = 'batch_report_'
+DEFAULT_MAX_CONCURRENT_JOBS = 4
+
+
+@dataclass
+class BatchJob:
+    folder: str
+    preset: str
+    name: str = ""
+    max_failures: int = 0
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+
+
+@dataclass
+class BatchSpec:
+    jobs: List[BatchJob]
+    max_concurrent_jobs: int = DEFAULT_MAX_CONCURRENT_JOBS
+    io_budget: Optional[int] = None  # files read at once across all jobs; None: the hash worker count
+    report: Optional[str] = None
+
+
+@dataclass
+class BatchJobResult:
+    name: str
+    folder: str
+    preset: str
+    result: str                          # pass, fail, preset_not_found, folder_not_found, cancelled, error
+    files_checked: int = 0
+    files_failed: int = 0
+    stopped_early: bool = False
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    error: Optional[str] = None
+    duration_seconds: float = 0.0
+
+
+# ====================================================================================
+# Reads a job spec (.json, or .toml on Python 3.11+):
+#   {"max_concurrent_jobs": 4, "io_budget": 8, "report": "nightly.json",
+#    "jobs": [{"folder": "/data/a", "preset": "a"}, {"folder": "/data/b", "preset": "b", "max_failures": 10}]}
+# or in TOML the same keys with one [[jobs]] table per job. Relative folders are relative to the spec file.
+def load_spec(path: str) -> BatchSpec:
+    if path.lower().endswith(".toml"):
+        import tomllib  # imported lazily: only TOML specs need it
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for number, job in enumerate(data.get("jobs") or (), start=1):
+        if not isinstance(job, dict) or not job.get("folder") or not job.get("preset"):
+            raise ValueError(f"Job {number} of {path} needs a 'folder' and a 'preset'")
+        folder = os.path.normpath(os.path.join(base, os.path.expanduser(job["folder"])))
+        jobs.append(BatchJob(folder=folder, preset=str(job["preset"]), name=str(job.get("name") or f"job{number}"),
+                             max_failures=int(job.get("max_failures", 0)),
+                             include=tuple(job.get("include", ())), exclude=tuple(job.get("exclude", ()))))
+    if not jobs:
+        raise ValueError(f"No jobs in {path}")
+    return BatchSpec(jobs=jobs,
+                     max_concurrent_jobs=max(1, int(data.get("max_concurrent_jobs", DEFAULT_MAX_CONCURRENT_JOBS))),
+                     io_budget=int(data["io_budget"]) if data.get("io_budget") else None,
+                     report=data.get("report"))
+
+
+class SharedHashEngine(HashEngine):
+    """HashEngine shared by the jobs of a batch: one IoScheduler, a global read budget and a digest memo."""
+
+    # ====================================================================================
+    def __init__(self, engine: HashEngine, io_budget: Optional[int] = None, cancel=None):
+        super().__init__(workers=engine.workers, executor='thread', strategy=engine.strategy,
+                         algorithm=engine.algorithm, io_scheduler='auto')
+        self.io_budget = max(1, io_budget or engine.workers)
+        self.scheduler = IoScheduler(self.workers)
+        self.cancel = cancel  # the whole run's cancel; a job stopping early must not cancel reads others share
+        self._budget = threading.BoundedSemaphore(self.io_budget)
+        self._lock = threading.Lock()
+        # key -> hex digest, or the Future of a read in progress; kept for the whole run (~200 bytes a file)
+        self._memo: Dict[tuple, object] = {}
+        self.files_hashed = 0
+        self.files_shared = 0  # served from the memo: another job (or path) already had the file
+
+    # ====================================================================================
+    # Same contract as HashEngine.map: (path, digest) in input order. Items are (path, stat) from the walker.
+    # job: the JobHashEngine the call is made for, which keeps that job's share of the counters.
+    def map(self, paths: Iterable, cache=None, cancel=None, algorithm: Optional[str] = None,
+            job: Optional["JobHashEngine"] = None) -> Iterator[Tuple[str, str]]:
+        algorithm = check_algorithm(algorithm or self.algorithm)
+        in_flight = deque()  # (path, stat, key, Future or digest)
+        try:
+            for item in paths:
+                _check_cancel(cancel)
+                path, st = item if isinstance(item, tuple) else (item, os.stat(item))
+                key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, algorithm)
+                in_flight.append((path, st, key, self._digest_or_future(path, st, key, cache, algorithm, job)))
+                while len(in_flight) >= SCHEDULER_REORDER_WINDOW:
+                    yield self._drain_one_shared(in_flight, cache, algorithm)
+            while in_flight:
+                _check_cancel(cancel)
+                yield self._drain_one_shared(in_flight, cache, algorithm)
+        finally:
+            self.device_stats = self.scheduler.snapshot()
+            if cache is not None:
+                cache.flush()
+
+    def _digest_or_future(self, path: str, st: os.stat_result, key: tuple, cache, algorithm: str,
+                          job: Optional["JobHashEngine"]):
+        with self._lock:
+            known = self._memo.get(key)
+            if known is not None:
+                self.files_shared += 1
+                if job is not None:
+                    job.count("files_shared")
+                return known
+            digest = cache.lookup(path, st, algorithm) if cache is not None else None
+            if digest is not None:
+                self._memo[key] = digest
+                return digest
+            lane = self.scheduler.lane_for(path, st)
+            future = lane.submit(self._budgeted, ([path], self.strategy, self.cancel, algorithm, False,
+                                                  lane.profile.read_size), st.st_size, st.st_ino)
+            self._memo[key] = future
+            self.files_hashed += 1
+            if job is not None:
+                job.record_read(lane, st.st_size)
+            return future
+
+    def _budgeted(self, *args) -> list:
+        with self._budget:
+            return _hash_batch(*args)
+
+    def _drain_one_shared(self, in_flight: deque, cache, algorithm: str) -> Tuple[str, str]:
+        path, st, key, result = in_flight.popleft()
+        if isinstance(result, str):
+            return path, result
+        if not result.done():
+            self.scheduler.lane_for(path, st).flush()  # it may still wait in a locality window
+        digest = result.result()[0]
+        with self._lock:
+            if self._memo.get(key) is result:
+                self._memo[key] = digest  # keep the digest, not the future
+                if cache is not None:
+                    cache.store(path, st, digest, algorithm)
+        return path, digest
+
+    def close(self, cancel: bool = False) -> None:
+        self.scheduler.close(cancel)
+
+
+class JobHashEngine:
+    """One job's handle on the SharedHashEngine: the same reads and memo, with the job's own device stats and
+    files_hashed/files_shared counters (in the job's instrumentation) instead of the batch-wide ones."""
+
+    # ====================================================================================
+    def __init__(self, shared: SharedHashEngine, instrumentation=None):
+        self.shared = shared
+        self.instrumentation = instrumentation
+        self._devices: Dict[int, dict] = {}  # st_dev -> reads this job started there
+
+    def __getattr__(self, name):  # workers, executor, algorithm, imap...: the shared engine's
+        return getattr(self.shared, name)
+
+    @property
+    def device_stats(self) -> List[dict]:
+        return [dict(stats) for stats in self._devices.values()]
+
+    def map(self, paths: Iterable, cache=None, cancel=None,
+            algorithm: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        return self.shared.map(paths, cache=cache, cancel=cancel, algorithm=algorithm, job=self)
+
+    # ====================================================================================
+    def count(self, name: str) -> None:
+        if self.instrumentation is not None:
+            self.instrumentation.count(name)
+
+    def record_read(self, lane, size: int) -> None:
+        stats = self._devices.setdefault(lane.device, {"device": lane.device, "kind": lane.kind,
+                                                       "files": 0, "bytes": 0})
+        stats["files"] += 1
+        stats["bytes"] += size
+        self.count("files_hashed")
+
+
+class JobHashCache:
+    """One job's view of the shared HashCache: lookups and stores go through to it, but hits, misses and
+    mismatches are the job's, and resetting them at the start of the job leaves the other jobs' alone."""
+
+    # ====================================================================================
+    def __init__(self, cache):
+        self.cache = cache
+        self.reset_stats()
+
+    def __getattr__(self, name):  # mode, flush...: the shared cache's
+        return getattr(self.cache, name)
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.mismatched_paths = []
+
+    def stats(self) -> dict:
+        return {
+            "cache_mode": self.cache.mode,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_mismatches": len(self.mismatched_paths),
+        }
+
+    # ====================================================================================
+    def lookup(self, path: str, st: os.stat_result, algorithm: str = 'sha256') -> Optional[str]:
+        digest = self.cache.lookup(path, st, algorithm)
+        if digest is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return digest
+
+    def store(self, path: str, st: os.stat_result, digest: str, algorithm: str = 'sha256') -> bool:
+        mismatch = self.cache.store(path, st, digest, algorithm)
+        if mismatch:
+            self.mismatched_paths.append(os.path.abspath(path))
+        return mismatch
+
+
+class BatchRunner:
+    """Runs the jobs of a BatchSpec on shared presets, engine and cache, and writes the consolidated report."""
+
+    # ====================================================================================
+    # model_factory(job) returns the Model a job runs on (folder and walk options set). model_factory(None)
+    # returns the run's own model, whose engine settings, cache and preset library all jobs share.
+    def __init__(self, spec: BatchSpec, model_factory: Callable, log_fn=print, cancel_event=None):
+        self.spec = spec
+        self.model_factory = model_factory
+        self.log = log_fn
+        self.cancel_event = cancel_event or threading.Event()
+        self._shared_model = None
+        self._engine: Optional[SharedHashEngine] = None
+        self._indexes: Dict[str, object] = {}
+
+    # ====================================================================================
+    def run(self) -> dict:
+        start_time = time.perf_counter()
+        jobs = self.spec.jobs
+        self._shared_model = self.model_factory(None)
+        self._engine = SharedHashEngine(self._shared_model.engine, self.spec.io_budget, self.cancel_event)
+
+        # every preset once, before any job starts
+        index_start = time.perf_counter()
+        for preset_name in dict.fromkeys(job.preset for job in jobs):
+            hashes_preset = self._shared_model._load_preset(preset_name)
+            if hashes_preset is not None:
+                self._indexes[preset_name] = build_preset_index(hashes_preset)
+        index_seconds = time.perf_counter() - index_start
+
+        results: List[Optional[BatchJobResult]] = [None] * len(jobs)
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.spec.max_concurrent_jobs, len(jobs)),
+                                    thread_name_prefix="hit-batch") as pool:
+                futures = {pool.submit(self._run_job, job): number for number, job in enumerate(jobs)}
+                for future, number in futures.items():
+                    results[number] = future.result()
+        finally:
+            self._engine.close(cancel=self.cancel_event.is_set())
+
+        report = self._report(results, time.perf_counter() - start_time, index_seconds)
+        self._write_report(report)
+        return report
+
+    # ====================================================================================
+    def _run_job(self, job: BatchJob) -> BatchJobResult:
+        started = time.perf_counter()
+        result = BatchJobResult(name=job.name, folder=job.folder, preset=job.preset, result="error")
+        try:
+            if not os.path.isdir(job.folder):
+                result.result = "folder_not_found"
+                return result
+            if job.preset not in self._indexes:
+                result.result = "preset_not_found"
+                return result
+            if self.cancel_event.is_set():
+                result.result = "cancelled"
+                return result
+
+            model = self._job_model(job)
+            self.log(f"\n[{job.name}] Verifying {job.folder} with preset '{job.preset}'")
+            outcome = model._verify_streaming(job.preset, max_failures=job.max_failures,
+                                              preset_index=self._indexes[job.preset])
+            result.result = "fail" if outcome.files_failed else "pass"
+            result.files_checked = outcome.files_checked
+            result.files_failed = outcome.files_failed
+            result.stopped_early = outcome.stopped_early
+            result.failed = outcome.failed_files
+        except HashingCancelled:
+            result.result = "cancelled"
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            self.log(f"\n[Error] {job.name}: {result.error}")
+        finally:
+            result.duration_seconds = round(time.perf_counter() - started, 4)
+        return result
+
+    def _job_model(self, job: BatchJob):
+        model = self.model_factory(job)
+        if model.hash_cache is not None and model.hash_cache is not self._shared_model.hash_cache:
+            model.hash_cache.close()
+        shared_cache = self._shared_model.hash_cache
+        model.hash_cache = JobHashCache(shared_cache) if shared_cache is not None else None
+        model.presets = self._shared_model.presets
+        model.engine = JobHashEngine(self._engine, model.instrumentation)
+        model.cancel_event = self.cancel_event
+        return model
+
+    # ====================================================================================
+    def _report(self, results: List[BatchJobResult], duration_seconds: float, index_seconds: float) -> dict:
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result.result] = counts.get(result.result, 0) + 1
+        return {
+            "format": BATCH_REPORT_FORMAT,
+            "timestamp": datetime.now().astimezone().isoformat(),
+            "result": "pass" if counts.get("pass", 0) == len(results) else "fail",
+            "jobs_total": len(results),
+            "jobs": counts,
+            "presets_loaded": len(self._indexes),
+            "index_build_seconds": round(index_seconds, 4),
+            "files_hashed": self._engine.files_hashed,
+            "files_shared": self._engine.files_shared,
+            "max_concurrent_jobs": self.spec.max_concurrent_jobs,
+            "io_budget": self._engine.io_budget,
+            "io_devices": self._engine.device_stats,
+            "duration_seconds": round(duration_seconds, 4),
+            "results": [asdict(result) for result in results],
+        }
+
+    def _write_report(self, report: dict) -> None:
+        path = self.spec.report or os.path.join(
+            METADATA_FOLDER, f"{BATCH_REPORT_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        report["report"] = os.path.abspath(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,453 @@
+"""Headless command-line front end for H.I.T., built directly on Model.
+
+    python Cli.py create <preset> --folder <dir>
+    python Cli.py verify <preset> --folder <dir>
+    python Cli.py list
+    python Cli.py info <preset>
+    python Cli.py match --folder <dir>
+    python Cli.py watch <preset> --folder <dir>
+    python Cli.py batch <spec.json|spec.toml>
+    python Cli.py bench-algorithms
+
+Results are printed to stdout as JSON; log lines (see -v) go to stderr. Never imports the GUI stack.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from Archives import ARCHIVE_POLICIES
+from HashCache import CACHE_MODES
+from IoScheduler import IO_SCHEDULERS
+from HashEngine import (DEFAULT_HASH_ALGORITHM, DEFAULT_HASH_WORKERS, HASH_ALGORITHMS, HASH_EXECUTORS,
+                        HASH_STRATEGIES, HashingCancelled, benchmark_algorithms)
+from Model import VERBOSITY_FILES, VERBOSITY_QUIET, VERBOSITY_SUMMARY, Model
+from SpotCheck import DEFAULT_CONFIDENCE, DEFAULT_TOLERATED_RATE, SAMPLE_WEIGHTINGS
+from Walker import HARDLINK_POLICIES, IGNORE_FILENAME, SPECIAL_FILE_POLICIES, SYMLINK_POLICIES, WalkError
+from WatchOptions import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_POLL_INTERVAL_SECONDS, WATCH_BACKENDS
+
+
+#====================================================================================
+EXIT_OK = 0
+EXIT_VERIFY_FAILED = 1      # verification ran and at least one file did not match
+EXIT_USAGE = 2              # bad arguments (argparse uses 2 as well)
+EXIT_NOT_FOUND = 3          # preset or folder does not exist
+EXIT_ALREADY_EXISTS = 4     # create: a preset with that name already exists
+EXIT_ERROR = 5              # unexpected failure
+EXIT_CANCELLED = 130        # interrupted (Ctrl+C)
+
+
+# ====================================================================================
+def _emit(payload: dict) -> None:
+    json.dump(payload, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def _stderr_log(msg: str) -> None:
+    print(msg.strip("\n"), file=sys.stderr)
+
+
+# ====================================================================================
+def _build_model(args) -> Model:
+    verbosity = (VERBOSITY_QUIET, VERBOSITY_SUMMARY, VERBOSITY_FILES)[min(args.verbose, 2)]
+    return Model(
+        verification_folder=getattr(args, "folder", None) or "./verify",
+        preset_folder="./presets",
+        log_fn=_stderr_log if args.verbose else (lambda msg: None),
+        hash_workers=args.workers,
+        hash_executor=args.executor,
+        hash_strategy=args.strategy,
+        cache_mode=args.cache_mode,
+        verbosity=verbosity,
+        hash_algorithm=getattr(args, "algorithm", DEFAULT_HASH_ALGORITHM),
+        include=args.include,
+        exclude=args.exclude,
+        symlink_policy=args.symlinks,
+        hardlink_policy=args.hardlinks,
+        special_file_policy=args.special_files,
+        slowest_files=args.slowest,
+        metrics_path=args.metrics_file,
+        io_scheduler=args.io_scheduler,
+        archive_policy=args.archives,
+    )
+
+
+# ====================================================================================
+def cmd_create(args) -> int:
+    model = _build_model(args)
+    if model._preset_path(args.preset) is not None:
+        _emit({"command": "create", "preset": args.preset, "result": "already_exists"})
+        return EXIT_ALREADY_EXISTS
+
+    start = time.perf_counter()
+    try:
+        path = model._create_preset(args.preset, merkle=args.merkle, quick=args.quick, resume=not args.no_resume,
+                                    manifest=not args.no_manifest)
+    except (KeyboardInterrupt, HashingCancelled):
+        # the checkpoint keeps what was hashed, the next create of this preset resumes from it
+        _emit({"command": "create", "preset": args.preset, "result": "cancelled"})
+        return EXIT_CANCELLED
+    if path is None:
+        # nothing was written: the preset appeared in the meantime, or the options don't combine (see --verbose)
+        exists = model._preset_path(args.preset) is not None
+        _emit({"command": "create", "preset": args.preset, "result": "already_exists" if exists else "create_failed"})
+        return EXIT_ALREADY_EXISTS if exists else EXIT_ERROR
+    summary = model._preset_summary(path)
+    _emit({"command": "create", "preset": args.preset, "result": "created", "folder": model.verification_folder,
+           "duration_seconds": round(time.perf_counter() - start, 4),
+           "files_resumed": model.instrumentation.counters.get("files_resumed", 0), **summary})
+    return EXIT_OK
+
+
+def cmd_verify(args) -> int:
+    model = _build_model(args)
+    if args.merkle:
+        return _verify_merkle(model, args)
+    if args.manifest:
+        return _verify_manifest(model, args)
+    if args.sample:
+        return _verify_sample(model, args)
+
+    preset = model._load_preset(args.preset)
+    if preset is None:
+        _emit({"command": "verify", "preset": args.preset, "result": "preset_not_found"})
+        return EXIT_NOT_FOUND
+
+    start = time.perf_counter()
+    if not (args.tiered or args.strict):
+        return _verify_streaming(model, args, start)
+
+    result = model._verify_tiered(args.preset, strict=args.strict)
+    if result is None:
+        _emit({"command": "verify", "preset": args.preset, "result": "quick_index_not_found"})
+        return EXIT_NOT_FOUND
+    passed = not result.failed_files
+    _emit({
+        "command": "verify",
+        "preset": args.preset,
+        "folder": model.verification_folder,
+        "result": "pass" if passed else "fail",
+        "files_checked": len(result.verified_files) + len(result.failed_files),
+        "files_failed": len(result.failed_files),
+        "algorithm": model._preset_algorithm(args.preset),
+        "failed": [{"file": name, "digest": digest} for name, digest in result.failed_files],
+        "duration_seconds": round(time.perf_counter() - start, 4),
+    })
+    return EXIT_OK if passed else EXIT_VERIFY_FAILED
+
+
+def _verify_streaming(model: Model, args, start: float) -> int:
+    result = model._verify_streaming(args.preset, max_failures=1 if args.fail_fast else args.max_failures)
+    passed = not result.files_failed
+    _emit({
+        "command": "verify",
+        "preset": args.preset,
+        "folder": model.verification_folder,
+        "result": "pass" if passed else "fail",
+        "files_checked": result.files_checked,
+        "files_failed": result.files_failed,
+        "stopped_early": result.stopped_early,
+        "algorithm": model._preset_algorithm(args.preset),
+        "failed": [{"file": name, "digest": digest} for name, digest in result.failed_files],
+        "duration_seconds": round(time.perf_counter() - start, 4),
+    })
+    return EXIT_OK if passed else EXIT_VERIFY_FAILED
+
+
+def _verify_merkle(model: Model, args) -> int:
+    start = time.perf_counter()
+    diff = model._verify_merkle(args.preset, deep=args.deep)
+    if diff is None:
+        _emit({"command": "verify", "preset": args.preset, "result": "merkle_tree_not_found"})
+        return EXIT_NOT_FOUND
+
+    _emit({
+        "command": "verify",
+        "mode": "merkle",
+        "preset": args.preset,
+        "folder": model.verification_folder,
+        "result": "fail" if diff.failed else "pass",
+        "modified": diff.modified,
+        "added": diff.added,
+        "missing": diff.missing,
+        "files_hashed": diff.files_hashed,
+        "dirs_skipped": diff.dirs_skipped,
+        "dirs_confirmed": diff.dirs_confirmed,
+        "duration_seconds": round(time.perf_counter() - start, 4),
+    })
+    return EXIT_VERIFY_FAILED if diff.failed else EXIT_OK
+
+
+def _verify_manifest(model: Model, args) -> int:
+    start = time.perf_counter()
+    diff = model._verify_manifest(args.preset)
+    if diff is None:
+        _emit({"command": "verify", "preset": args.preset, "result": "manifest_not_found"})
+        return EXIT_NOT_FOUND
+
+    _emit({
+        "command": "verify",
+        "mode": "manifest",
+        "preset": args.preset,
+        "folder": model.verification_folder,
+        "result": "fail" if diff.failed else "pass",
+        **diff.counts(),
+        "report": model._manifest_report_path(args.preset),
+        "duration_seconds": round(time.perf_counter() - start, 4),
+    })
+    return EXIT_VERIFY_FAILED if diff.failed else EXIT_OK
+
+
+def _verify_sample(model: Model, args) -> int:
+    start = time.perf_counter()
+    result = model._verify_sample(args.preset, confidence=args.confidence, tolerated_rate=args.tolerated_rate,
+                                  weighting=args.weight, seed=args.seed)
+    if result is None:
+        _emit({"command": "verify", "preset": args.preset, "result": "preset_not_found"})
+        return EXIT_NOT_FOUND
+
+    _emit({
+        "command": "verify",
+        "mode": "sample",
+        "preset": args.preset,
+        "folder": model.verification_folder,
+        "result": "fail" if result.failed_files else "pass",
+        "files_total": result.files_total,
+        "files_checked": result.files_checked,
+        "files_failed": len(result.failed_files),
+        "confidence": result.confidence,
+        "tolerated_rate": result.tolerated_rate,
+        "corruption_rate_upper_bound": round(result.corruption_upper_bound, 6),
+        "weighting": result.weighting,
+        "seed": result.seed,
+        "run": result.run,
+        "cycle": result.cycle,
+        "cycle_progress": round(result.cycle_progress, 4),
+        "failed": [{"file": name, "digest": digest} for name, digest in result.failed_files],
+        "duration_seconds": round(time.perf_counter() - start, 4),
+    })
+    return EXIT_VERIFY_FAILED if result.failed_files else EXIT_OK
+
+
+def cmd_watch(args) -> int:
+    model = _build_model(args)
+    watch = model._watch(args.preset, backend=args.backend, debounce=args.debounce, poll_interval=args.poll_interval)
+    if watch is None:
+        _emit({"command": "watch", "preset": args.preset, "result": "preset_not_found"})
+        return EXIT_NOT_FOUND
+
+    # one compact JSON object per line, so a supervisor can tail the output
+    def emit_line(payload: dict) -> None:
+        sys.stdout.write(json.dumps({"command": "watch", "preset": args.preset, **payload}) + "\n")
+        sys.stdout.flush()
+
+    emit_line({"result": "watching", "backend": watch.backend, **watch.state()})
+    try:
+        watch.run(duration=args.duration, on_drift=lambda event: emit_line({"result": "drift", **event}))
+    except KeyboardInterrupt:
+        pass
+    emit_line({"result": "stopped", **watch.state()})
+    return EXIT_VERIFY_FAILED if watch.drifted or watch.missing else EXIT_OK
+
+
+def cmd_match(args) -> int:
+    model = _build_model(args)
+    _emit({"command": "match", **model._match_presets(top=args.top)})
+    return EXIT_OK
+
+
+def cmd_batch(args) -> int:
+    from BatchRun import BatchRunner, load_spec  # imported lazily, like everything only one command needs
+    try:
+        spec = load_spec(args.spec)
+    except (OSError, ValueError) as e:
+        _emit({"command": "batch", "spec": os.path.abspath(args.spec), "result": "bad_spec", "error": str(e)})
+        return EXIT_USAGE
+    if args.jobs:
+        spec.max_concurrent_jobs = args.jobs
+    if args.io_budget:
+        spec.io_budget = args.io_budget
+    if args.report:
+        spec.report = args.report
+
+    # one model per job, with the global options plus the job's own include/exclude globs
+    def model_for(job):
+        if job is None:
+            return _build_model(args)
+        return _build_model(argparse.Namespace(**{**vars(args), "folder": job.folder,
+                                                  "include": [*args.include, *job.include],
+                                                  "exclude": [*args.exclude, *job.exclude]}))
+
+    report = BatchRunner(spec, model_for, log_fn=_stderr_log if args.verbose else (lambda msg: None)).run()
+    _emit({"command": "batch", "spec": os.path.abspath(args.spec), **report})
+    return EXIT_OK if report["result"] == "pass" else EXIT_VERIFY_FAILED
+
+
+def cmd_bench_algorithms(args) -> int:
+    _emit({"command": "bench-algorithms", "size_mb": args.size_mb, **benchmark_algorithms(args.size_mb, args.repeat)})
+    return EXIT_OK
+
+
+def cmd_list(args) -> int:
+    model = _build_model(args)
+    _emit({"command": "list", "presets": model.list_presets()})
+    return EXIT_OK
+
+
+def cmd_info(args) -> int:
+    model = _build_model(args)
+    info = model.preset_info(args.preset)
+    if info is None:
+        _emit({"command": "info", "preset": args.preset, "result": "preset_not_found"})
+        return EXIT_NOT_FOUND
+    _emit({"command": "info", **info})
+    return EXIT_OK
+
+
+# ====================================================================================
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="hit", description="H.I.T. - Hash Integrity Tool (headless)")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="log to stderr: -v summary lines, -vv one line per file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_HASH_WORKERS, help="hashing worker count")
+    parser.add_argument("--executor", choices=HASH_EXECUTORS, default="thread")
+    parser.add_argument("--strategy", choices=HASH_STRATEGIES, default="auto")
+    parser.add_argument("--io-scheduler", choices=IO_SCHEDULERS, default="auto",
+                        help="auto: per-device read concurrency, tuned from throughput (thread executor only)")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="trust")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB",
+                        help="only hash files matching GLOB (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help=f"skip files/folders matching GLOB (repeatable), on top of {IGNORE_FILENAME} files")
+    parser.add_argument("--symlinks", choices=SYMLINK_POLICIES, default="files",
+                        help="files: follow links to files only, skip: ignore links, follow: follow all links")
+    parser.add_argument("--hardlinks", choices=HARDLINK_POLICIES, default="once",
+                        help="once: hash each inode once, all: hash every link")
+    parser.add_argument("--special-files", choices=SPECIAL_FILE_POLICIES, default="skip",
+                        help="what to do with fifos, sockets and devices")
+    parser.add_argument("--archives", choices=ARCHIVE_POLICIES, default="files",
+                        help="members: hash the files inside .zip/.tar(.gz/.bz2/.xz) archives without extracting them")
+    parser.add_argument("--slowest", type=int, default=0, metavar="N",
+                        help="record the N slowest files to hash in the metadata event")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="write the last action's timings and counters there in Prometheus text format")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="create a preset from a folder")
+    create.add_argument("preset")
+    create.add_argument("--folder", required=True)
+    create.add_argument("--merkle", action="store_true", help="also store a hierarchical (merkle) preset")
+    create.add_argument("--quick", action="store_true", help="also store quick-check keys for tiered verify")
+    create.add_argument("--no-manifest", action="store_true", help="do not store the path-keyed manifest")
+    create.add_argument("--no-resume", action="store_true",
+                        help="ignore the checkpoint an interrupted run left behind and start over")
+    create.add_argument("--algorithm", choices=HASH_ALGORITHMS, default=DEFAULT_HASH_ALGORITHM,
+                        help="hash algorithm recorded in the preset (see bench-algorithms)")
+    create.set_defaults(func=cmd_create)
+
+    verify = sub.add_parser("verify", help="verify a folder against a preset")
+    verify.add_argument("preset")
+    verify.add_argument("--folder", required=True)
+    verify.add_argument("--merkle", action="store_true",
+                        help="use the preset's merkle tree: skip unchanged subtrees, report paths that changed")
+    verify.add_argument("--deep", action="store_true",
+                        help="--merkle: read every file and check it against the directory digests, stat or not")
+    verify.add_argument("--tiered", action="store_true",
+                        help="reject files on size and sampled blocks first, fully hash only the rest")
+    verify.add_argument("--strict", action="store_true", help="tiered, but fully hash every file")
+    verify.add_argument("--fail-fast", action="store_true", help="stop at the first file that fails")
+    verify.add_argument("--max-failures", type=int, default=0, metavar="N",
+                        help="stop after N failed files (0: check everything)")
+    verify.add_argument("--manifest", action="store_true",
+                        help="classify files as unchanged/modified/added/missing/moved using the manifest")
+    verify.add_argument("--sample", action="store_true",
+                        help="spot-check a seeded random sample; successive runs rotate through the folder")
+    verify.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help="--sample: chance of catching the tolerated corruption rate (default %(default)s)")
+    verify.add_argument("--tolerated-rate", type=float, default=DEFAULT_TOLERATED_RATE, metavar="RATE",
+                        help="--sample: share of corrupt files that must not go unnoticed (default %(default)s)")
+    verify.add_argument("--weight", choices=SAMPLE_WEIGHTINGS, default="uniform",
+                        help="--sample: favour big ('size') or old ('age') files; only 'uniform' guarantees rotation")
+    verify.add_argument("--seed", type=int, help="--sample: sample seed (default: the one kept from earlier runs)")
+    verify.set_defaults(func=cmd_verify)
+
+    listing = sub.add_parser("list", help="list presets")
+    listing.set_defaults(func=cmd_list)
+
+    info = sub.add_parser("info", help="show a preset's details and latest metadata")
+    info.add_argument("preset")
+    info.set_defaults(func=cmd_info)
+
+    match = sub.add_parser("match", help="rank every preset by how well a folder matches it (one hash pass)")
+    match.add_argument("--folder", required=True)
+    match.add_argument("--top", type=int, help="only list the N best candidates")
+    match.set_defaults(func=cmd_match)
+
+    batch = sub.add_parser("batch", help="verify many folder/preset pairs in one run with shared hashing")
+    batch.add_argument("spec", help="JSON or TOML job spec: a list of jobs with 'folder' and 'preset'")
+    batch.add_argument("--jobs", type=int, metavar="N", help="jobs run at the same time (default: the spec's, or 4)")
+    batch.add_argument("--io-budget", type=int, metavar="N",
+                       help="files read at the same time across all jobs (default: the spec's, or --workers)")
+    batch.add_argument("--report", metavar="PATH",
+                       help="where the consolidated report goes (default: metadata/batch_report_<time>.json)")
+    batch.set_defaults(func=cmd_batch)
+
+    watch = sub.add_parser("watch", help="keep verifying a folder, re-hashing only files that change")
+    watch.add_argument("preset")
+    watch.add_argument("--folder", required=True)
+    watch.add_argument("--backend", choices=WATCH_BACKENDS, default="auto",
+                       help="inotify (Linux), poll (stat snapshots), auto: inotify if available")
+    watch.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE_SECONDS,
+                       help="seconds without further changes before a batch is re-verified")
+    watch.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL_SECONDS)
+    watch.add_argument("--duration", type=float, help="stop after this many seconds (default: until Ctrl+C)")
+    watch.set_defaults(func=cmd_watch)
+
+    bench = sub.add_parser("bench-algorithms", help="measure hash algorithm throughput and recommend one")
+    bench.add_argument("--size-mb", type=int, default=256, help="data hashed per algorithm and run")
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.set_defaults(func=cmd_bench_algorithms)
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # modes that compare stats or sampled reads see archives only as whole files
+    if getattr(args, "archives", "files") == "members" and (
+            args.command == "watch" or getattr(args, "merkle", False) or getattr(args, "quick", False)
+            or getattr(args, "tiered", False) or getattr(args, "strict", False)):
+        parser.error("--archives members cannot be combined with --merkle, --quick, --tiered, --strict or watch")
+    # only the plain streaming verify can stop early
+    if (getattr(args, "fail_fast", False) or getattr(args, "max_failures", 0)) and (
+            args.merkle or args.manifest or args.sample or args.tiered or args.strict):
+        parser.error("--fail-fast and --max-failures cannot be combined with --merkle, --manifest, --sample, "
+                     "--tiered or --strict")
+    if getattr(args, "deep", False) and not args.merkle:
+        parser.error("--deep only applies to --merkle")
+
+    folder = getattr(args, "folder", None)
+    if folder is not None and not os.path.isdir(folder):
+        _emit({"command": args.command, "result": "folder_not_found", "folder": os.path.abspath(folder)})
+        return EXIT_NOT_FOUND
+
+    try:
+        return args.func(args)
+    except (KeyboardInterrupt, HashingCancelled):
+        return EXIT_CANCELLED
+    except WalkError as e:
+        _emit({"command": args.command, "result": "walk_error", "error": str(e)})
+        return EXIT_ERROR
+    except BrokenPipeError:
+        # stdout was closed early (e.g. piped into head); don't let the interpreter complain on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    except Exception as e:
+        _emit({"command": args.command, "result": "error", "error": f"{type(e).__name__}: {e}"})
+        return EXIT_ERROR
+
+
+#====================================================================================
+if __name__ == "__main__":
+    sys.exit(main())
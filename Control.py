@@ -2,16 +2,52 @@ from __future__ import annotations
 
 import os
 import traceback
+from typing import TYPE_CHECKING
 
+from Jobs import JobRunner
 from Model import Model
-from View import View
+
+if TYPE_CHECKING:
+    from View import View  # imported lazily in main(): pulls in dearpygui, pygame and tkinter
 
 
 class Controller:
     def __init__(self, model: Model, view: View):
         self.model = model
         self.view = view
-        model.log = view.log
+        # Model work runs on the job thread; its log lines and progress are queued and applied each frame
+        self.jobs = JobRunner()
+        model.log = self.jobs.log
+        model.progress_fn = self.jobs.progress
+        model.cancel_event = self.jobs.cancel_event
+
+
+    # ====================================================================================
+    def _set_busy(self, busy: bool) -> None:
+        self.view.enable_create_preset_button(not busy)
+        self.view.enable_verify_button(not busy)
+        self.view.enable_clear_log_button(not busy)
+        self.view.enable_folder_button(not busy)
+        self.view.enable_cancel_button(busy)
+
+    # Applies queued job events on the UI thread, called once per frame by the view
+    def on_frame(self) -> None:
+        for kind, payload in self.jobs.drain():
+            if kind == "log":
+                self.view.log(payload)
+            elif kind == "progress":
+                self.view.set_progress(payload.fraction, payload.describe())
+            elif kind == "done":
+                self._set_busy(False)
+            elif kind == "cancelled":
+                self.view.log(f"\n[Info] {payload} cancelled.")
+                self.view.set_progress(0.0, "cancelled")
+                self._set_busy(False)
+            elif kind == "error":
+                job_name, error = payload
+                self.view.play_sound("assets/audio/ui_sound_05.wav", False)
+                self.view.log(f"[Error] {job_name}: {error}")
+                self._set_busy(False)
 
 
     # ===================================(CALLBACKS)======================================
@@ -29,16 +65,10 @@ class Controller:
                 return
 
             self.view.play_sound("assets/audio/ui_sound_01.wav", False)
-            self.view.enable_create_preset_button(False)
-            self.view.enable_verify_button(False)
-            self.view.enable_clear_log_button(False)
-            self.view.enable_folder_button(False)
+            self._set_busy(True)
+            self.view.set_progress(0.0, "")
             self.view.log(f"\nCreating preset '{preset_name}' from: {self.model.verification_folder}")
-            path = self.model._create_preset(preset_name)
-            self.view.enable_create_preset_button(True)
-            self.view.enable_verify_button(True)
-            self.view.enable_clear_log_button(True)
-            self.view.enable_folder_button(True)
+            self.jobs.start("Create preset", lambda: self.model._create_preset(preset_name))
 
         except Exception as e:
             self.view.log(f"[Error] {e}")
@@ -57,19 +87,10 @@ class Controller:
                 return
 
             self.view.play_sound("assets/audio/ui_sound_01.wav", False)
-            self.view.enable_create_preset_button(False)
-            self.view.enable_verify_button(False)
-            self.view.enable_clear_log_button(False)
-            self.view.enable_folder_button(False)
+            self._set_busy(True)
+            self.view.set_progress(0.0, "")
             self.view.log(f"Verifying hashes of {self.model.verification_folder} with preset '{preset_name}'")
-            path = self.model._compare_hashes_with_preset(
-                folder_files_and_hashes=self.model._get_hashes(),
-                hashes_preset=self.model._load_preset(self.view.get_preset_name_input().strip()),
-                preset_name=preset_name)
-            self.view.enable_create_preset_button(True)
-            self.view.enable_verify_button(True)
-            self.view.enable_clear_log_button(True)
-            self.view.enable_folder_button(True)
+            self.jobs.start("Verify", lambda: self.model._verify_streaming(preset_name))
 
         except Exception as e:
             self.view.log(f"[Error] {e}")
@@ -88,6 +109,12 @@ class Controller:
         except Exception as e:
             self.view.log(f"[Error] {e}")
 
+    def on_cancel_clicked(self) -> None:
+        if self.jobs.is_busy():
+            self.view.play_sound("assets/audio/ui_sound_01.wav", False)
+            self.view.log("\n[Info] Cancelling...")
+            self.jobs.cancel()
+
     def on_clear_log_clicked(self) -> None:
         self.view.play_sound("assets/audio/ui_sound_01.wav", False)
         self.view.clear_log()
@@ -97,6 +124,8 @@ class Controller:
 
 #====================================================================================
 def main() -> None:
+    from View import View
+
     model = Model(verification_folder="./verify", preset_folder="./presets")
     view = View()
     controller = Controller(model, view)
@@ -105,7 +134,9 @@ def main() -> None:
         on_action_clicked=controller.on_action_clicked,
         on_folder_picked=controller.on_folder_picked,
         on_verify_clicked=controller.on_verify_clicked,
-        on_clear_log_clicked=controller.on_clear_log_clicked
+        on_clear_log_clicked=controller.on_clear_log_clicked,
+        on_cancel_clicked=controller.on_cancel_clicked,
+        on_frame=controller.on_frame
     )
 
     # initial state
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+#====================================================================================
+CACHE_FOLDER = './cache'
+CACHE_FILENAME = 'hash_cache.sqlite3'
+CACHE_MODES = ('trust', 'paranoid', 'off')
+DEFAULT_CACHE_MAX_ENTRIES = 2_000_000
+CACHE_WRITE_BATCH = 1000
+CACHE_SCHEMA_VERSION = 2  # 2: digests are keyed per hash algorithm
+# Files modified this recently are hashed but not cached: another write inside the same mtime tick would
+# leave size and mtime unchanged, and the cache would then serve a stale digest.
+RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+
+class HashCache:
+    """On-disk digest cache keyed on (absolute path, algorithm) and validated on (size, mtime_ns, inode, device).
+
+    Least recently used entries are evicted beyond max_entries.
+
+    'trust' serves cached digests when the stat matches, 'paranoid' always re-hashes and counts
+    cached digests that no longer match the file content.
+    """
+
+    # ====================================================================================
+    def __init__(self, cache_folder: str = CACHE_FOLDER, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+                 mode: str = 'trust'):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.path = os.path.abspath(os.path.join(cache_folder, CACHE_FILENAME))
+        self._lock = threading.Lock()
+        self._pending: List[Tuple] = []
+        self._paranoid_expected: Dict[Tuple[str, str], str] = {}
+        self.mismatched_paths: List[str] = []
+        self.reset_stats()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != CACHE_SCHEMA_VERSION:
+            # older layout: it is only a cache, so start over rather than migrate
+            self._db.execute("DROP TABLE IF EXISTS entries")
+            self._db.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT, algorithm TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER, device INTEGER,"
+            " digest TEXT, last_used INTEGER, PRIMARY KEY (path, algorithm))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._db.commit()
+
+    # ====================================================================================
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+        self.mismatched_paths = []
+
+    def stats(self) -> dict:
+        return {
+            "cache_mode": self.mode,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_mismatches": self.mismatches,
+        }
+
+    # ====================================================================================
+    # Returns the cached digest if the stat still matches, otherwise None (the file must be hashed).
+    def lookup(self, path: str, st: os.stat_result, algorithm: str = 'sha256') -> Optional[str]:
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, inode, device, digest FROM entries WHERE path = ? AND algorithm = ?",
+                (path, algorithm)
+            ).fetchone()
+
+            if row is None or row[:4] != (st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev):
+                if row is not None:
+                    # stat changed, the old digests are useless whatever the algorithm
+                    self._db.execute("DELETE FROM entries WHERE path = ?", (path,))
+                self.misses += 1
+                return None
+
+            if self.mode == 'paranoid':
+                self._paranoid_expected[(path, algorithm)] = row[4]
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE entries SET last_used = ? WHERE path = ? AND algorithm = ?",
+                             (time.time_ns(), path, algorithm))
+            self.hits += 1
+            return row[4]
+
+    # ====================================================================================
+    # Records a freshly computed digest. st must be the stat taken before the file was read.
+    # Returns True if, in paranoid mode, the digest contradicts the one cached for the same stat.
+    def store(self, path: str, st: os.stat_result, digest: str, algorithm: str = 'sha256') -> bool:
+        path = os.path.abspath(path)
+        with self._lock:
+            expected = self._paranoid_expected.pop((path, algorithm), None)
+            mismatch = expected is not None and expected != digest
+            if mismatch:
+                self.mismatches += 1
+                self.mismatched_paths.append(path)
+
+            if time.time_ns() - st.st_mtime_ns < RACY_MTIME_WINDOW_NS:
+                return mismatch
+
+            self._pending.append((path, algorithm, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev, digest, time.time_ns()))
+            if len(self._pending) >= CACHE_WRITE_BATCH:
+                self._write_pending()
+            return mismatch
+
+    # ====================================================================================
+    # Writes pending entries and evicts the least recently used ones beyond max_entries.
+    def flush(self) -> None:
+        with self._lock:
+            self._write_pending()
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM entries WHERE rowid IN"
+                    " (SELECT rowid FROM entries ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._db.commit()
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+        self._db.commit()
+
+    # ====================================================================================
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE path = ?", (os.path.abspath(path),))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending = []
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
@@ -0,0 +1,448 @@
+import hashlib
+import mmap
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from IoScheduler import IO_SCHEDULERS, IoScheduler
+
+
+#====================================================================================
+DEFAULT_HASH_WORKERS = os.cpu_count() or 1
+HASH_EXECUTORS = ('thread', 'process')
+PROCESS_BATCH_SIZE = 64  # files per task when using the process pool (amortises IPC for small files)
+SCHEDULER_REORDER_WINDOW = 4096  # files in flight across all device lanes (see _map_scheduled)
+
+# 'auto' picks readinto or mmap by file size; the others force one strategy (used by the benchmark)
+HASH_STRATEGIES = ('auto', 'readinto', 'mmap', 'file_digest', 'read')
+MMAP_THRESHOLD = 64 * 1024 * 1024  # files at least this big are memory-mapped
+MMAP_UPDATE_SIZE = 4 * 1024 * 1024  # slice of the mapping passed to update() at a time
+LEGACY_CHUNK_SIZE = 8192
+
+# Algorithms a preset can be created with; the name is stored in the preset header and verification
+# re-hashes with whatever the preset recorded. sha256 stays the default for compatibility with old presets.
+HASH_ALGORITHMS = ('sha256', 'sha512', 'blake2b', 'blake2s', 'sha3_256', 'sha3_512')
+DEFAULT_HASH_ALGORITHM = 'sha256'
+BENCHMARK_BUFFER_SIZE = 1024 * 1024
+
+_buffers = threading.local()
+
+
+class HashingCancelled(Exception):
+    pass
+
+
+# Cancel token that is set as soon as any of its events is set, e.g. the job's cancel button and a
+# fail-fast stop. Only is_set() is used by the engine, so it stands in for a threading.Event.
+class CancelAny:
+    def __init__(self, *events):
+        self.events = [event for event in events if event is not None]
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+
+# ====================================================================================
+def _check_cancel(cancel) -> None:
+    if cancel is not None and cancel.is_set():
+        raise HashingCancelled()
+
+
+# ====================================================================================
+# Small files get a buffer that fits them in one read, bigger ones a larger buffer so there are fewer syscalls.
+# read_size (from the device's IoScheduler profile) overrides the size used for anything bigger than 64 KiB.
+def buffer_size_for(file_size: int, read_size: Optional[int] = None) -> int:
+    if file_size <= 64 * 1024:
+        return 64 * 1024
+    if read_size:
+        return read_size
+    if file_size <= 16 * 1024 * 1024:
+        return 256 * 1024
+    return 1024 * 1024
+
+
+# ====================================================================================
+# One reusable buffer per thread and size, so hashing never allocates per chunk
+def _reusable_buffer(size: int) -> memoryview:
+    cache = getattr(_buffers, "by_size", None)
+    if cache is None:
+        cache = _buffers.by_size = {}
+    if size not in cache:
+        cache[size] = memoryview(bytearray(size))
+    return cache[size]
+
+
+# ====================================================================================
+# timings (optional dict) gets the seconds spent in read and in hash added to it; None keeps the plain loops.
+def _update_readinto(hash_object, f, file_size: int, cancel=None, timings=None, read_size=None) -> None:
+    buffer = _reusable_buffer(buffer_size_for(file_size, read_size))
+    if timings is not None:
+        return _update_readinto_timed(hash_object, f, buffer, cancel, timings)
+    while n := f.readinto(buffer):
+        _check_cancel(cancel)
+        hash_object.update(buffer[:n])
+
+
+def _update_readinto_timed(hash_object, f, buffer: memoryview, cancel, timings: dict) -> None:
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        n = f.readinto(buffer)
+        read_done = clock()
+        timings["read"] += read_done - start
+        if not n:
+            return
+        _check_cancel(cancel)
+        hash_object.update(buffer[:n])
+        timings["hash"] += clock() - read_done
+
+
+def _update_mmap(hash_object, f, file_size: int, cancel=None, timings=None) -> None:
+    if file_size == 0:
+        return  # empty files cannot be mapped
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            start = time.perf_counter()
+            for offset in range(0, len(view), MMAP_UPDATE_SIZE):
+                _check_cancel(cancel)
+                hash_object.update(view[offset:offset + MMAP_UPDATE_SIZE])
+            if timings is not None:
+                # page faults happen inside update(), so reading and hashing can't be told apart here
+                timings["hash"] += time.perf_counter() - start
+        finally:
+            view.release()
+
+
+def _update_read(hash_object, f, file_size: int, cancel=None, timings=None) -> None:
+    clock = time.perf_counter
+    start = clock()
+    while chunk := f.read(LEGACY_CHUNK_SIZE):
+        read_done = clock()
+        _check_cancel(cancel)
+        hash_object.update(chunk)
+        if timings is not None:
+            timings["read"] += read_done - start
+            start = clock()
+            timings["hash"] += start - read_done
+
+
+# ====================================================================================
+def check_algorithm(algorithm: str) -> str:
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f"Unknown hash algorithm '{algorithm}', expected one of {HASH_ALGORITHMS}")
+    return algorithm
+
+
+# ====================================================================================
+# Calculates the digest of a single file. Module level so the process pool can pickle it.
+# cancel is an optional threading.Event checked between chunks, so a cancelled job stops mid-file.
+# If timings is a dict (see new_file_timings), the open/read/hash seconds and the byte count are added to it.
+# read_size sets the read buffer for large files and asks the kernel for sequential read-ahead (see IoScheduler).
+def hash_file(path: str, strategy: str = 'auto', cancel=None, algorithm: str = DEFAULT_HASH_ALGORITHM,
+              timings: Optional[dict] = None, read_size: Optional[int] = None) -> str:
+    start = time.perf_counter() if timings is not None else 0.0
+    # unbuffered: readinto fills our buffer straight from the OS, without an extra copy through BufferedReader
+    with open(path, "rb", buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if timings is not None:
+            timings["open"] += time.perf_counter() - start
+            timings["bytes"] += file_size
+        if read_size and file_size > read_size and hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        if strategy == 'file_digest' and hasattr(hashlib, "file_digest"):
+            hash_start = time.perf_counter()
+            digest = hashlib.file_digest(f, algorithm).hexdigest()
+            if timings is not None:
+                timings["hash"] += time.perf_counter() - hash_start
+            return digest
+
+        if strategy == 'auto':
+            strategy = 'mmap' if file_size >= MMAP_THRESHOLD else 'readinto'
+
+        hash_object = hashlib.new(algorithm)
+        if strategy == 'mmap':
+            _update_mmap(hash_object, f, file_size, cancel, timings)
+        elif strategy == 'read':
+            _update_read(hash_object, f, file_size, cancel, timings)
+        else:
+            _update_readinto(hash_object, f, file_size, cancel, timings, read_size)
+
+    return hash_object.hexdigest()
+
+
+def new_file_timings() -> dict:
+    return {"open": 0.0, "read": 0.0, "hash": 0.0, "bytes": 0}
+
+
+# ====================================================================================
+# Hashes one file and returns (digest, timings) with the file's total seconds added; used when instrumented.
+def hash_file_timed(path: str, strategy: str = 'auto', cancel=None, algorithm: str = DEFAULT_HASH_ALGORITHM,
+                    read_size: Optional[int] = None) -> Tuple[str, dict]:
+    timings = new_file_timings()
+    start = time.perf_counter()
+    digest = hash_file(path, strategy, cancel, algorithm, timings, read_size)
+    timings["seconds"] = time.perf_counter() - start
+    return digest, timings
+
+
+# ====================================================================================
+# Splits a map() item into (path, stat). The stat is only needed, and only taken, when there is a cache.
+def _with_stat(item, cache) -> Tuple[str, Optional[os.stat_result]]:
+    if isinstance(item, tuple):
+        return item
+    return item, (os.stat(item) if cache is not None else None)
+
+
+# ====================================================================================
+# Hashes a batch of files in one task (used by the process pool). timed=True returns (digest, timings) pairs.
+def _hash_batch(paths: List[str], strategy: str = 'auto', cancel=None,
+                algorithm: str = DEFAULT_HASH_ALGORITHM, timed: bool = False, read_size: Optional[int] = None) -> list:
+    if timed:
+        return [hash_file_timed(path, strategy, cancel, algorithm, read_size) for path in paths]
+    return [hash_file(path, strategy, cancel, algorithm, read_size=read_size) for path in paths]
+
+
+# ====================================================================================
+# Measures the in-memory throughput (MB/s) of every fixed-size hashlib algorithm on this machine.
+# Returns {"results": [...fastest first], "recommended": fastest of HASH_ALGORITHMS}.
+def benchmark_algorithms(size_mb: int = 256, repeat: int = 3) -> dict:
+    data = memoryview(os.urandom(BENCHMARK_BUFFER_SIZE))
+    rounds = max(1, size_mb * 1024 * 1024 // BENCHMARK_BUFFER_SIZE)
+    results = []
+
+    for algorithm in sorted(hashlib.algorithms_available):
+        try:
+            hash_object = hashlib.new(algorithm)
+            hash_object.hexdigest()  # shake_* need a length, they can't be used for presets
+        except (ValueError, TypeError):
+            continue
+
+        best = float("inf")
+        for _ in range(repeat):
+            hash_object = hashlib.new(algorithm)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                hash_object.update(data)
+            best = min(best, time.perf_counter() - start)
+        results.append({
+            "algorithm": algorithm,
+            "mb_per_second": round(rounds * len(data) / (1024 * 1024) / best, 1) if best else float("inf"),
+            "digest_bits": hash_object.digest_size * 8,
+            "preset_supported": algorithm in HASH_ALGORITHMS,
+        })
+
+    results.sort(key=lambda r: r["mb_per_second"], reverse=True)
+    supported = [r["algorithm"] for r in results if r["preset_supported"]]
+    return {"results": results, "recommended": supported[0] if supported else DEFAULT_HASH_ALGORITHM}
+
+
+class HashEngine:
+    """Worker pool that hashes files concurrently while yielding results in input order."""
+
+    # ====================================================================================
+    def __init__(self, workers: int = DEFAULT_HASH_WORKERS, executor: str = 'thread', strategy: str = 'auto',
+                 algorithm: str = DEFAULT_HASH_ALGORITHM, instrumentation=None, io_scheduler: str = 'auto'):
+        if executor not in HASH_EXECUTORS:
+            raise ValueError(f"Unknown hash executor '{executor}', expected one of {HASH_EXECUTORS}")
+        if io_scheduler not in IO_SCHEDULERS:
+            raise ValueError(f"Unknown I/O scheduler '{io_scheduler}', expected one of {IO_SCHEDULERS}")
+        if strategy not in HASH_STRATEGIES:
+            raise ValueError(f"Unknown hash strategy '{strategy}', expected one of {HASH_STRATEGIES}")
+        self.workers = max(1, int(workers))
+        self.executor = executor
+        self.strategy = strategy
+        self.algorithm = check_algorithm(algorithm)
+        # optional Instrumentation: per-file open/read/hash timings and byte counters are recorded into it
+        self.instrumentation = instrumentation
+        # 'auto' spreads thread-pool reads over per-device lanes (see IoScheduler); the process pool is unaffected
+        self.io_scheduler = io_scheduler
+        self.device_stats: List[dict] = []  # IoScheduler lanes of the last map() call; empty unless it was scheduled
+
+    # ====================================================================================
+    # Yields (path, digest) in the same order as the paths were given, whatever the worker count.
+    # With a HashCache, files whose stat is unchanged are served from the cache and never read.
+    # Setting the cancel event raises HashingCancelled promptly, including from inside a large file.
+    # algorithm overrides the engine's default for this call (e.g. the algorithm a preset was made with).
+    # Items are paths, or (path, stat_result) when the caller already has the stat (e.g. from the Walker).
+    def map(self, paths: Iterable[str], cache=None, cancel=None,
+            algorithm: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        algorithm = check_algorithm(algorithm or self.algorithm)
+        self.device_stats = []  # a pooled or single-worker run has no lanes; an earlier run's must not show
+        try:
+            if self.workers == 1:
+                for path in paths:
+                    _check_cancel(cancel)
+                    path, st = _with_stat(path, cache)
+                    digest = cache.lookup(path, st, algorithm) if cache is not None else None
+                    if digest is None:
+                        if self.instrumentation is not None:
+                            digest, timings = hash_file_timed(path, self.strategy, cancel, algorithm)
+                            self.instrumentation.record_file(path, timings)
+                        else:
+                            digest = hash_file(path, self.strategy, cancel, algorithm)
+                        if cache is not None:
+                            cache.store(path, st, digest, algorithm)
+                    yield path, digest
+                return
+
+            if self.io_scheduler == 'auto' and self.executor == 'thread':
+                yield from self._map_scheduled(paths, cache, cancel, algorithm)
+            else:
+                yield from self._map_pooled(paths, cache, cancel, algorithm)
+        finally:
+            if cache is not None:
+                cache.flush()
+
+    # ====================================================================================
+    def _map_pooled(self, paths: Iterable[str], cache, cancel, algorithm: str) -> Iterator[Tuple[str, str]]:
+        # an Event cannot be pickled to worker processes; those stop at the next batch boundary instead
+        task_cancel = cancel if self.executor == 'thread' else None
+        batch_size = PROCESS_BATCH_SIZE if self.executor == 'process' else 1
+        if self.executor == 'process':
+            from concurrent.futures import ProcessPoolExecutor  # imported lazily, it pulls in multiprocessing
+            pool_class = ProcessPoolExecutor
+        else:
+            pool_class = ThreadPoolExecutor
+        # keep a bounded number of tasks in flight so huge trees don't queue every path up front
+        max_in_flight = self.workers * 4
+
+        with pool_class(max_workers=self.workers) as pool:
+            # entries are (paths, stats, future) for work sent to the pool, or (paths, None, digests) for cache hits
+            in_flight = deque()
+            batch, batch_stats = [], []
+
+            def submit(paths_batch, stats_batch):
+                future = pool.submit(_hash_batch, paths_batch, self.strategy, task_cancel, algorithm,
+                                     self.instrumentation is not None)
+                in_flight.append((paths_batch, stats_batch, future))
+
+            try:
+                for path in paths:
+                    _check_cancel(cancel)
+                    path, st = _with_stat(path, cache)
+                    digest = cache.lookup(path, st, algorithm) if cache is not None else None
+
+                    if digest is not None:
+                        # submit what is batched so far first so results keep their order
+                        if batch:
+                            submit(batch, batch_stats)
+                            batch, batch_stats = [], []
+                        in_flight.append(([path], None, [digest]))
+                    else:
+                        batch.append(path)
+                        batch_stats.append(st)
+                        if len(batch) >= batch_size:
+                            submit(batch, batch_stats)
+                            batch, batch_stats = [], []
+
+                    while len(in_flight) >= max_in_flight:
+                        yield from self._drain_one(in_flight, cache, algorithm, self.instrumentation)
+
+                if batch:
+                    submit(batch, batch_stats)
+
+                while in_flight:
+                    _check_cancel(cancel)
+                    yield from self._drain_one(in_flight, cache, algorithm, self.instrumentation)
+            except BaseException:
+                # cancelled, failed or the consumer stopped early: drop everything that hasn't started
+                for _, batch_stats, result in in_flight:
+                    if batch_stats is not None:
+                        result.cancel()
+                raise
+
+    # ====================================================================================
+    # Thread-pool map through the IoScheduler: every file goes to its device's lane. Results still come back
+    # in input order; up to SCHEDULER_REORDER_WINDOW files may be in flight, so a fast device can run that far
+    # ahead of a slow one before it has to wait for the slow one's results to be consumed.
+    def _map_scheduled(self, paths: Iterable, cache, cancel, algorithm: str) -> Iterator[Tuple[str, str]]:
+        scheduler = IoScheduler(self.workers)
+        timed = self.instrumentation is not None
+        # entries are ([path], [stat], future) for files sent to a lane, or ([path], None, [digest]) for cache hits
+        in_flight = deque()
+
+        def drain_one():
+            _, stats, result = in_flight[0]
+            if stats is not None and not result.done():
+                scheduler.lane_for(in_flight[0][0][0], stats[0]).flush()  # it may still wait in a locality window
+            return self._drain_one(in_flight, cache, algorithm, self.instrumentation)
+
+        try:
+            for item in paths:
+                _check_cancel(cancel)
+                path, st = item if isinstance(item, tuple) else (item, None)
+                if st is None:
+                    st = os.stat(path)  # needed for the device anyway
+                digest = cache.lookup(path, st, algorithm) if cache is not None else None
+
+                if digest is not None:
+                    in_flight.append(([path], None, [digest]))
+                else:
+                    lane = scheduler.lane_for(path, st)
+                    future = lane.submit(_hash_batch, ([path], self.strategy, cancel, algorithm, timed,
+                                                       lane.profile.read_size), st.st_size, st.st_ino)
+                    in_flight.append(([path], [st], future))
+
+                while len(in_flight) >= SCHEDULER_REORDER_WINDOW:
+                    yield from drain_one()
+
+            while in_flight:
+                _check_cancel(cancel)
+                yield from drain_one()
+        except BaseException:
+            for _, stats, result in in_flight:
+                if stats is not None:
+                    result.cancel()
+            scheduler.close(cancel=True)
+            raise
+        finally:
+            self.device_stats = scheduler.snapshot()
+        scheduler.close()
+
+    # ====================================================================================
+    # Ordered map of any per-file function over a thread pool of the same size (e.g. quick-check sampling).
+    def imap(self, fn: Callable, items: Iterable, cancel=None) -> Iterator:
+        if self.workers == 1:
+            for item in items:
+                _check_cancel(cancel)
+                yield fn(item)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = deque()
+            try:
+                for item in items:
+                    _check_cancel(cancel)
+                    in_flight.append(pool.submit(fn, item))
+                    while len(in_flight) >= self.workers * 4:
+                        yield in_flight.popleft().result()
+                while in_flight:
+                    _check_cancel(cancel)
+                    yield in_flight.popleft().result()
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+    # ====================================================================================
+    @staticmethod
+    def _drain_one(in_flight: deque, cache, algorithm: str, instrumentation=None) -> Iterator[Tuple[str, str]]:
+        batch, batch_stats, result = in_flight.popleft()
+        if batch_stats is None:
+            yield from zip(batch, result)
+            return
+
+        digests = result.result()
+        if instrumentation is not None:
+            for path, (_, timings) in zip(batch, digests):
+                instrumentation.record_file(path, timings)
+            digests = [digest for digest, _ in digests]
+        if cache is not None:
+            for path, st, digest in zip(batch, batch_stats, digests):
+                cache.store(path, st, digest, algorithm)
+        yield from zip(batch, digests)
@@ -0,0 +1,160 @@
+import heapq
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+#====================================================================================
+# Named spans and counters for one Model action (create, verify, ...). The snapshot is attached to the
+# action's metadata event and can be written as a Prometheus text file, to see where the time goes
+# without attaching a profiler.
+#
+# Span seconds are summed over every thread that recorded them: with several hash workers 'read' and
+# 'hash' add up worker time and can exceed the wall clock, which is what the '*_wall' spans measure.
+SPAN_NAMES = ('walk', 'open', 'read', 'hash', 'hashing_wall', 'quick_check', 'merkle_scan', 'index_build',
+              'compare', 'preset_write', 'metadata_write')
+DEFAULT_SLOWEST_FILES = 0  # 0 disables slowest-N file tracking
+METRICS_PREFIX = 'hit'
+
+
+class Instrumentation:
+    """Thread-safe span timers, counters and an optional slowest-N files list."""
+
+    # ====================================================================================
+    def __init__(self, slowest_files: int = DEFAULT_SLOWEST_FILES):
+        self.slowest_files = slowest_files
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, action: Optional[str] = None) -> None:
+        with self._lock:
+            self.action = action
+            self.spans: Dict[str, List[float]] = {}  # name -> [seconds, count]
+            self.counters: Dict[str, int] = {}
+            self._slowest: List[Tuple[float, str, int]] = []  # min-heap of (seconds, path, bytes)
+
+    # ====================================================================================
+    def add_span(self, name: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            span = self.spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += count
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    # Wraps an iterator so the time spent producing its items (e.g. walking the tree) is counted as a span
+    def timed_iter(self, name: str, items: Iterable) -> Iterator:
+        it = iter(items)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            self.add_span(name, elapsed, 0)
+
+    def span_seconds(self, name: str) -> float:
+        with self._lock:
+            return self.spans.get(name, [0.0])[0]
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    # ====================================================================================
+    # Per-file timings from HashEngine (see HashEngine.hash_file_timed)
+    def record_file(self, path: str, timings: dict) -> None:
+        with self._lock:
+            for name in ("open", "read", "hash"):
+                span = self.spans.setdefault(name, [0.0, 0])
+                span[0] += timings[name]
+                span[1] += 1
+            self.counters["files_hashed"] = self.counters.get("files_hashed", 0) + 1
+            self.counters["bytes_hashed"] = self.counters.get("bytes_hashed", 0) + timings["bytes"]
+
+            if self.slowest_files > 0:
+                item = (timings["seconds"], path, timings["bytes"])
+                if len(self._slowest) < self.slowest_files:
+                    heapq.heappush(self._slowest, item)
+                elif item > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, item)
+
+    # ====================================================================================
+    # JSON-ready summary, attached to metadata events
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {
+                "spans_ms": {name: round(seconds * 1000, 4) for name, (seconds, _) in self.spans.items()},
+                "span_counts": {name: count for name, (_, count) in self.spans.items() if count},
+                "counters": dict(self.counters),
+            }
+            hashing_wall = self.spans.get("hashing_wall", [0.0])[0]
+            if hashing_wall > 0 and "bytes_hashed" in self.counters:
+                snapshot["hashing_mb_per_second"] = round(self.counters["bytes_hashed"] / (1024 * 1024) /
+                                                          hashing_wall, 2)
+                snapshot["hashing_files_per_second"] = round(self.counters.get("files_hashed", 0) /
+                                                             hashing_wall, 2)
+            if self.slowest_files > 0:
+                snapshot["slowest_files"] = [
+                    {"path": path, "ms": round(seconds * 1000, 4), "bytes": size}
+                    for seconds, path, size in sorted(self._slowest, reverse=True)]
+            return snapshot
+
+    # ====================================================================================
+    # Prometheus text exposition format; labels identify the action and preset the numbers belong to
+    def to_prometheus(self, labels: Optional[dict] = None, prefix: str = METRICS_PREFIX) -> str:
+        snapshot = self.snapshot()
+        base = dict(labels or {})
+        if self.action:
+            base.setdefault("action", self.action)
+
+        lines = [f"# HELP {prefix}_span_seconds_total Time spent per phase of the last action.",
+                 f"# TYPE {prefix}_span_seconds_total counter"]
+        for name, ms in sorted(snapshot["spans_ms"].items()):
+            lines.append(f"{prefix}_span_seconds_total{_labels({**base, 'span': name})} {ms / 1000:.6f}")
+        lines += [f"# HELP {prefix}_span_calls_total Number of times each phase ran (files for open/read/hash).",
+                  f"# TYPE {prefix}_span_calls_total counter"]
+        for name, count in sorted(snapshot["span_counts"].items()):
+            lines.append(f"{prefix}_span_calls_total{_labels({**base, 'span': name})} {count}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter",
+                      f"{prefix}_{name}_total{_labels(base)} {value}"]
+        if snapshot.get("slowest_files"):
+            lines += [f"# HELP {prefix}_slowest_file_seconds Slowest files to hash in the last action.",
+                      f"# TYPE {prefix}_slowest_file_seconds gauge"]
+            for entry in snapshot["slowest_files"]:
+                lines.append(f"{prefix}_slowest_file_seconds{_labels({**base, 'path': entry['path']})} "
+                             f"{entry['ms'] / 1000:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, labels: Optional[dict] = None) -> None:
+        tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(labels))
+        os.replace(tmp_path, path)  # scrapers (e.g. node_exporter's textfile collector) never see half a file
+
+
+# ====================================================================================
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+
+#====================================================================================
+# Device-aware scheduling of file reads for HashEngine (thread executor). Files are grouped by the device
+# they live on (st_dev) and every device gets its own lane: a thread pool with a concurrency limit and read
+# size that suit the medium. An SSD takes many parallel reads, a spinning disk wants one or two sequential
+# readers (and reads ordered by inode, a cheap proxy for position on disk), a network share wants a few
+# requests in flight to hide latency. Each lane then tunes its limit by hill climbing on the throughput it
+# observes, so a folder spanning an SSD and a NAS runs each device at its own pace.
+IO_SCHEDULERS = ('auto', 'off')
+DEVICE_KINDS = ('ssd', 'rotational', 'network', 'unknown')
+NETWORK_FILESYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'afs', 'ceph', 'glusterfs', 'lustre',
+                       'fuse.sshfs', 'fuse.rclone', 'davfs')
+MEMORY_FILESYSTEMS = ('tmpfs', 'ramfs')  # no block device behind them, but no seek cost either
+LOCALITY_WINDOW = 256        # files gathered per rotational lane before they are sorted by inode and submitted
+ADAPT_EVERY_SECONDS = 2.0    # a lane re-evaluates its concurrency limit this often...
+ADAPT_MIN_FILES = 16         # ...once it has finished at least this many files in the interval
+ADAPT_TOLERANCE = 0.05       # throughput changes smaller than this are noise
+
+
+@dataclass
+class DeviceProfile:
+    initial: int                # concurrent reads to start with
+    maximum: int                # the lane never goes above this
+    read_size: Optional[int]    # readinto buffer for large files; None keeps HashEngine's default
+    ordered: bool               # submit reads in inode order (spinning disks)
+
+
+# Starting points per device kind; the limits are only where the tuning starts and stops
+def profile_for(kind: str, workers: int) -> DeviceProfile:
+    if kind == 'rotational':
+        return DeviceProfile(initial=1, maximum=min(workers, 2), read_size=4 * 1024 * 1024, ordered=True)
+    if kind == 'network':
+        return DeviceProfile(initial=min(workers, 4), maximum=max(workers, 16), read_size=1024 * 1024,
+                             ordered=False)
+    if kind == 'ssd':
+        return DeviceProfile(initial=workers, maximum=workers * 2, read_size=None, ordered=False)
+    return DeviceProfile(initial=workers, maximum=workers, read_size=None, ordered=False)
+
+
+# ====================================================================================
+# What kind of device a file lives on. Linux: network filesystems from the mount table, rotational from
+# sysfs. Elsewhere only UNC paths (\\server\share) are recognised, everything else is 'unknown'.
+def device_kind(st_dev: int, path: str = "") -> str:
+    if os.name == 'nt':
+        return 'network' if path.startswith('\\\\') else 'unknown'
+    try:
+        major, minor = os.major(st_dev), os.minor(st_dev)
+    except (AttributeError, ValueError):
+        return 'unknown'
+    return _linux_device_kind(major, minor)
+
+
+@lru_cache(maxsize=None)
+def _linux_device_kind(major: int, minor: int) -> str:
+    fstype = _mount_types().get(f"{major}:{minor}")
+    if fstype in NETWORK_FILESYSTEMS:
+        return 'network'
+    if fstype in MEMORY_FILESYSTEMS:
+        return 'ssd'
+    # partitions have no queue/ of their own, their parent device does
+    for path in (f"/sys/dev/block/{major}:{minor}/queue/rotational",
+                 f"/sys/dev/block/{major}:{minor}/../queue/rotational"):
+        try:
+            with open(path, "r") as f:
+                return 'rotational' if f.read().strip() == '1' else 'ssd'
+        except OSError:
+            continue
+    return 'unknown'
+
+
+@lru_cache(maxsize=1)
+def _mount_types() -> Dict[str, str]:
+    # /proc/self/mountinfo: "36 35 98:0 /root /mnt rw,noatime shared:1 - ext4 /dev/sda1 rw"
+    types = {}
+    try:
+        with open("/proc/self/mountinfo", "r") as f:
+            for line in f:
+                fields, _, rest = line.partition(" - ")
+                parts = fields.split()
+                if len(parts) > 2 and rest:
+                    types[parts[2]] = rest.split()[0]
+    except OSError:
+        pass
+    return types
+
+
+class DeviceLane:
+    """Reads for one device: a thread pool gated by an adaptive concurrency limit."""
+
+    # ====================================================================================
+    def __init__(self, device: int, kind: str, profile: DeviceProfile):
+        self.device = device
+        self.kind = kind
+        self.profile = profile
+        self.limit = profile.initial
+        self._pool = ThreadPoolExecutor(max_workers=profile.maximum, thread_name_prefix=f"hit-io-{kind}")
+        self._cond = threading.Condition()
+        self._active = 0
+        self._deferred: List[tuple] = []  # (inode, target future, fn, args, size) waiting for locality ordering
+        self._deferred_lock = threading.Lock()  # several map() calls may share a lane (batch runs)
+
+        self.files = 0
+        self.bytes = 0
+        self._started = time.monotonic()
+        self._interval_start = self._started
+        self._interval_files = 0
+        self._interval_bytes = 0
+        self._last_rate: Optional[float] = None
+        self._direction = 1
+
+    # ====================================================================================
+    # Runs fn(*args) on this lane. size feeds the throughput estimate. On ordered lanes the call waits in a
+    # window until flush() (or a full window) submits it in inode order; the returned Future covers both.
+    def submit(self, fn: Callable, args: tuple, size: int, inode: int = 0) -> Future:
+        if not self.profile.ordered:
+            return self._pool.submit(self._run, fn, args, size)
+        target = Future()
+        with self._deferred_lock:
+            self._deferred.append((inode, target, fn, args, size))
+            full = len(self._deferred) >= LOCALITY_WINDOW
+        if full:
+            self.flush()
+        return target
+
+    def flush(self) -> None:
+        with self._deferred_lock:
+            deferred, self._deferred = self._deferred, []
+        for _, target, fn, args, size in sorted(deferred, key=lambda item: item[0]):
+            if target.cancelled():
+                continue
+            self._pool.submit(self._run, fn, args, size).add_done_callback(
+                lambda source, target=target: _copy_outcome(source, target))
+
+    def _run(self, fn: Callable, args: tuple, size: int):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._finished(size)
+                self._cond.notify_all()
+
+    # ====================================================================================
+    # Hill climbing: keep moving the limit in the direction that raised throughput, turn around when it fell
+    def _finished(self, size: int) -> None:
+        self.files += 1
+        self.bytes += size
+        self._interval_files += 1
+        self._interval_bytes += size
+        now = time.monotonic()
+        elapsed = now - self._interval_start
+        if elapsed < ADAPT_EVERY_SECONDS or self._interval_files < ADAPT_MIN_FILES:
+            return
+
+        rate = self._interval_bytes / elapsed
+        if self._last_rate is not None and rate < self._last_rate * (1 - ADAPT_TOLERANCE):
+            self._direction = -self._direction
+        if self._last_rate is None or abs(rate - self._last_rate) > self._last_rate * ADAPT_TOLERANCE:
+            self.limit = max(1, min(self.profile.maximum, self.limit + self._direction))
+        self._last_rate = rate
+        self._interval_start = now
+        self._interval_files = 0
+        self._interval_bytes = 0
+
+    # ====================================================================================
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self._started
+        return {
+            "device": self.device,
+            "kind": self.kind,
+            "concurrency": self.limit,
+            "max_concurrency": self.profile.maximum,
+            "read_size": self.profile.read_size,
+            "files": self.files,
+            "bytes": self.bytes,
+            "mb_per_second": round(self.bytes / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
+        }
+
+    def close(self, cancel: bool = False) -> None:
+        if not cancel:
+            self.flush()  # nothing may be left waiting for a window that no longer fills
+        else:
+            # taken under the lock like in flush(): another map() sharing the lane may still be submitting
+            with self._deferred_lock:
+                deferred, self._deferred = self._deferred, []
+            for _, target, _, _, _ in deferred:
+                target.cancel()
+        self._pool.shutdown(wait=True, cancel_futures=cancel)
+
+
+class IoScheduler:
+    """One DeviceLane per st_dev, created on first use."""
+
+    # ====================================================================================
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.lanes: Dict[int, DeviceLane] = {}
+        self._lock = threading.Lock()
+
+    def lane_for(self, path: str, st: os.stat_result) -> DeviceLane:
+        lane = self.lanes.get(st.st_dev)
+        if lane is None:
+            with self._lock:
+                lane = self.lanes.get(st.st_dev)
+                if lane is None:
+                    kind = device_kind(st.st_dev, path)
+                    lane = self.lanes[st.st_dev] = DeviceLane(st.st_dev, kind, profile_for(kind, self.workers))
+        return lane
+
+    def snapshot(self) -> List[dict]:
+        return [lane.snapshot() for lane in list(self.lanes.values())]
+
+    def close(self, cancel: bool = False) -> None:
+        for lane in list(self.lanes.values()):
+            lane.close(cancel)
+
+
+# ====================================================================================
+def _copy_outcome(source: Future, target: Future) -> None:
+    if target.cancelled():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from HashEngine import HashingCancelled
+
+
+#====================================================================================
+PROGRESS_INTERVAL_SECONDS = 0.05  # at most ~20 progress events per second reach the UI
+
+
+@dataclass
+class JobProgress:
+    files_done: int
+    files_total: Optional[int]  # None while the walk that counts the files is still going
+    bytes_done: int
+    elapsed_seconds: float
+
+    @property
+    def fraction(self) -> float:
+        return min(1.0, self.files_done / self.files_total) if self.files_total else 0.0  # unknown: 0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_done / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def describe(self) -> str:
+        total = "?" if self.files_total is None else self.files_total
+        return (f"{self.files_done}/{total} files, {self.bytes_done / (1024 * 1024):.1f} MiB, "
+                f"{self.bytes_per_second / (1024 * 1024):.1f} MiB/s")
+
+
+class JobRunner:
+    """Runs one Model job at a time on a worker thread.
+
+    Everything the job reports (log lines, progress, completion) goes through a thread-safe queue that the
+    UI thread drains once per frame, so DearPyGui is only ever touched from the UI thread.
+    Events are (kind, payload) tuples with kind one of 'log', 'progress', 'done', 'cancelled', 'error'.
+    """
+
+    # ====================================================================================
+    def __init__(self):
+        self.events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        self.cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._job_name = ""
+        self._started_at = 0.0
+        self._last_progress_at = 0.0
+
+    # ====================================================================================
+    def is_busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # Starts fn() on a worker thread. Returns False if a job is already running.
+    def start(self, name: str, fn: Callable[[], Any]) -> bool:
+        if self.is_busy():
+            return False
+        self.cancel_event.clear()
+        self._job_name = name
+        self._started_at = time.perf_counter()
+        self._last_progress_at = 0.0
+        self._thread = threading.Thread(target=self._run, args=(fn,), name=f"hit-job-{name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    # ====================================================================================
+    def _run(self, fn: Callable[[], Any]) -> None:
+        try:
+            result = fn()
+            if self.cancel_event.is_set():
+                self.events.put(("cancelled", self._job_name))
+            else:
+                self.events.put(("done", (self._job_name, result)))
+        except HashingCancelled:
+            self.events.put(("cancelled", self._job_name))
+        except Exception as e:
+            traceback.print_exc()
+            self.events.put(("error", (self._job_name, e)))
+
+    # ====================================================================================
+    # Thread-safe sinks handed to the Model
+    def log(self, msg: str) -> None:
+        self.events.put(("log", msg))
+
+    def progress(self, files_done: int, files_total: Optional[int], bytes_done: int) -> None:
+        now = time.perf_counter()
+        last = files_total is not None and files_done >= files_total
+        if not last and now - self._last_progress_at < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_progress_at = now
+        self.events.put(("progress", JobProgress(files_done, files_total, bytes_done, now - self._started_at)))
+
+    # ====================================================================================
+    # Called by the UI thread each frame. Only the newest progress event of a batch is kept.
+    def drain(self, max_events: int = 10_000) -> List[Tuple[str, Any]]:
+        drained = []
+        latest_progress = None
+        for _ in range(max_events):
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest_progress = payload
+                continue
+            drained.append((kind, payload))
+
+        if latest_progress is not None:
+            # progress goes before a completion event so the bar ends full
+            index = next((i for i, (kind, _) in enumerate(drained) if kind != "log"), len(drained))
+            drained.insert(index, ("progress", latest_progress))
+        return drained
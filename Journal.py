@@ -0,0 +1,149 @@
+import json
+import os
+import sys
+from typing import Iterator, Optional
+
+
+#====================================================================================
+# Metadata is kept as append-only JSON Lines: one event per line, written with a single O_APPEND write.
+# Appending costs the same however long the history is, and a crash can at worst leave a torn last
+# line, which readers skip.
+JOURNAL_EXTENSION = '.jsonl'
+LEGACY_EXTENSION = '.json'
+MIGRATED_SUFFIX = '.migrated'
+DEFAULT_MAX_JOURNAL_BYTES = 64 * 1024 * 1024  # rotate once a journal grows past this
+DEFAULT_ROTATIONS_KEPT = 5
+
+
+# ====================================================================================
+# Appends one event. journal_path ends in .jsonl; a legacy .json list next to it is migrated first.
+def append_event(journal_path: str, event: dict, fsync: bool = False,
+                 max_bytes: int = DEFAULT_MAX_JOURNAL_BYTES) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+    migrate_legacy(journal_path)
+
+    try:
+        if max_bytes and os.path.getsize(journal_path) >= max_bytes:
+            rotate(journal_path)
+    except FileNotFoundError:
+        pass
+
+    line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+    fd = os.open(journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ====================================================================================
+# Yields the events of a journal in order, skipping a torn or corrupt line instead of failing.
+def read_events(journal_path: str) -> Iterator[dict]:
+    if not os.path.isfile(journal_path):
+        return
+    with open(journal_path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+# ====================================================================================
+# Converts the old read-modify-rewrite .json list into the journal, once. The old file is kept as .migrated.
+def migrate_legacy(journal_path: str) -> bool:
+    legacy_path = os.path.splitext(journal_path)[0] + LEGACY_EXTENSION
+    if not os.path.isfile(legacy_path):
+        return False
+
+    try:
+        with open(legacy_path, "r") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            data = [data]  # convert old single object to list
+    except json.JSONDecodeError:
+        data = []
+
+    # old history goes in front of anything already journaled
+    existing = list(read_events(journal_path))
+    _write_atomic(journal_path, data + existing)
+    os.replace(legacy_path, legacy_path + MIGRATED_SUFFIX)
+    return True
+
+
+# ====================================================================================
+# Moves journal -> journal.1 -> journal.2 ... keeping the newest `keep` rotations.
+def rotate(journal_path: str, keep: int = DEFAULT_ROTATIONS_KEPT) -> None:
+    if not os.path.isfile(journal_path):
+        return
+    oldest = f"{journal_path}.{keep}"
+    if os.path.isfile(oldest):
+        os.remove(oldest)
+    for i in range(keep - 1, 0, -1):
+        if os.path.isfile(f"{journal_path}.{i}"):
+            os.replace(f"{journal_path}.{i}", f"{journal_path}.{i + 1}")
+    os.replace(journal_path, f"{journal_path}.1")
+
+
+# ====================================================================================
+# Rewrites a journal without corrupt lines, optionally keeping only the newest events. Returns events kept.
+def compact(journal_path: str, keep_last: Optional[int] = None) -> int:
+    migrate_legacy(journal_path)
+    events = list(read_events(journal_path))
+    if keep_last is not None:
+        events = events[-keep_last:] if keep_last > 0 else []
+    _write_atomic(journal_path, events)
+    return len(events)
+
+
+def _write_atomic(journal_path: str, events: list) -> None:
+    tmp_path = f"{journal_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+
+
+#====================================================================================
+# python Journal.py migrate <metadata folder>
+# python Journal.py compact <journal.jsonl>... [--keep-last N]
+# python Journal.py rotate <journal.jsonl>... [--keep N]
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain H.I.T. metadata journals.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate", help="convert every legacy .json metadata file in a folder")
+    migrate_parser.add_argument("folder")
+    compact_parser = sub.add_parser("compact", help="drop corrupt lines and optionally old events")
+    compact_parser.add_argument("paths", nargs="+")
+    compact_parser.add_argument("--keep-last", type=int, default=None)
+    rotate_parser = sub.add_parser("rotate", help="start a fresh journal, keeping numbered rotations")
+    rotate_parser.add_argument("paths", nargs="+")
+    rotate_parser.add_argument("--keep", type=int, default=DEFAULT_ROTATIONS_KEPT)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "migrate":
+            for name in sorted(os.listdir(args.folder)):
+                if name.endswith(LEGACY_EXTENSION):
+                    journal = os.path.join(args.folder, os.path.splitext(name)[0] + JOURNAL_EXTENSION)
+                    if migrate_legacy(journal):
+                        print(f"[OK] migrated {name}")
+        elif args.command == "compact":
+            for path in args.paths:
+                print(f"[OK] {path}: {compact(path, args.keep_last)} events kept")
+        elif args.command == "rotate":
+            for path in args.paths:
+                rotate(path, args.keep)
+                print(f"[OK] rotated {path}")
+    except OSError as e:
+        print(f"[Error] {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,70 @@
+import logging
+import logging.handlers
+import os
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+#====================================================================================
+LOG_FOLDER = './logs'
+LOG_FILENAME = 'hit.log'
+DEFAULT_MAX_LINES = 5000  # lines kept for the on-screen log; the file keeps everything
+DEFAULT_LOG_FILE_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_FILE_BACKUPS = 5
+
+
+class LogSink:
+    """Bounded on-screen log plus a rotating log file.
+
+    write() only appends to a ring buffer and is cheap from any thread. The UI calls flush() once per
+    frame, which pushes the buffer to the widget only if something changed since the last frame.
+    """
+
+    # ====================================================================================
+    def __init__(self, max_lines: int = DEFAULT_MAX_LINES, log_folder: Optional[str] = LOG_FOLDER,
+                 max_bytes: int = DEFAULT_LOG_FILE_BYTES, backups: int = DEFAULT_LOG_FILE_BACKUPS):
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._file_logger = None
+
+        if log_folder:
+            os.makedirs(log_folder, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_folder, LOG_FILENAME), maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._file_logger = logging.getLogger("hit.log_sink")
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.propagate = False
+            if not self._file_logger.handlers:
+                self._file_logger.addHandler(handler)
+
+    # ====================================================================================
+    # Same semantics as the old View.log: newline=True starts a new line, False continues the last one.
+    def write(self, msg: str, newline: bool = True) -> None:
+        parts = msg.split("\n")
+        with self._lock:
+            if not newline and self._lines:
+                self._lines[-1] += parts.pop(0)
+            self._lines.extend(parts)
+            self._dirty = True
+
+        if self._file_logger is not None and msg.strip():
+            self._file_logger.info(msg.strip("\n"))
+
+    # ====================================================================================
+    # Pushes the buffer to the widget if it changed. Returns True when set_text was called.
+    def flush(self, set_text: Callable[[str], None]) -> bool:
+        with self._lock:
+            if not self._dirty:
+                return False
+            text = "\n".join(self._lines)
+            self._dirty = False
+        set_text(text)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lines.clear()
+            self._dirty = True
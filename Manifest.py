@@ -0,0 +1,162 @@
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PresetFormat import PresetFormatError
+
+
+#====================================================================================
+# Path-keyed manifest, stored next to the flat preset as <preset>.manifest.tsv. The flat preset only
+# answers "is this content known"; the manifest maps every relative path to (size, mtime_ns, digest), so
+# verification can tell what was modified, added, removed or moved. Layout: one JSON header line, then one
+# line per file, in path order:
+#   <hex digest> TAB <size> TAB <mtime_ns> TAB <rel path, with \, TAB and newlines backslash-escaped>
+MANIFEST_FORMAT = 'hit-manifest'
+MANIFEST_FORMAT_VERSION = 1
+DIFF_REPORT_FORMAT = 'hit-manifest-diff'
+
+_ESCAPES = (("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r"))
+
+
+@dataclass
+class ManifestDiff:
+    unchanged: int = 0
+    modified: List[Tuple[str, str, str]] = field(default_factory=list)   # (path, stored digest, current digest)
+    added: List[Tuple[str, str]] = field(default_factory=list)           # (path, digest), new and not a move
+    missing: List[Tuple[str, str]] = field(default_factory=list)         # (path, digest), gone with its content
+    moved: List[Tuple[str, str, str]] = field(default_factory=list)      # (old path, new path, digest)
+    duplicates: int = 0  # files in the folder whose content also sits at another path of the folder
+
+    @property
+    def failed(self) -> List[str]:
+        return ([path for path, _, _ in self.modified] + [path for path, _ in self.added] +
+                [path for path, _ in self.missing])
+
+    def counts(self) -> dict:
+        return {"unchanged": self.unchanged, "modified": len(self.modified), "added": len(self.added),
+                "missing": len(self.missing), "moved": len(self.moved), "duplicates": self.duplicates}
+
+
+# ====================================================================================
+def _escape(rel_path: str) -> str:
+    for raw, escaped in _ESCAPES:
+        rel_path = rel_path.replace(raw, escaped)
+    return rel_path
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    out, i = [], 0
+    while i < len(text):
+        if text[i] == "\\" and i + 1 < len(text):
+            out.append({"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}.get(text[i + 1], text[i + 1]))
+            i += 2
+        else:
+            out.append(text[i])
+            i += 1
+    return "".join(out)
+
+
+# ====================================================================================
+# Streams (rel_path, hex digest, size, mtime_ns) entries to a manifest; temp file then rename, like presets
+def write_manifest(path: str, entries: Iterable[Tuple[str, str, int, int]], algorithm: str,
+                   count: Optional[int] = None) -> int:
+    tmp_path = f"{path}.tmp"
+    written = 0
+    with open(tmp_path, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+        f.write(json.dumps({"format": MANIFEST_FORMAT, "version": MANIFEST_FORMAT_VERSION,
+                            "algorithm": algorithm, "entries": count}) + "\n")
+        for rel_path, digest, size, mtime_ns in entries:
+            f.write(f"{digest}\t{size}\t{mtime_ns}\t{_escape(rel_path)}\n")
+            written += 1
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return written
+
+
+# Header dict and an iterator of (rel_path, hex digest, size, mtime_ns); None if there is no manifest
+def read_manifest(path: str) -> Optional[Tuple[dict, Iterator[Tuple[str, str, int, int]]]]:
+    if not os.path.isfile(path):
+        return None
+    f = open(path, "r", encoding="utf-8", errors="surrogateescape", newline="\n")
+    try:
+        header = json.loads(f.readline())
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != MANIFEST_FORMAT:
+        f.close()
+        raise PresetFormatError(f"Not a manifest: {path}")
+    if header.get("version") != MANIFEST_FORMAT_VERSION:
+        f.close()
+        raise PresetFormatError(f"Unsupported manifest version {header.get('version')}: {path}")
+
+    def entries():
+        with f:
+            for line_number, line in enumerate(f, start=2):
+                try:
+                    digest, size, mtime_ns, rel_path = line.rstrip("\n").split("\t", 3)
+                    size, mtime_ns = int(size), int(mtime_ns)
+                except ValueError:
+                    raise PresetFormatError(f"Malformed manifest line {line_number}: {path}") from None
+                yield _unescape(rel_path), digest, size, mtime_ns
+    return header, entries()
+
+
+# ====================================================================================
+# Single-pass hash join. The stored side is loaded into a dict keyed by path, the current side is streamed
+# (e.g. straight from hashing), and every probe is O(1), so the whole diff is linear in the entry count.
+# Paths that are new, and stored paths never seen, are then paired up by digest: a pair is a move.
+def diff_manifest(stored: Iterable[Tuple[str, str, int, int]],
+                  current: Iterable[Tuple[str, str, int, int]]) -> ManifestDiff:
+    remaining: Dict[str, str] = {rel_path: digest for rel_path, digest, _, _ in stored}
+    diff = ManifestDiff()
+    seen_digests = Counter()
+    new_paths: List[Tuple[str, str]] = []
+
+    for rel_path, digest, _, _ in current:
+        seen_digests[digest] += 1
+        stored_digest = remaining.pop(rel_path, None)
+        if stored_digest is None:
+            new_paths.append((rel_path, digest))
+        elif stored_digest == digest:
+            diff.unchanged += 1
+        else:
+            diff.modified.append((rel_path, stored_digest, digest))
+
+    # what is left in remaining was not found at its path: pair it with new paths of the same content
+    vanished: Dict[str, List[str]] = {}
+    for rel_path, digest in remaining.items():
+        vanished.setdefault(digest, []).append(rel_path)
+    for rel_path, digest in new_paths:
+        old_paths = vanished.get(digest)
+        if old_paths:
+            diff.moved.append((old_paths.pop(), rel_path, digest))
+        else:
+            diff.added.append((rel_path, digest))
+    diff.missing = [(rel_path, digest) for digest, paths in vanished.items() for rel_path in paths]
+    diff.missing.sort()
+    diff.duplicates = sum(count for count in seen_digests.values() if count > 1)
+    return diff
+
+
+# ====================================================================================
+# Compact diff report: a JSON header with the counts, then one JSON line per change (unchanged files are
+# only counted). Rewritten on every run, next to the metadata journals.
+def write_diff_report(path: str, diff: ManifestDiff, header: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+        f.write(json.dumps({"format": DIFF_REPORT_FORMAT, **header, **diff.counts()}) + "\n")
+        for rel_path, old, new in diff.modified:
+            f.write(json.dumps({"status": "modified", "path": rel_path, "stored": old, "current": new}) + "\n")
+        for rel_path, digest in diff.added:
+            f.write(json.dumps({"status": "added", "path": rel_path, "digest": digest}) + "\n")
+        for rel_path, digest in diff.missing:
+            f.write(json.dumps({"status": "missing", "path": rel_path, "digest": digest}) + "\n")
+        for old, new, digest in diff.moved:
+            f.write(json.dumps({"status": "moved", "from": old, "path": new, "digest": digest}) + "\n")
+    os.replace(tmp_path, path)
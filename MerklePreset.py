@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+
+#====================================================================================
+# Optional hierarchical preset, stored next to the flat preset as <preset>.merkle.json.
+# Files keep their digest, size and mtime; every directory node keeps
+#   digest      - hash of its children's names and digests (content identity of the subtree)
+#   fingerprint - hash of its children's names, sizes and mtimes, recursively (cheap stat identity)
+# Verification stats every file (an in-place edit shows nowhere else), skips every subtree whose fingerprint
+# is unchanged and reads only files whose stat differs. The directory digests, recomputed from what was read,
+# then confirm the subtrees whose content is the same after all and lead straight to the files that changed.
+# A deep diff reads every file instead and relies on the digests alone, so it also catches content that
+# changed under an unchanged stat (bit rot, restored mtimes).
+MERKLE_FORMAT_VERSION = 3
+MERKLE_READABLE_VERSIONS = (1, 2, 3)  # 1 is the same layout; 2 had no directory digests, they are rebuilt
+
+
+@dataclass
+class MerkleDiff:
+    modified: List[str] = field(default_factory=list)   # same path, different content
+    added: List[str] = field(default_factory=list)      # in the folder, not in the preset
+    missing: List[str] = field(default_factory=list)    # in the preset, not in the folder
+    files_hashed: int = 0
+    dirs_skipped: int = 0    # fingerprint unchanged, not looked into
+    dirs_confirmed: int = 0  # looked into, and the content digest still matches
+
+    @property
+    def failed(self) -> List[str]:
+        return self.modified + self.added + self.missing
+
+
+# ====================================================================================
+def _file_fingerprint_part(name: str, size: int, mtime_ns: int) -> bytes:
+    return f"F{name}\0{size}\0{mtime_ns}\n".encode("utf-8", "surrogateescape")
+
+
+def _node_hashes(node: dict) -> Tuple[str, str]:
+    digest = hashlib.sha256()
+    fingerprint = hashlib.sha256()
+    for name in sorted(node["files"]):
+        entry = node["files"][name]
+        digest.update(f"F{name}\0{entry['digest']}\n".encode("utf-8", "surrogateescape"))
+        fingerprint.update(_file_fingerprint_part(name, entry["size"], entry["mtime_ns"]))
+    for name in sorted(node["dirs"]):
+        child = node["dirs"][name]
+        digest.update(f"D{name}\0{child['digest']}\n".encode("utf-8", "surrogateescape"))
+        fingerprint.update(f"D{name}\0{child['fingerprint']}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest(), fingerprint.hexdigest()
+
+
+def _new_node() -> dict:
+    return {"digest": "", "fingerprint": "", "files": {}, "dirs": {}}
+
+
+# kept: ids of subtrees whose hashes are already right (taken over from the stored tree by diff_tree)
+def _finalize(node: dict, kept: frozenset = frozenset()) -> None:
+    for child in node["dirs"].values():
+        if id(child) not in kept:
+            _finalize(child, kept)
+    node["digest"], node["fingerprint"] = _node_hashes(node)
+
+
+# ====================================================================================
+# Builds the tree from (rel_path, digest, size, mtime_ns) entries of the files in a preset.
+def build_tree(entries: Iterable[Tuple[str, str, int, int]]) -> dict:
+    root = _new_node()
+    for rel_path, digest, size, mtime_ns in entries:
+        parts = rel_path.replace(os.sep, "/").split("/")
+        node = root
+        for part in parts[:-1]:
+            node = node["dirs"].setdefault(part, _new_node())
+        node["files"][parts[-1]] = {"digest": digest, "size": size, "mtime_ns": mtime_ns}
+    _finalize(root)
+    return root
+
+
+def write_tree(path: str, tree: dict, algorithm: str = "sha256") -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MERKLE_FORMAT_VERSION, "algorithm": algorithm, "root": tree}, f,
+                  separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+# Returns (root, algorithm the file digests were made with), or None.
+def load_tree(path: str) -> Optional[Tuple[dict, str]]:
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") not in MERKLE_READABLE_VERSIONS:
+        return None
+    if data["version"] == 2:
+        _finalize(data["root"])  # the file digests are there, the directory digests follow from them
+    return data["root"], data.get("algorithm", "sha256")
+
+
+# ====================================================================================
+# Stat-only tree of the folder as it is now, from (rel_path, size, mtime_ns) entries (e.g. the Walker's,
+# so the include/exclude rules are the same as when the preset was made): a preset's shape, without digests.
+def scan_tree(entries: Iterable[Tuple[str, int, int]]) -> dict:
+    return build_tree((rel_path, "", size, mtime_ns) for rel_path, size, mtime_ns in entries)
+
+
+def _all_files(node: dict, rel_dir: str) -> Iterable[str]:
+    for name in sorted(node["files"]):
+        yield f"{rel_dir}{name}"
+    for name in sorted(node["dirs"]):
+        yield from _all_files(node["dirs"][name], f"{rel_dir}{name}/")
+
+
+# ====================================================================================
+# Compares a folder against a stored tree. Only files whose stat differs from the preset are hashed (with
+# deep=True, every file whose size still matches), all at once through hash_many(full_paths) -> iterator of
+# (full_path, hex digest), e.g. HashEngine.map. current is the folder's scan_tree(); it is filled in with
+# the digests known or read, and its directory digests are compared with the stored ones.
+def diff_tree(stored: dict, current: dict, folder: str,
+              hash_many: Callable[[Iterable[str]], Iterator[Tuple[str, str]]], deep: bool = False) -> MerkleDiff:
+    diff = MerkleDiff()
+    if not deep and stored["fingerprint"] == current["fingerprint"]:
+        diff.dirs_skipped += 1
+        return diff
+
+    suspects = {}  # full_path -> the file's entry in current, whose digest is still to be read
+    kept = set()   # ids of the stored subtrees taken over as they are
+    _diff_node(stored, current, folder, "", suspects, kept, diff, deep)
+    for full_path, digest in hash_many(list(suspects)):
+        suspects[full_path]["digest"] = digest
+        diff.files_hashed += 1
+
+    _finalize(current, frozenset(kept))
+    _localize(stored, current, "", diff)
+    return diff
+
+
+# Structure: what was added or removed, and which files have to be read
+def _diff_node(stored: dict, current: dict, folder: str, rel_dir: str, suspects: dict, kept: set,
+               diff: MerkleDiff, deep: bool) -> None:
+    for name in sorted(set(stored["files"]) | set(current["files"])):
+        rel_path = f"{rel_dir}{name}"
+        old, new = stored["files"].get(name), current["files"].get(name)
+        if new is None:
+            diff.missing.append(rel_path)
+        elif old is None:
+            diff.added.append(rel_path)
+        elif old["size"] != new["size"]:
+            new["digest"] = ""  # a different size can't be the same content, not worth reading
+        elif not deep and old["mtime_ns"] == new["mtime_ns"]:
+            new["digest"] = old["digest"]
+        else:
+            suspects[os.path.join(folder, *rel_path.split("/"))] = new
+
+    for name in sorted(set(stored["dirs"]) | set(current["dirs"])):
+        old, new = stored["dirs"].get(name), current["dirs"].get(name)
+        if new is None:
+            diff.missing.extend(_all_files(old, f"{rel_dir}{name}/"))
+        elif old is None:
+            diff.added.extend(_all_files(new, f"{rel_dir}{name}/"))
+        elif not deep and old["fingerprint"] == new["fingerprint"]:
+            current["dirs"][name] = old
+            kept.add(id(old))
+            diff.dirs_skipped += 1
+        else:
+            _diff_node(old, new, folder, f"{rel_dir}{name}/", suspects, kept, diff, deep)
+
+
+# Content: a directory whose digest matches is confirmed as a whole, the others are descended into
+def _localize(stored: dict, current: dict, rel_dir: str, diff: MerkleDiff) -> None:
+    if stored is current:
+        return  # skipped on its fingerprint
+    if stored["digest"] == current["digest"]:
+        diff.dirs_confirmed += 1
+        return
+    for name in sorted(set(stored["files"]) & set(current["files"])):
+        if stored["files"][name]["digest"] != current["files"][name]["digest"]:
+            diff.modified.append(f"{rel_dir}{name}")
+    for name in sorted(set(stored["dirs"]) & set(current["dirs"])):
+        _localize(stored["dirs"][name], current["dirs"][name], f"{rel_dir}{name}/", diff)
@@ -1,11 +1,40 @@
 import hashlib
 import json
+import math
 import os
+import sqlite3
+import threading
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timezone
 import time
 import inspect
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from Archives import hash_members
+from HashCache import CACHE_FOLDER, DEFAULT_CACHE_MAX_ENTRIES, HashCache
+from HashEngine import (DEFAULT_HASH_ALGORITHM, DEFAULT_HASH_WORKERS, CancelAny, HashEngine, check_algorithm,
+                        hash_file)
+from Instrumentation import DEFAULT_SLOWEST_FILES, Instrumentation
+from Journal import JOURNAL_EXTENSION, append_event, read_events
+from PresetFormat import (BINARY_PRESET_EXTENSION, PRESET_EXTENSIONS, BinaryPreset, PresetFormatError,
+                          MANIFEST_SUFFIX, MERKLE_SUFFIX, QUICK_SUFFIX, write_sorted_digests)
+from Manifest import ManifestDiff, diff_manifest, read_manifest, write_diff_report, write_manifest
+from MerklePreset import MerkleDiff, build_tree, diff_tree, load_tree, scan_tree, write_tree
+from PresetCatalog import PresetCatalog, rank_matches
+from PresetCheckpoint import PresetCheckpoint
+from PresetIndex import build_preset_index
+from PresetLibrary import PresetLibrary
+from QuickCheck import load_quick_index, quick_key, write_sorted_quick_index
+from SpotCheck import (DEFAULT_CONFIDENCE, DEFAULT_TOLERATED_RATE, corruption_upper_bound, load_state,
+                       sample_size, save_state, select_sample)
+from Walker import ArchiveEntry, Walker, WalkEntry
+from WatchOptions import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_POLL_INTERVAL_SECONDS
+
+if TYPE_CHECKING:
+    from Watch import FolderWatch  # imported lazily in _watch(): only watch mode needs it
 
 
 #====================================================================================
@@ -15,13 +44,49 @@ METADATA_FOLDER = './metadata'
 PRESET_PREFIX = 'hashes_preset_'
 METADATA_FOR_HASHES_PREFIX = 'metadata_for_hashes_preset_'
 METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX= 'metadata_for_hash_comparison_with_preset_'
+METADATA_FOR_WATCH_PREFIX = 'metadata_for_watch_of_preset_'
+METADATA_FOR_CATALOG_MATCH = 'metadata_for_catalog_match'
+MANIFEST_DIFF_PREFIX = 'manifest_diff_of_preset_'
+SPOT_CHECK_STATE_FOLDER = f'{METADATA_FOLDER}/spot_check'  # not next to the journals: *.json there is legacy
 HIT_VERSION = '1.0.0'
 
+# How much the model logs per file: QUIET only errors and results, SUMMARY a line every
+# LOG_SUMMARY_EVERY files plus a total, FILES one entry per file (the original behaviour).
+VERBOSITY_QUIET = 0
+VERBOSITY_SUMMARY = 1
+VERBOSITY_FILES = 2
+LOG_SUMMARY_EVERY = 1000
+ARCHIVE_WORKERS = 4  # archives expanded at the same time (each one is read sequentially)
+MAX_FAILURES_KEPT = 1000  # failures a streaming verify keeps in memory (all of them are counted)
+
 
 @dataclass
 class CompareResult:
     verified_files: List[str]
-    failed_files: List[Tuple[str, str]]  # (filename, sha256)
+    failed_files: List[Tuple[str, str]]  # (filename, hex digest)
+
+
+@dataclass
+class StreamResult:
+    files_checked: int
+    files_failed: int
+    failed_files: List[Tuple[str, str]]  # (rel path, hex digest), the first MAX_FAILURES_KEPT failures
+    stopped_early: bool                  # max_failures was reached, the rest of the folder was not checked
+
+
+@dataclass
+class SampleResult:
+    files_total: int
+    files_checked: int
+    failed_files: List[Tuple[str, str]]  # (rel path, hex digest)
+    confidence: float
+    tolerated_rate: float
+    corruption_upper_bound: float        # corruption rate of the whole folder is below this, at `confidence`
+    weighting: str
+    seed: int
+    run: int
+    cycle: int                           # completed passes over the folder (uniform weighting)
+    cycle_progress: float                # share of the current pass already checked (uniform weighting)
 
 
 class Model:
@@ -29,11 +94,46 @@ class Model:
 
 
     # ====================================================================================
-    def __init__(self, verification_folder: str = "./verify", preset_folder: str = "./presets", log_fn=print):
+    def __init__(self, verification_folder: str = "./verify", preset_folder: str = "./presets", log_fn=print,
+                 hash_workers: int = DEFAULT_HASH_WORKERS, hash_executor: str = "thread", hash_strategy: str = "auto",
+                 cache_mode: str = "trust", cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+                 verbosity: int = VERBOSITY_FILES, hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+                 include: Tuple[str, ...] = (), exclude: Tuple[str, ...] = (), symlink_policy: str = "files",
+                 hardlink_policy: str = "once", special_file_policy: str = "skip",
+                 slowest_files: int = DEFAULT_SLOWEST_FILES, metrics_path: Optional[str] = None,
+                 io_scheduler: str = "auto", archive_policy: str = "files"):
         self.verification_folder = os.path.abspath(verification_folder)
         self.preset_folder = os.path.abspath(preset_folder)
         self.preset_prefix = "hashes_preset_"
         self.log = log_fn
+        self.verbosity = verbosity
+        # optional hooks for background jobs: progress_fn(files_done, files_total, bytes_done) and a cancel Event;
+        # files_total is None until the walk has finished (see _progress_tracker)
+        self.progress_fn = None
+        self.cancel_event = None
+        # spans/counters of the current action, attached to its metadata event and, if metrics_path is set,
+        # written there as a Prometheus text file after every event
+        self.instrumentation = Instrumentation(slowest_files)
+        self.metrics_path = metrics_path
+        # hash_algorithm is used for new presets; verification always uses the algorithm the preset recorded
+        self.engine = HashEngine(workers=hash_workers, executor=hash_executor, strategy=hash_strategy,
+                                 algorithm=hash_algorithm, instrumentation=self.instrumentation,
+                                 io_scheduler=io_scheduler)
+        # how the verification folder is walked (see Walker); a .hitignore in any folder adds exclude rules
+        self.walk_options = {
+            "include": tuple(include),
+            "exclude": tuple(exclude),
+            "symlinks": symlink_policy,
+            "hardlinks": hardlink_policy,
+            "special_files": special_file_policy,
+            "archives": archive_policy,
+        }
+        Walker(self.verification_folder, **self.walk_options)  # rejects unknown policies up front
+        # cache lives next to ./presets and ./metadata; 'off' disables it entirely
+        self.hash_cache = None if cache_mode == "off" else HashCache(CACHE_FOLDER, cache_max_entries, cache_mode)
+        self.catalog = None  # PresetCatalog, opened on first use (see _catalog)
+        # listing, summaries and loaded presets, re-read only when the files change
+        self.presets = PresetLibrary(PRESET_FOLDER, PRESET_PREFIX)
 
         os.makedirs(self.preset_folder, exist_ok=True)
         os.makedirs(self.verification_folder, exist_ok=True)
@@ -42,61 +142,282 @@ class Model:
     # ====================================================================================
     # Caluclates the hash of a file
     def _calculate_sha256(self, filename):
-        hash_object = hashlib.sha256()
+        return hash_file(filename, self.engine.strategy, algorithm=self.engine.algorithm)
+
+    # ====================================================================================
+    # Yields a WalkEntry (path, rel_path, stat) for every file under the verification folder that the
+    # include/exclude rules keep. Directories and files are visited in sorted order so presets are deterministic.
+    def _iter_files(self, **overrides):
+        walker = Walker(self.verification_folder, **{**self.walk_options, **overrides}, on_skip=self._log_skipped)
+        return self.instrumentation.timed_iter("walk", walker)
+
+    # Modes that work from stats or per-file sampled reads (merkle, quick-check, watch) see archives only as
+    # whole files, so they cannot be combined with archive members
+    def _archive_members_unsupported(self, mode: str) -> bool:
+        if self.walk_options["archives"] != "members":
+            return False
+        self.log(f"\n[Error] {mode} does not support archive members (use archive policy 'files')")
+        return True
+
+    def _log_skipped(self, path: str, reason: str) -> None:
+        if self.verbosity >= VERBOSITY_FILES:
+            self.log(f"\n[Skipped] {path} ({reason})")
+
+    # ====================================================================================
+    # Hashes walker entries on the engine and yields (entry, digest) in the order the entries were given.
+    # The walker's stat is passed on to the cache. Hardlinks to one inode (link_of, see Walker) are hashed
+    # once: the first of them in this batch is hashed, whichever it is, and the others reuse its digest.
+    # Results are matched to entries by path, never by position, so any subset or order of a walk works.
+    # An ArchiveEntry is hashed member by member on a small pool of its own and expands, in place, into one
+    # (member entry, digest) per member (see Archives).
+    def _hash_entries(self, entries, algorithm: Optional[str] = None, cancel=None):
+        pending = deque()     # (entry, path whose digest it gets, keep that digest for later links)
+        hashed = {}           # path -> digest from the engine, until its entry is yielded
+        inode_sources = {}    # inode (its first path in the walk) -> path hashed for it in this batch
+        inode_digests = {}    # path hashed for a hardlinked inode -> digest, for the links still to come
+        walked = [0]
+        archive_algorithm = check_algorithm(algorithm or self.engine.algorithm)
+        stop = threading.Event()
+        cancel = CancelAny(self.cancel_event if cancel is None else cancel, stop)
+        archive_pool = [None]
+        archive_results = {}  # id(entry) -> Future of its ArchiveHashes
+
+        def _paths():
+            for entry in entries:
+                walked[0] += 1
+                if isinstance(entry, ArchiveEntry):
+                    pending.append((entry, None, False))
+                    if archive_pool[0] is None:
+                        archive_pool[0] = ThreadPoolExecutor(max_workers=min(self.engine.workers, ARCHIVE_WORKERS),
+                                                             thread_name_prefix="hit-archive")
+                    archive_results[id(entry)] = archive_pool[0].submit(hash_members, entry.path,
+                                                                        archive_algorithm, cancel)
+                    continue
+                linked = entry.link_of is not None or \
+                    (self.walk_options["hardlinks"] == "once" and entry.stat.st_nlink > 1)
+                if linked:
+                    inode = entry.link_of or entry.path
+                    source = inode_sources.get(inode)
+                    if source is not None:
+                        pending.append((entry, source, False))  # another link of the inode is hashed already
+                        continue
+                    inode_sources[inode] = entry.path
+                pending.append((entry, entry.path, linked))
+                # the stat feeds the cache and the I/O scheduler (device, inode), so pass on the walker's
+                yield entry.path, entry.stat
+
+        def _ready():
+            while pending:
+                entry, source, keep = pending[0]
+                if source is None:
+                    pending.popleft()
+                    yield from self._archive_members(entry, archive_results)
+                    continue
+                if source in hashed:
+                    digest = hashed.pop(source)
+                elif source in inode_digests:
+                    digest = inode_digests[source]
+                else:
+                    return  # not hashed yet
+                pending.popleft()
+                if keep:
+                    inode_digests[source] = digest
+                yield entry, digest
+
+        try:
+            for path, digest in self.engine.map(_paths(), cache=self.hash_cache, cancel=cancel, algorithm=algorithm):
+                hashed[path] = digest
+                yield from _ready()
+            yield from _ready()
+            if pending:
+                raise RuntimeError(f"{len(pending)} files were walked but never got a digest")
+        finally:
+            stop.set()
+            if archive_pool[0] is not None:
+                archive_pool[0].shutdown(wait=True, cancel_futures=True)
+            self.instrumentation.count("files_walked", walked[0])
+
+    # (member entry, digest) for every member of a hashed archive, in archive order. An archive that cannot
+    # be read as one is yielded as a plain file instead, so it fails verification rather than vanishing.
+    def _archive_members(self, archive: ArchiveEntry, archive_results: dict):
+        result = archive_results.pop(id(archive)).result()
+        for name, reason in result.skipped:
+            self._log_skipped(f"{archive.path}{os.sep}{name}", reason)
+        for name, st, digest in result.members:
+            name = name.replace("/", os.sep)
+            yield WalkEntry(f"{archive.path}{os.sep}{name}", f"{archive.rel_path}{os.sep}{name}", None, st), digest
+        self.instrumentation.count("archive_members", len(result.members))
+        if result.error is not None:
+            self.log(f"\n[Warning] Unreadable archive {archive.rel_path}: {result.error}")
+            yield archive, result.digest
+
+    # ====================================================================================
+    # Per-file log entry, or a periodic summary line depending on verbosity
+    def _log_file(self, message: str, files_done: int, summary: str) -> None:
+        if self.verbosity >= VERBOSITY_FILES:
+            self.log(message)
+            self.log("complete")
+        elif self.verbosity == VERBOSITY_SUMMARY and files_done % LOG_SUMMARY_EVERY == 0:
+            self.log(f"\n{summary}: {files_done} files")
+
+    def _log_files_total(self, files_done: int, summary: str) -> None:
+        if self.verbosity == VERBOSITY_SUMMARY:
+            self.log(f"\n{summary}: {files_done} files (done)")
+
+    # ====================================================================================
+    # Returns (walk, advance): walk() is the folder walk to hash, advance(entry) is called once per hashed file.
+    # The files are counted as the one walk goes, so progress_fn gets files_total=None until it has finished
+    # (the walk stays ahead of the hashing), then the real total. A plain walk and a no-op unless progress_fn is set.
+    def _progress_tracker(self):
+        if self.progress_fn is None:
+            return self._iter_files, lambda entry: None
+
+        walked = {"files": 0, "finished": False}
+        done = {"files": 0, "bytes": 0}
 
-        with open(filename, "rb") as f:
-            # so file is read in chunks to handle large files we chose 8192 bytes for effeciency
-            while chunk := f.read(8192):
-                hash_object.update(chunk)
+        def walk() -> Iterator[WalkEntry]:
+            # one entry ahead, so the total is known by the time the last file is handed on
+            files = iter(self._iter_files())
+            entry = next(files, None)
+            while entry is not None:
+                walked["files"] += 1
+                following = next(files, None)
+                walked["finished"] = following is None
+                yield entry
+                entry = following
 
-        return hash_object.hexdigest()
+        def advance(entry: WalkEntry):
+            done["files"] += 1
+            done["bytes"] += entry.size
+            self.progress_fn(done["files"], walked["files"] if walked["finished"] else None, done["bytes"])
+        return walk, advance
 
     # ====================================================================================
-    # Returns a dict of, each file's name and it's corresponding hash from the 'verify' folder.
-    def _get_hashes(self):
+    # Returns a dict of, each file's path (relative to the 'verify' folder) and it's corresponding hash.
+    # algorithm should be the one of the preset the hashes are compared with (see _preset_algorithm).
+    def _get_hashes(self, algorithm: Optional[str] = None):
         folder_files_and_hashes = {}
 
-        if not os.path.isdir(verification_folder):
-            self.log(f"\n[Error] Verification folder not found: {verification_folder}")
+        if not os.path.isdir(self.verification_folder):
+            self.log(f"\n[Error] Verification folder not found: {self.verification_folder}")
             return folder_files_and_hashes
 
-        for root, _, files in os.walk(self.verification_folder):
-            for name in files:
-                full_path = os.path.join(root, name)
-                if os.path.isfile(full_path):
-                    rel_path = os.path.relpath(full_path,
-                                               self.verification_folder)  # keeps folder structure in the name
-                folder_files_and_hashes[f"{name}"] = []
-                self.log(f"\ncalculating hash for file: {name}")
-                folder_files_and_hashes[f"{name}"].append(self._calculate_sha256(full_path))
-                self.log("complete")
+        # verify starts here: the hashing is part of the comparison event's instrumentation
+        self._begin_action("verify")
+        walk, advance = self._progress_tracker()
+        files_done = 0
 
+        # hashing runs on the engine's worker pool, results come back in walk order
+        with self.instrumentation.span("hashing_wall"):
+            for entry, file_hash in self._hash_entries(walk(), algorithm):
+                # keyed by relative path: same-named files in different subfolders must not overwrite each other
+                folder_files_and_hashes[entry.rel_path] = [file_hash]
+                files_done += 1
+                self._log_file(f"\ncalculating hash for file: {entry.rel_path}", files_done, "Hashed")
+                advance(entry)
+
+        self._log_files_total(files_done, "Hashed")
+        self._report_cache_mismatches()
         return folder_files_and_hashes
 
 
     # ====================================================================================
-    # Returns a list of hashes for the desired preset.
+    # Start of a create/verify action: counters and spans restart from zero
+    def _begin_action(self, action: str) -> None:
+        self._reset_cache_stats()
+        self.instrumentation.reset(action)
+
+    def _reset_cache_stats(self) -> None:
+        if self.hash_cache is not None:
+            self.hash_cache.reset_stats()
+
+    # In paranoid mode, files whose content changed without their stat changing are reported
+    def _report_cache_mismatches(self) -> None:
+        if self.hash_cache is None:
+            return
+        for path in self.hash_cache.mismatched_paths:
+            self.log(f"\n[Warning] Content changed but stat did not (cached digest was stale): {path}")
+
+    # Per-device lanes of the last hashing run, for the metadata events; left out when it did not go through
+    # the IoScheduler (one worker, io_scheduler='off', the process executor)
+    def _io_device_stats(self) -> dict:
+        return {"io_devices": self.engine.device_stats} if self.engine.device_stats else {}
+
+    # Hit/miss counts of the last hashing run, for the metadata events
+    def _cache_stats(self) -> dict:
+        if self.hash_cache is None:
+            return {"cache_mode": "off"}
+        return self.hash_cache.stats()
+
+
+    # ====================================================================================
+    # Returns the path of an existing preset (binary preferred over legacy JSON), or None.
+    def _preset_path(self, preset_name: str) -> Optional[str]:
+        for extension in PRESET_EXTENSIONS:
+            path = os.path.abspath(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}{extension}")
+            if os.path.isfile(path):
+                return path
+        return None
+
+
+    # ====================================================================================
+    # Algorithm a preset was created with, read from the binary header. Legacy JSON presets are sha256.
+    def _preset_algorithm(self, preset_name: str) -> str:
+        path = self._preset_path(preset_name)
+        if path is None:
+            return DEFAULT_HASH_ALGORITHM
+        return self.presets.summary(path).get("algorithm") or DEFAULT_HASH_ALGORITHM
+
+
+    # ====================================================================================
+    # Returns the hashes for the desired preset: a memory-mapped BinaryPreset, or a list for legacy JSON presets.
+    # Loaded presets are cached by PresetLibrary until the file changes, so treat a returned list as read-only.
     def _load_preset(self, preset_name: str):
 
         # If user data folder does not exist, create it.
         if not os.path.isdir(PRESET_FOLDER):
             os.mkdir(PRESET_FOLDER)
 
-        path = os.path.abspath(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}.json")
+        path = self._preset_path(preset_name)
 
-        if not os.path.isfile(path):
+        if path is None:
             return None
 
         try:
-            with open(path, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, list) and data:
-                    return data
-                else:
-                    return None
+            data = self.presets.load(path)
+            if isinstance(data, (list, BinaryPreset)) and len(data):
+                return data
+            else:
+                return None
         except json.JSONDecodeError:
             self.log(f"\n[Error] Failed to decode JSON in: {path}")
             return None
+        except PresetFormatError as e:
+            self.log(f"\n[Error] {e}")
+            return None
+
+
+    # ====================================================================================
+    # Summary of one preset file (no hashes), used by the CLI and listings
+    def _preset_summary(self, path: str) -> dict:
+        return self.presets.summary(path)
+
+    # Summaries of every preset in the preset folder, sorted by name
+    def list_presets(self) -> List[dict]:
+        return self.presets.summaries()
+
+    # Summary of one preset plus its latest metadata events, or None if it does not exist
+    def preset_info(self, preset_name: str) -> Optional[dict]:
+        path = self._preset_path(preset_name)
+        if path is None:
+            return None
+        info = self._preset_summary(path)
+        for key, prefix in (("last_created_event", METADATA_FOR_HASHES_PREFIX),
+                            ("last_verification_event", METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX)):
+            info[key] = None
+            for event in read_events(f"{METADATA_FOLDER}/{prefix}{preset_name}{JOURNAL_EXTENSION}"):
+                info[key] = event
+        return info
 
 
     # ====================================================================================
@@ -109,41 +430,83 @@ class Model:
 
 
     # ====================================================================================
-    # Used to create a preset using all files from the verification folder
-    def _create_preset(self, preset_name: str):
-        hashes = []
+    # Used to create a preset using all files from the verification folder. Returns the preset path, or None.
+    # With merkle=True a hierarchical <preset>.merkle.json is written as well (see _verify_merkle),
+    # with quick=True the quick-check keys used by tiered verification (see _verify_tiered), and unless
+    # manifest=False a path-keyed <preset>.manifest.tsv (see _verify_manifest).
+    # Hashes are streamed to a checkpoint next to the preset (see PresetCheckpoint) rather than kept in memory;
+    # a cancelled or crashed run picks up from there unless resume=False.
+    def _create_preset(self, preset_name: str, merkle: bool = False, quick: bool = False,
+                       resume: bool = True, manifest: bool = True) -> Optional[str]:
+        self._begin_action("create")
+        if (merkle or quick) and self._archive_members_unsupported("A merkle tree or quick-check index"):
+            return None
 
         # Return if preset already exists
-        if os.path.isfile(PRESET_FOLDER + '/' + PRESET_PREFIX + preset_name + '.json'):
+        if self._preset_path(preset_name) is not None:
             self.log(f"\n[Error] Preset {preset_name} already exists")
             self._create_hashes_preset_metadata(
                 preset_name,
                 inspect.currentframe().f_code.co_name,
                 0,
                 0,
-                hashes
+                0
             )
-            return
+            return None
 
         if not os.path.isdir(PRESET_FOLDER):
             os.mkdir(PRESET_FOLDER)
 
         start_time = time.perf_counter()
+        walk, advance = self._progress_tracker()
+
+        algorithm = self.engine.algorithm
+        preset_path = os.path.abspath(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}{BINARY_PRESET_EXTENSION}")
+        checkpoint = PresetCheckpoint(preset_path, {
+            "folder": self.verification_folder,
+            "algorithm": algorithm,
+            "merkle": merkle,
+            "quick": quick,
+            "walk_options": self.walk_options,
+        }, resume=resume)
+        if checkpoint.resumable:
+            self.log(f"\n[Info] Resuming {PRESET_PREFIX}{preset_name}: "
+                     f"{checkpoint.resumable} files were hashed by an earlier run")
+
+        files_done = [0]
+
+        def done(entry: WalkEntry) -> None:
+            files_done[0] += 1
+            self._log_file(f"\nGenerating hash of {entry.rel_path} to preset {PRESET_PREFIX}{preset_name}...",
+                           files_done[0], "Hashed")
+            advance(entry)
 
         # IMPORTANT: recurse into subfolders too
-        for root, _, files in os.walk(self.verification_folder):
-            for name in files:
-                full_path = os.path.join(root, name)
-                if os.path.isfile(full_path):
-                    rel_path = os.path.relpath(full_path,
-                                               self.verification_folder)  # keeps folder structure in the name
-                    self.log(f"\nGenerating hash of {rel_path} to preset {PRESET_PREFIX}{preset_name}...")
-                    hashes.append(self._calculate_sha256(full_path))
-                    self.log("complete")
-
-        # save (once) after collecting hashes
-        with open(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}.json", 'w') as f:
-            json.dump(hashes, f, indent=4)
+        try:
+            with self.instrumentation.span("hashing_wall"):
+                self._hash_into_checkpoint(checkpoint, quick, done, walk())
+        except BaseException:
+            checkpoint.close()  # committed rows survive a cancel or an error, the next run resumes from them
+            raise
+        self._log_files_total(files_done[0], "Hashed")
+        self._report_cache_mismatches()
+        self.instrumentation.count("files_resumed", checkpoint.resumed)
+
+        # the preset is streamed from the checkpoint in digest order, then renamed into place
+        with self.instrumentation.span("preset_write"):
+            count, digests = checkpoint.digests()
+            write_sorted_digests(preset_path, digests, count, algorithm, hashlib.new(algorithm).digest_size)
+            if merkle:
+                write_tree(self._merkle_path(preset_name), build_tree(checkpoint.entries()),
+                           algorithm=algorithm)
+            if quick:
+                count, keys = checkpoint.quick_keys()
+                write_sorted_quick_index(self._quick_path(preset_name), keys, count)
+            if manifest:
+                write_manifest(self._manifest_path(preset_name), checkpoint.entries(), algorithm, checkpoint.files())
+        checkpoint.discard()
+        self.presets.invalidate()
+        self._index_in_catalog(preset_path)
 
         duration_seconds = time.perf_counter() - start_time
         self._create_hashes_preset_metadata(
@@ -151,14 +514,46 @@ class Model:
             inspect.currentframe().f_code.co_name,
             1,
             duration_seconds,
-            hashes
+            files_done[0]
         )
 
         self.log(f"[OK] Preset {PRESET_PREFIX}{preset_name} created.\n")
+        return preset_path
+
+    # Hashes the folder's files (its walk) into the checkpoint, calling done(entry) once per file. Files the
+    # checkpoint already holds with the same stat are taken from it instead of being hashed again.
+    def _hash_into_checkpoint(self, checkpoint: PresetCheckpoint, quick: bool, done,
+                              files: Iterable[WalkEntry]) -> None:
+        linked = {}  # path -> digest of resumed files that have more hardlinks later in the walk
+
+        def _not_resumed():
+            for entry in files:
+                st = entry.stat
+                previous = checkpoint.resume(entry.rel_path, st.st_size, st.st_mtime_ns)
+                if previous is None and entry.link_of in linked:
+                    # a new link to a resumed file: _hash_entries never saw the original, so settle it here
+                    previous = linked[entry.link_of], quick_key(entry.path, entry.size) if quick else None
+                    checkpoint.record(entry.rel_path, st.st_size, st.st_mtime_ns, *previous)
+                if previous is None:
+                    yield entry
+                    continue
+                if self.walk_options["hardlinks"] == "once" and st.st_nlink > 1:
+                    linked[entry.path] = previous[0]
+                done(entry)
+
+        for entry, file_hash in self._hash_entries(_not_resumed()):
+            # the walker's stat was taken before the file was hashed
+            st = entry.stat
+            # the file was just read, the quick-check samples come from the page cache
+            checkpoint.record(entry.rel_path, st.st_size, st.st_mtime_ns, file_hash,
+                              quick_key(entry.path, entry.size) if quick else None)
+            done(entry)
 
     # ====================================================================================
     # Used to, compare each file's corresponding hash from the verify folder with the list of hashes from the chosen preset.
-    def _compare_hashes_with_preset(self, folder_files_and_hashes: dict, hashes_preset: list, preset_name: str):
+    # Returns a CompareResult, or None when there is no preset.
+    def _compare_hashes_with_preset(self, folder_files_and_hashes: dict, hashes_preset: list,
+                                    preset_name: str) -> Optional[CompareResult]:
         files_that_failed_verification = []
 
         if hashes_preset is None:
@@ -168,19 +563,25 @@ class Model:
                 duration_seconds=0,
                 hashes_that_failed_verification=files_that_failed_verification)
             self.log('\nNo preset found')
-            return
+            return None
 
         start_time = time.perf_counter()
 
+        # index the preset once so each lookup is O(1) (or O(log n) for very large presets)
+        preset_index = build_preset_index(hashes_preset)
+        index_built_time = time.perf_counter()
+
         # look through each files hash and if a hash is not in the preset, then add it to list of hashes not found
         for key, value in folder_files_and_hashes.items():
-            file_hash = value[0]
-            self.log(f"\nverifying in progress for: {key}")
-            if file_hash in hashes_preset:
-                pass
-            else:
+            if value[0] not in preset_index:
                 files_that_failed_verification.append(key)
-            self.log("complete")
+        probe_done_time = time.perf_counter()
+        self.instrumentation.add_span("index_build", index_built_time - start_time)
+        self.instrumentation.add_span("compare", probe_done_time - index_built_time)
+
+        for files_done, key in enumerate(folder_files_and_hashes, start=1):
+            self._log_file(f"\nverifying in progress for: {key}", files_done, "Verified")
+        self._log_files_total(len(folder_files_and_hashes), "Verified")
 
         duration_seconds = time.perf_counter() - start_time
         self._create_hash_comparison_with_preset_metadata(
@@ -188,7 +589,10 @@ class Model:
             action=inspect.currentframe().f_code.co_name,
             result=1,
             duration_seconds=duration_seconds,
-            hashes_that_failed_verification=files_that_failed_verification)
+            hashes_that_failed_verification=files_that_failed_verification,
+            algorithm=self._preset_algorithm(preset_name),
+            index_build_seconds=index_built_time - start_time,
+            index_probe_seconds=probe_done_time - index_built_time)
 
         # test outcome
         if not files_that_failed_verification:
@@ -196,50 +600,524 @@ class Model:
         else:
             self.log(f"\nfiles that failed verification: {files_that_failed_verification}")
 
+        failed = set(files_that_failed_verification)
+        return CompareResult(
+            verified_files=[key for key in folder_files_and_hashes if key not in failed],
+            failed_files=[(key, folder_files_and_hashes[key][0]) for key in files_that_failed_verification])
+
+    # ====================================================================================
+    # Streaming verification: walk -> hash -> compare -> report as one generator pipeline, so each file is
+    # checked against the preset index as soon as its digest is ready and nothing grows with the tree.
+    # With max_failures > 0 verification stops once that many files failed: in-flight reads are cancelled
+    # mid-file and queued ones never start. Returns None when there is no preset.
+    def _verify_streaming(self, preset_name: str, max_failures: int = 0,
+                          preset_index=None) -> Optional[StreamResult]:
+        # a batch run (see BatchRun) loads and indexes every preset once and hands the index in
+        hashes_preset = self._load_preset(preset_name) if preset_index is None else preset_index
+        if hashes_preset is None:
+            self._create_hash_comparison_with_preset_metadata(
+                preset_name=preset_name, action=inspect.currentframe().f_code.co_name,
+                result=0,
+                duration_seconds=0,
+                hashes_that_failed_verification=[])
+            self.log('\nNo preset found')
+            return None
+
+        self._begin_action("verify")
+        start_time = time.perf_counter()
+        algorithm = self._preset_algorithm(preset_name)
+        with self.instrumentation.span("index_build"):
+            if preset_index is None:
+                preset_index = build_preset_index(hashes_preset)
+        walk, advance = self._progress_tracker()
+
+        stop = threading.Event()
+        hashed = self._hash_entries(walk(), algorithm, cancel=CancelAny(self.cancel_event, stop))
+        checked, failed, failed_files, stopped_early = 0, 0, [], False
+        try:
+            with self.instrumentation.span("hashing_wall"):
+                for entry, file_hash in hashed:
+                    checked += 1
+                    if file_hash not in preset_index:
+                        failed += 1
+                        if len(failed_files) < MAX_FAILURES_KEPT:
+                            failed_files.append((entry.rel_path, file_hash))
+                        if self.verbosity >= VERBOSITY_SUMMARY:
+                            self.log(f"\n[Failed] {entry.rel_path}")
+                    self._log_file(f"\nverified: {entry.rel_path}", checked, "Verified")
+                    advance(entry)
+                    if max_failures and failed >= max_failures:
+                        stopped_early = True
+                        break
+        finally:
+            stop.set()      # workers still reading a file give up at the next chunk...
+            hashed.close()  # ...and tasks that have not started are dropped
+        self._log_files_total(checked, "Verified")
+        self._report_cache_mismatches()
+        duration_seconds = time.perf_counter() - start_time
+
+        self._create_hash_comparison_with_preset_metadata(
+            preset_name=preset_name,
+            action=inspect.currentframe().f_code.co_name,
+            result=1,
+            duration_seconds=duration_seconds,
+            hashes_that_failed_verification=failed_files,
+            failed_count=failed,
+            algorithm=algorithm,
+            index_build_seconds=self.instrumentation.span_seconds("index_build"),
+            extra={
+                "files_checked": checked,
+                "files_failed": failed,
+                "max_failures": max_failures,
+                "stopped_early": stopped_early,
+            })
+
+        if stopped_early:
+            self.log(f"\n[Info] Stopped after {failed} failed files ({checked} files checked)")
+        elif not failed:
+            self.log("\nAll files passed verification")
+        return StreamResult(files_checked=checked, files_failed=failed, failed_files=failed_files,
+                            stopped_early=stopped_early)
+
+    # ====================================================================================
+    def _merkle_path(self, preset_name: str) -> str:
+        return os.path.abspath(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}{MERKLE_SUFFIX}")
+
+    # ====================================================================================
+    # Verifies the folder against a preset's merkle tree: every file is stat'ed, unchanged subtrees are skipped on
+    # their stat fingerprint and only files whose stat changed are read; directory digests then confirm subtrees
+    # or localize the changes. deep=True reads every file (see diff_tree). Returns None if the preset has no tree.
+    def _verify_merkle(self, preset_name: str, deep: bool = False) -> Optional[MerkleDiff]:
+        if self._archive_members_unsupported("Merkle verification"):
+            return None
+        stored = load_tree(self._merkle_path(preset_name))
+        if stored is None:
+            self.log(f"\n[Error] Preset {preset_name} has no merkle tree (create it with merkle enabled)")
+            return None
+
+        tree, algorithm = stored
+        self._begin_action("verify_merkle")
+        start_time = time.perf_counter()
+        with self.instrumentation.span("merkle_scan"):
+            current = scan_tree((entry.rel_path, entry.stat.st_size, entry.stat.st_mtime_ns)
+                                for entry in self._iter_files())
+        # a deep diff reads what the stat vouches for, so it must not take the stat-keyed cache's word for it
+        cache = None if deep else self.hash_cache
+        with self.instrumentation.span("hashing_wall"):
+            diff = diff_tree(tree, current, self.verification_folder,
+                             lambda paths: self.engine.map(paths, cache=cache, cancel=self.cancel_event,
+                                                           algorithm=algorithm), deep=deep)
+        duration_seconds = time.perf_counter() - start_time
+
+        self._create_hash_comparison_with_preset_metadata(
+            preset_name=preset_name,
+            action=inspect.currentframe().f_code.co_name,
+            result=1,
+            duration_seconds=duration_seconds,
+            hashes_that_failed_verification=diff.failed,
+            algorithm=algorithm,
+            extra={
+                "files_modified": len(diff.modified),
+                "files_added": len(diff.added),
+                "files_missing": len(diff.missing),
+                "merkle_files_hashed": diff.files_hashed,
+                "merkle_dirs_skipped": diff.dirs_skipped,
+                "merkle_dirs_confirmed": diff.dirs_confirmed,
+                "merkle_deep": deep,
+            })
+
+        for label, paths in (("modified", diff.modified), ("added", diff.added), ("missing", diff.missing)):
+            for rel_path in paths:
+                self.log(f"\n[{label}] {rel_path}")
+        if not diff.failed:
+            self.log("\nAll files passed verification")
+        return diff
+
+    # ====================================================================================
+    def _manifest_path(self, preset_name: str) -> str:
+        return os.path.abspath(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}{MANIFEST_SUFFIX}")
+
+    def _manifest_report_path(self, preset_name: str) -> str:
+        return os.path.abspath(f"{METADATA_FOLDER}/{MANIFEST_DIFF_PREFIX}{preset_name}{JOURNAL_EXTENSION}")
+
+    # ====================================================================================
+    # Verifies the folder against a preset's manifest: every file is hashed once and joined on its path,
+    # then classified as unchanged, modified, added, missing or moved (see Manifest.diff_manifest).
+    # Writes the changes to a diff report under ./metadata. Returns None if the preset has no manifest.
+    def _verify_manifest(self, preset_name: str) -> Optional[ManifestDiff]:
+        stored = read_manifest(self._manifest_path(preset_name))
+        if stored is None:
+            self.log(f"\n[Error] Preset {preset_name} has no manifest (create it with the manifest enabled)")
+            return None
+
+        header, stored_entries = stored
+        algorithm = header.get("algorithm") or DEFAULT_HASH_ALGORITHM
+        self._begin_action("verify_manifest")
+        start_time = time.perf_counter()
+        walk, advance = self._progress_tracker()
+
+        def _current():
+            for entry, digest in self._hash_entries(walk(), algorithm):
+                advance(entry)
+                yield entry.rel_path, digest, entry.stat.st_size, entry.stat.st_mtime_ns
+
+        # the stored side is indexed first, then the folder is hashed and probed in one streaming pass
+        with self.instrumentation.span("hashing_wall"):
+            diff = diff_manifest(stored_entries, _current())
+        duration_seconds = time.perf_counter() - start_time
+
+        report_path = self._manifest_report_path(preset_name)
+        write_diff_report(report_path, diff, {
+            "preset": f"{PRESET_PREFIX}{preset_name}",
+            "folder": self.verification_folder,
+            "algorithm": algorithm,
+            "timestamp": datetime.now().astimezone().isoformat(),
+        })
+        self._create_hash_comparison_with_preset_metadata(
+            preset_name=preset_name,
+            action=inspect.currentframe().f_code.co_name,
+            result=1,
+            duration_seconds=duration_seconds,
+            hashes_that_failed_verification=diff.failed,
+            algorithm=algorithm,
+            extra={**{f"files_{key}": value for key, value in diff.counts().items()}, "diff_report": report_path})
+
+        for label, count in diff.counts().items():
+            if count and label != "unchanged":
+                self.log(f"\n[{label}] {count} files")
+        if not diff.failed:
+            self.log("\nAll files passed verification")
+        return diff
+
+    # ====================================================================================
+    def _spot_check_state_path(self, preset_name: str) -> str:
+        return os.path.abspath(f"{SPOT_CHECK_STATE_FOLDER}/{PRESET_PREFIX}{preset_name}.json")
+
+    # ====================================================================================
+    # Statistical spot-check: hashes only a seeded random sample of the folder, sized so that a corruption
+    # rate of tolerated_rate or more is caught with the given confidence, and reports an upper bound on the
+    # folder's corruption rate. The seed and the rotation point are kept under ./metadata, so successive
+    # runs walk through the whole folder (see SpotCheck). Returns None when there is no preset.
+    def _verify_sample(self, preset_name: str, confidence: float = DEFAULT_CONFIDENCE,
+                       tolerated_rate: float = DEFAULT_TOLERATED_RATE, weighting: str = 'uniform',
+                       seed: Optional[int] = None) -> Optional[SampleResult]:
+        hashes_preset = self._load_preset(preset_name)
+        if hashes_preset is None:
+            self._create_hash_comparison_with_preset_metadata(
+                preset_name=preset_name, action=inspect.currentframe().f_code.co_name,
+                result=0,
+                duration_seconds=0,
+                hashes_that_failed_verification=[])
+            self.log('\nNo preset found')
+            return None
+
+        self._begin_action("verify_sample")
+        start_time = time.perf_counter()
+        algorithm = self._preset_algorithm(preset_name)
+        state_path = self._spot_check_state_path(preset_name)
+        state = load_state(state_path, seed)
+        with self.instrumentation.span("index_build"):
+            preset_index = build_preset_index(hashes_preset)
+
+        # one cheap pass to size the sample, a second one keeps only the chosen files (memory ~ sample size)
+        with self.instrumentation.span("sampling"):
+            files_total = sum(1 for _ in self._iter_files())
+            size = sample_size(files_total, confidence, tolerated_rate)
+            sample = select_sample(self._iter_files(), size, state, weighting)
+        self.instrumentation.count("files_sampled", len(sample))
+
+        # the sampling unit is a walked file: an archive expanded into members counts once, failed if any
+        # member failed, so the statistics stay in terms of files_total
+        archives = [f"{entry.rel_path}{os.sep}" for entry in sample if isinstance(entry, ArchiveEntry)]
+        checked, failed_files, failed_units, units_checked = 0, [], set(), set(archives)
+        with self.instrumentation.span("hashing_wall"):
+            for entry, file_hash in self._hash_entries(sample, algorithm):
+                checked += 1
+                unit = next((prefix for prefix in archives if f"{entry.rel_path}{os.sep}".startswith(prefix)),
+                            entry.rel_path)
+                units_checked.add(unit)
+                if file_hash not in preset_index:
+                    failed_files.append((entry.rel_path, file_hash))
+                    failed_units.add(unit)
+                    if self.verbosity >= VERBOSITY_SUMMARY:
+                        self.log(f"\n[Failed] {entry.rel_path}")
+                self._log_file(f"\nverified: {entry.rel_path}", checked, "Verified")
+                if self.progress_fn is not None:
+                    self.progress_fn(checked, len(sample), 0)
+        self._log_files_total(checked, "Verified")
+        self._report_cache_mismatches()
+        # the bound below only holds for files that were actually checked
+        if len(units_checked) != len(sample):
+            raise RuntimeError(f"Spot-check hashed {len(units_checked)} of the {len(sample)} sampled files")
+        # the rotation only moves on once the sample was actually checked
+        save_state(state_path, state)
+        duration_seconds = time.perf_counter() - start_time
+
+        bound = corruption_upper_bound(len(failed_units), len(sample), confidence)
+        result = SampleResult(files_total=files_total, files_checked=checked, failed_files=failed_files,
+                              confidence=confidence, tolerated_rate=tolerated_rate, corruption_upper_bound=bound,
+                              weighting=weighting, seed=state.seed, run=state.runs, cycle=state.cycle,
+                              cycle_progress=state.offset if weighting == 'uniform' else 0.0)
+        self._create_hash_comparison_with_preset_metadata(
+            preset_name=preset_name,
+            action=inspect.currentframe().f_code.co_name,
+            result=1,
+            duration_seconds=duration_seconds,
+            hashes_that_failed_verification=failed_files,
+            algorithm=algorithm,
+            index_build_seconds=self.instrumentation.span_seconds("index_build"),
+            extra={
+                "files_total": files_total,
+                "files_checked": checked,
+                "files_failed": len(failed_files),
+                "sample_confidence": confidence,
+                "sample_tolerated_rate": tolerated_rate,
+                "sample_weighting": weighting,
+                "sample_seed": state.seed,
+                "sample_run": state.runs,
+                "sample_cycle": state.cycle,
+                "sample_cycle_progress": round(result.cycle_progress, 6),
+                "files_sampled": len(sample),
+                "estimated_corruption_rate": round(len(failed_units) / len(sample), 6) if sample else None,
+                "corruption_rate_upper_bound": round(bound, 6),
+                "estimated_corrupt_files_upper_bound": math.ceil(bound * files_total),
+            })
+
+        self.log(f"\n[Info] Checked {len(sample)} of {files_total} files: at {confidence:.0%} confidence, "
+                 f"fewer than {bound:.4%} of the folder is corrupt")
+        if not failed_files:
+            self.log("\nAll sampled files passed verification")
+        return result
+
+    # ====================================================================================
+    def _quick_path(self, preset_name: str) -> str:
+        return os.path.abspath(f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}{QUICK_SUFFIX}")
+
+    # ====================================================================================
+    # Tiered verification. Tier 1 checks each file's size and sampled blocks against the preset's quick index
+    # and rejects files that cannot match; only files that pass are fully hashed and checked (tier 2).
+    # strict=True fully hashes every file, so rejected files are reported with their digest too.
+    def _verify_tiered(self, preset_name: str, strict: bool = False) -> Optional[CompareResult]:
+        if self._archive_members_unsupported("Tiered verification"):
+            return None
+        hashes_preset = self._load_preset(preset_name)
+        quick_index = load_quick_index(self._quick_path(preset_name))
+        if hashes_preset is None or quick_index is None:
+            self.log(f"\n[Error] Preset {preset_name} has no quick-check index (create it with quick enabled)")
+            return None
+
+        self._begin_action("verify_tiered")
+        start_time = time.perf_counter()
+        with self.instrumentation.span("index_build"):
+            preset_index = build_preset_index(hashes_preset)
+        files = list(self._iter_files())
+
+        # tier 1: stat + sampled reads
+        passed, rejected = [], []
+        quick_start_time = time.perf_counter()
+        keys = self.engine.imap(lambda entry: quick_key(entry.path, entry.size), files, cancel=self.cancel_event)
+        for entry, key in zip(files, keys):
+            (passed if key in quick_index else rejected).append(entry)
+        quick_done_time = time.perf_counter()
+        self.instrumentation.add_span("quick_check", quick_done_time - quick_start_time)
+
+        # tier 2: full hash for files that passed (and, in strict mode, for rejected ones as well)
+        # out of walk order, and a link may be hashed without its original: _hash_entries matches by path
+        to_hash = passed + rejected if strict else passed
+        algorithm = self._preset_algorithm(preset_name)
+        with self.instrumentation.span("hashing_wall"):
+            digests = {entry.path: digest for entry, digest in self._hash_entries(to_hash, algorithm)}
+
+        verified, failed = [], []
+        for entry in passed:
+            if digests[entry.path] in preset_index:
+                verified.append(entry.rel_path)
+            else:
+                failed.append((entry.rel_path, digests[entry.path]))
+        for entry in rejected:
+            failed.append((entry.rel_path, digests.get(entry.path, "")))
+        duration_seconds = time.perf_counter() - start_time
+
+        self._create_hash_comparison_with_preset_metadata(
+            preset_name=preset_name,
+            action=inspect.currentframe().f_code.co_name,
+            result=1,
+            duration_seconds=duration_seconds,
+            hashes_that_failed_verification=failed,
+            algorithm=algorithm,
+            extra={
+                "tiered_strict": strict,
+                "quick_tier_rejected": len(rejected),
+                "quick_tier_passed": len(passed),
+                "quick_tier_ms": f"{(quick_done_time - quick_start_time) * 1000:.4f}",
+                "full_hashes_computed": len(to_hash),
+            })
+        quick_index.close()
+
+        if not failed:
+            self.log("\nAll files passed verification")
+        else:
+            self.log(f"\nfiles that failed verification: {[rel_path for rel_path, _ in failed]}")
+        return CompareResult(verified_files=verified, failed_files=failed)
+
+    # ====================================================================================
+    def _catalog(self) -> PresetCatalog:
+        if self.catalog is None:
+            self.catalog = PresetCatalog(CACHE_FOLDER, PRESET_FOLDER, PRESET_PREFIX, on_error=lambda path, e: self.log(
+                f"\n[Warning] Preset {os.path.basename(path)} left out of the preset catalog: {e}"))
+        return self.catalog
+
+    # New presets go straight into the catalog index; it is derived data, so a failure only costs a rebuild
+    def _index_in_catalog(self, preset_path: str) -> None:
+        try:
+            self._catalog().index_preset(preset_path)
+        except sqlite3.Error as e:
+            self.log(f"\n[Warning] Could not add {preset_path} to the preset catalog: {e}")
+
+    # ====================================================================================
+    # Verifies the folder against every preset at once: one hash pass per algorithm in use (normally one),
+    # then a lookup in the catalog's digest -> presets index. Returns the candidates, best first.
+    def _match_presets(self, top: Optional[int] = None) -> dict:
+        self._begin_action("match")
+        start_time = time.perf_counter()
+        catalog = self._catalog()
+        with self.instrumentation.span("index_build"):
+            reindexed = catalog.refresh()
+
+        matches, folder_files = [], 0
+        for algorithm in catalog.algorithms():
+            digests = Counter()
+            with self.instrumentation.span("hashing_wall"):
+                for _, digest in self._hash_entries(self._iter_files(), algorithm):
+                    digests[digest] += 1
+            folder_files = sum(digests.values())
+            with self.instrumentation.span("compare"):
+                matches.extend(catalog.match(algorithm, digests))
+        candidates = rank_matches(matches, top)
+        duration_seconds = time.perf_counter() - start_time
+
+        result = {
+            "folder": self.verification_folder,
+            "folder_files": folder_files,
+            "presets_compared": len(matches),
+            "presets_reindexed": reindexed,
+            "candidates": candidates,
+        }
+        if not os.path.isdir(METADATA_FOLDER):
+            os.mkdir(METADATA_FOLDER)
+        self._write_event(f"{METADATA_FOLDER}/{METADATA_FOR_CATALOG_MATCH}{JOURNAL_EXTENSION}", {
+            "timestamp_of_event": datetime.now().astimezone().isoformat(),
+            "app": "HIT",
+            "version": HIT_VERSION,
+            "action": inspect.currentframe().f_code.co_name,
+            "target_verification_folder": self.verification_folder,
+            "folder_files": folder_files,
+            "presets_compared": len(matches),
+            # the top few are enough to see what the folder was matched to
+            "best_candidates": [{key: c[key] for key in ("preset", "folder_coverage", "preset_coverage")}
+                                for c in candidates[:5]],
+            "duration_ms": f"{duration_seconds * 1000:.4f}",
+            **self._cache_stats(),
+            "instrumentation": self.instrumentation.snapshot()
+        }, "catalog")
+
+        for c in candidates[:5]:
+            self.log(f"\n{c['preset']}: {c['folder_coverage']:.1%} of the folder, {c['preset_coverage']:.1%} of the preset")
+        return result
+
+    # ====================================================================================
+    # Hashes the folder once and returns a started FolderWatch that re-verifies only changed files
+    # (call .run() on it), or None if the preset does not exist.
+    def _watch(self, preset_name: str, backend: str = "auto", debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+               poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS) -> Optional["FolderWatch"]:
+        from Watch import FolderWatch
+        if self._archive_members_unsupported("Watch"):
+            return None
+        hashes_preset = self._load_preset(preset_name)
+        if hashes_preset is None:
+            self.log(f"\n[Error] Preset {preset_name} not found")
+            return None
+
+        watch = FolderWatch(self, preset_name, hashes_preset, self._preset_algorithm(preset_name),
+                            backend=backend, debounce=debounce, poll_interval=poll_interval)
+        self._begin_action("watch")
+        state = watch.start()
+        self._create_watch_metadata(preset_name, {
+            "message": "watch started",
+            "watch_backend": watch.backend,
+            "files": state["files"],
+            "drifted": state["drifted"],
+            "drifted_total": len(state["drifted"]),
+            "missing_digests_total": state["missing_digests"],
+        })
+        self.log(f"\nWatching {self.verification_folder} against {PRESET_PREFIX}{preset_name} ({watch.backend})")
+        return watch
+
+    # ====================================================================================
+    # Appends a watch event (drift detected or resolved) to the preset's watch journal
+    def _create_watch_metadata(self, preset_name: str, fields: dict) -> None:
+        if not os.path.isdir(METADATA_FOLDER):
+            os.mkdir(METADATA_FOLDER)
+
+        metadata_path = f"{METADATA_FOLDER}/{METADATA_FOR_WATCH_PREFIX}{preset_name}{JOURNAL_EXTENSION}"
+        event = {
+            "timestamp_of_event": datetime.now().astimezone().isoformat(),
+            "app": "HIT",
+            "version": HIT_VERSION,
+            "action": "watch",
+            "target_verification_folder": self.verification_folder,
+            "preset": f"{PRESET_PREFIX}{preset_name}",
+            **fields,
+            **self._cache_stats(),
+            "instrumentation": self.instrumentation.snapshot()
+        }
+        self._write_event(metadata_path, event, preset_name)
+
     # ====================================================================================
     # Writes metadata for the hash comparison with preset results
     def _create_hash_comparison_with_preset_metadata(self, preset_name: str, action: str, result: int,
-                                                     duration_seconds: float, hashes_that_failed_verification: list):
-        filename = f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}.json"
-        mtime = os.path.getmtime(filename)
+                                                     duration_seconds: float, hashes_that_failed_verification: list,
+                                                     algorithm: Optional[str] = None,
+                                                     index_build_seconds: float = 0, index_probe_seconds: float = 0,
+                                                     extra: Optional[dict] = None, failed_count: Optional[int] = None):
+        # failed_count: when hashes_that_failed_verification holds only the first failures (see _verify_streaming)
+        filename = self._preset_path(preset_name)
+        preset_modified_at = (datetime.fromtimestamp(os.path.getmtime(filename)).astimezone().isoformat()
+                              if filename else None)
 
         if not os.path.isdir(METADATA_FOLDER):
             os.mkdir(METADATA_FOLDER)
 
-        # Append metadata to corresponding .json
-        metadata_path = f"{METADATA_FOLDER}/{METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX}{preset_name}.json"
+        # Append metadata to corresponding .jsonl
+        metadata_path = f"{METADATA_FOLDER}/{METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX}{preset_name}{JOURNAL_EXTENSION}"
 
         event = {
             "timestamp_of_event": datetime.now().astimezone().isoformat(),
-            "preset_modified_at": datetime.fromtimestamp(mtime).astimezone().isoformat(),
+            "preset_modified_at": preset_modified_at,
             "app": "HIT",
             "version": HIT_VERSION,
             "action": action,
-            "target_verification_folder": verification_folder,
+            "target_verification_folder": self.verification_folder,
             "preset": f"{PRESET_PREFIX}{preset_name}",
             "result": result,
-            "hashes_that_failed_verification": len(hashes_that_failed_verification),
-            "comparison_duration_ms": f"{duration_seconds:.4f}"
+            "hashes_that_failed_verification": (len(hashes_that_failed_verification) if failed_count is None
+                                                else failed_count),
+            "hash_algorithm": algorithm,
+            "comparison_duration_ms": f"{duration_seconds * 1000:.4f}",
+            "index_build_ms": f"{index_build_seconds * 1000:.4f}",
+            "index_probe_ms": f"{index_probe_seconds * 1000:.4f}",
+            "hash_workers": self.engine.workers,
+            "hash_executor": self.engine.executor,
+            **self._io_device_stats(),
+            # hashing happens before the comparison starts (see _get_hashes), so it is reported separately
+            "hashing_duration_ms": f"{self.instrumentation.span_seconds('hashing_wall') * 1000:.4f}",
+            **self._cache_stats(),
+            **(extra or {}),
+            "instrumentation": self.instrumentation.snapshot()
         }
 
-        # read existing list (or create new one)
-        if os.path.isfile(metadata_path):
-            with open(metadata_path, "r") as f:
-                try:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        data = [data]  # convert old single object to list
-                except json.JSONDecodeError:
-                    data = []
-        else:
-            data = []
-
-        # append event
-        data.append(event)
-
-        # write back
-        with open(metadata_path, "w") as f:
-            json.dump(data, f, indent=2)
+        # one line appended to the journal; a legacy .json history is migrated on first use
+        self._write_event(metadata_path, event, preset_name)
 
 
     # ====================================================================================
@@ -250,47 +1128,51 @@ class Model:
         action: str,
         result: int,
         duration_seconds: float,
-        hashes_written: list
+        hashes_written: int
     ):
-        filename = f"{PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}.json"
-        mtime = os.path.getmtime(filename)
+        filename = self._preset_path(preset_name)
+        preset_modified_at = (datetime.fromtimestamp(os.path.getmtime(filename)).astimezone().isoformat()
+                              if filename else None)
 
         if not os.path.isdir(METADATA_FOLDER):
             os.mkdir(METADATA_FOLDER)
 
-        # Append metadata to corresponding .json
-        metadata_path = f"{METADATA_FOLDER}/{METADATA_FOR_HASHES_PREFIX}{preset_name}.json"
+        # Append metadata to corresponding .jsonl
+        metadata_path = f"{METADATA_FOLDER}/{METADATA_FOR_HASHES_PREFIX}{preset_name}{JOURNAL_EXTENSION}"
 
         event = {
-            "message": f"The following hashes were added to {PRESET_FOLDER}/{PRESET_PREFIX}{preset_name}.json",
-            "hashes": hashes_written,
+            "message": f"The following hashes were added to {filename}",
+            # the hashes themselves live in the preset; the event only references it
+            "hashes_ref": {
+                "preset_file": filename,
+                "preset_sha256": hash_file(filename) if filename and hashes_written else None,
+            },
             "timestamp_of_event": datetime.now().astimezone().isoformat(),
-            "preset_modified_at": datetime.fromtimestamp(mtime).astimezone().isoformat(),
+            "preset_modified_at": preset_modified_at,
             "app": "HIT",
             "version": HIT_VERSION,
             "action": action,
             "target_folder": PRESET_FOLDER,
             "preset": f"{PRESET_PREFIX}{preset_name}",
             "result": result,
-            "hashes_written": len(hashes_written),
-            "duration_ms": f"{duration_seconds:.4f}"
+            "hashes_written": hashes_written,
+            "hash_algorithm": self.engine.algorithm,
+            "duration_ms": f"{duration_seconds * 1000:.4f}",
+            "hash_workers": self.engine.workers,
+            "hash_executor": self.engine.executor,
+            **self._io_device_stats(),
+            **self._cache_stats(),
+            "instrumentation": self.instrumentation.snapshot()
         }
 
-        # read existing list (or create new one)
-        if os.path.isfile(metadata_path):
-            with open(metadata_path, "r") as f:
-                try:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        data = [data]  # convert old single object to list
-                except json.JSONDecodeError:
-                    data = []
-        else:
-            data = []
+        # one line appended to the journal; a legacy .json history is migrated on first use
+        self._write_event(metadata_path, event, preset_name)
 
-        # append event
-        data.append(event)
 
-        # write back
-        with open(metadata_path, "w") as f:
-            json.dump(data, f, indent=2)
+    # ====================================================================================
+    # Appends a metadata event, then refreshes the Prometheus metrics file if one is configured
+    def _write_event(self, metadata_path: str, event: dict, preset_name: str) -> None:
+        with self.instrumentation.span("metadata_write"):
+            append_event(metadata_path, event)
+        if self.metrics_path:
+            self.instrumentation.write_prometheus(self.metrics_path, labels={"preset": preset_name})
@@ -0,0 +1,201 @@
+import contextlib
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from PresetFormat import BinaryPreset, PresetFormatError, is_preset_filename, load_preset_file
+
+
+#====================================================================================
+# Catalog-wide inverted index: digest -> presets that contain it, for every preset in the preset folder.
+# It lives in the cache folder (it can always be rebuilt from the presets) and is refreshed incrementally:
+# only preset files whose size or mtime changed since they were indexed are read again.
+CATALOG_FILENAME = 'preset_catalog.sqlite3'
+CATALOG_SCHEMA_VERSION = 1
+CATALOG_INSERT_BATCH = 50_000
+
+
+class PresetCatalog:
+    """sqlite inverted index over all presets, used to match one folder against every preset at once."""
+
+    # ====================================================================================
+    def __init__(self, cache_folder: str, preset_folder: str, preset_prefix: str,
+                 on_error: Optional[Callable[[str, Exception], None]] = None):
+        self.path = os.path.abspath(os.path.join(cache_folder, CATALOG_FILENAME))
+        self.preset_folder = os.path.abspath(preset_folder)
+        self.preset_prefix = preset_prefix
+        self.on_error = on_error or (lambda path, error: None)  # a preset refresh() could not index
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != CATALOG_SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS presets")
+            self._db.execute("DROP TABLE IF EXISTS digests")
+            self._db.execute(f"PRAGMA user_version = {CATALOG_SCHEMA_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS presets ("
+            " id INTEGER PRIMARY KEY, file TEXT UNIQUE, name TEXT, algorithm TEXT, size INTEGER, mtime_ns INTEGER,"
+            " digest_count INTEGER)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            " digest BLOB, preset_id INTEGER, PRIMARY KEY (digest, preset_id)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS digests_preset ON digests(preset_id)")
+        self._db.commit()
+
+    # ====================================================================================
+    # Brings the index in line with the preset folder. Returns the number of preset files (re)indexed.
+    # A preset that cannot be read is reported to on_error and left out; it is tried again on the next refresh.
+    def refresh(self) -> int:
+        on_disk = {}
+        if os.path.isdir(self.preset_folder):
+            for name in os.listdir(self.preset_folder):
+                if name.startswith(self.preset_prefix) and is_preset_filename(name):
+                    path = os.path.join(self.preset_folder, name)
+                    st = os.stat(path)
+                    on_disk[path] = (st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            indexed = {file: (preset_id, (size, mtime_ns)) for preset_id, file, size, mtime_ns in
+                       self._db.execute("SELECT id, file, size, mtime_ns FROM presets")}
+            for file, (preset_id, _) in indexed.items():
+                if file not in on_disk:
+                    self._remove(preset_id)
+            self._db.commit()
+
+        changed = [path for path, sig in on_disk.items() if path not in indexed or indexed[path][1] != sig]
+        reindexed = 0
+        for path in sorted(changed):
+            try:
+                self.index_preset(path)
+                reindexed += 1
+            except (PresetFormatError, ValueError, TypeError, OSError) as e:
+                self.on_error(path, e)
+        return reindexed
+
+    # (Re)indexes one preset file, e.g. right after _create_preset wrote it. A preset that turns out to be
+    # corrupt part way leaves the index as it was (its old rows are removed only in the same transaction).
+    def index_preset(self, path: str) -> None:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem[len(self.preset_prefix):]
+
+        preset = load_preset_file(path)
+        try:
+            if isinstance(preset, BinaryPreset):
+                algorithm = preset.algorithm
+                digests = preset.index.digests()
+            elif isinstance(preset, list):
+                algorithm = "sha256"  # legacy JSON presets predate the algorithm setting
+                digests = (bytes.fromhex(h) for h in preset)
+            else:
+                raise PresetFormatError(f"Not a JSON preset list: {path}")
+
+            with self._lock, _rollback_on_error(self._db):
+                row = self._db.execute("SELECT id FROM presets WHERE file = ?", (path,)).fetchone()
+                if row is not None:
+                    self._remove(row[0])
+                preset_id = self._db.execute(
+                    "INSERT INTO presets (file, name, algorithm, size, mtime_ns, digest_count) VALUES (?, ?, ?, ?, ?, 0)",
+                    (path, name, algorithm, st.st_size, st.st_mtime_ns)).lastrowid
+
+                for batch in _batches(digests, CATALOG_INSERT_BATCH):
+                    self._db.executemany("INSERT OR IGNORE INTO digests VALUES (?, ?)",
+                                         ((digest, preset_id) for digest in batch))
+                # distinct digests, as stored: a legacy JSON preset may list the same one several times
+                self._db.execute("UPDATE presets SET digest_count = (SELECT COUNT(*) FROM digests WHERE preset_id = ?)"
+                                 " WHERE id = ?", (preset_id, preset_id))
+                self._db.commit()
+        finally:
+            if isinstance(preset, BinaryPreset):
+                preset.close()
+
+    def _remove(self, preset_id: int) -> None:
+        self._db.execute("DELETE FROM digests WHERE preset_id = ?", (preset_id,))
+        self._db.execute("DELETE FROM presets WHERE id = ?", (preset_id,))
+
+    # ====================================================================================
+    # Hash algorithms used by the indexed presets; the folder has to be hashed once per algorithm.
+    def algorithms(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT algorithm FROM presets ORDER BY algorithm")]
+
+    # ====================================================================================
+    # Ranks the presets made with algorithm against a folder's digests (hex digest -> number of files).
+    # folder_coverage: share of the folder's files found in the preset.
+    # preset_coverage: share of the preset's digests found in the folder.
+    def match(self, algorithm: str, folder_digests: Dict[str, int]) -> List[dict]:
+        folder_files = sum(folder_digests.values())
+        with self._lock:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS folder (digest BLOB PRIMARY KEY, files INTEGER)")
+            self._db.execute("DELETE FROM folder")
+            self._db.executemany("INSERT INTO folder VALUES (?, ?)",
+                                 ((bytes.fromhex(h), n) for h, n in folder_digests.items()))
+            # one index probe per distinct folder digest, whatever the number of presets; digests of presets
+            # made with another algorithm are not comparable (and may share a length)
+            matched = {preset_id: (digests_matched, files_matched) for preset_id, digests_matched, files_matched in
+                       self._db.execute("SELECT d.preset_id, COUNT(*), SUM(f.files)"
+                                        " FROM folder f JOIN digests d ON d.digest = f.digest"
+                                        " JOIN presets p ON p.id = d.preset_id"
+                                        " WHERE p.algorithm = ?"
+                                        " GROUP BY d.preset_id", (algorithm,))}
+            presets = self._db.execute("SELECT id, name, file, digest_count FROM presets WHERE algorithm = ?",
+                                       (algorithm,)).fetchall()
+            self._db.execute("DELETE FROM folder")
+
+        results = []
+        for preset_id, name, file, digest_count in presets:
+            digests_matched, files_matched = matched.get(preset_id, (0, 0))
+            folder_coverage = files_matched / folder_files if folder_files else 0.0
+            preset_coverage = digests_matched / digest_count if digest_count else 0.0
+            results.append({
+                "preset": name,
+                "file": file,
+                "algorithm": algorithm,
+                "files_matched": files_matched,
+                "folder_files": folder_files,
+                "folder_coverage": round(folder_coverage, 6),
+                "preset_digests": digest_count,
+                "preset_digests_found": digests_matched,
+                "preset_coverage": round(preset_coverage, 6),
+                "exact_match": files_matched == folder_files and digests_matched == digest_count,
+            })
+        return results
+
+    # ====================================================================================
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# ====================================================================================
+@contextlib.contextmanager
+def _rollback_on_error(db: sqlite3.Connection):
+    try:
+        yield
+    except BaseException:
+        db.rollback()
+        raise
+
+
+def _batches(items: Iterable, size: int) -> Iterable[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Best candidates first: most of the folder covered, then most of the preset present.
+def rank_matches(matches: List[dict], top: Optional[int] = None) -> List[dict]:
+    ranked = sorted(matches, key=lambda m: (m["folder_coverage"], m["preset_coverage"], m["preset"]), reverse=True)
+    return ranked[:top] if top else ranked
@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Iterator, Optional, Tuple
+
+
+#====================================================================================
+# On-disk state of a preset being created, next to the preset as <preset>.partial (sqlite). Every hashed
+# file is a row, committed every CHECKPOINT_EVERY_FILES files or CHECKPOINT_EVERY_SECONDS, so a crashed or
+# cancelled run loses at most that much work. A later run with the same settings resumes: files whose
+# (size, mtime_ns) still match their row are not hashed again. Rows are tagged with the run that last saw
+# the file, so files deleted in between do not end up in the preset. The final digests come out of sqlite
+# sorted and de-duplicated (sqlite sorts on disk), so memory stays flat whatever the size of the tree.
+PARTIAL_SUFFIX = '.partial'
+CHECKPOINT_EVERY_FILES = 1000
+CHECKPOINT_EVERY_SECONDS = 30.0
+
+
+class PresetCheckpoint:
+    """Resumable, append-as-you-go record of the files hashed for one preset."""
+
+    # ====================================================================================
+    def __init__(self, preset_path: str, settings: dict, resume: bool = True):
+        self.path = f"{preset_path}{PARTIAL_SUFFIX}"
+        if not resume:
+            self._remove_files()
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " rel_path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest BLOB, quick BLOB, run INTEGER)"
+        )
+
+        # a checkpoint taken with another algorithm, folder or walk options is useless: start over
+        settings_json = json.dumps(settings, sort_keys=True)
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if meta.get("settings") != settings_json:
+            self._db.execute("DELETE FROM entries")
+            meta = {}
+        self.run = int(meta.get("run", 0)) + 1
+        self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                             (("settings", settings_json), ("run", str(self.run))))
+        self._db.commit()
+
+        self.resumable = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        self.resumed = 0
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    # ====================================================================================
+    # (hex digest, hex quick key or None) of a file hashed by an earlier run, if its stat has not changed.
+    # The row is claimed for this run.
+    def resume(self, rel_path: str, size: int, mtime_ns: int) -> Optional[Tuple[str, Optional[str]]]:
+        row = self._db.execute("SELECT size, mtime_ns, digest, quick FROM entries WHERE rel_path = ?",
+                               (rel_path,)).fetchone()
+        if row is None or (row[0], row[1]) != (size, mtime_ns):
+            return None
+        self._db.execute("UPDATE entries SET run = ? WHERE rel_path = ?", (self.run, rel_path))
+        self.resumed += 1
+        self._written()
+        return row[2].hex(), row[3].hex() if row[3] is not None else None
+
+    def record(self, rel_path: str, size: int, mtime_ns: int, digest: str, quick: Optional[str] = None) -> None:
+        self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                         (rel_path, size, mtime_ns, bytes.fromhex(digest),
+                          bytes.fromhex(quick) if quick is not None else None, self.run))
+        self._written()
+
+    def _written(self) -> None:
+        self._uncommitted += 1
+        if self._uncommitted >= CHECKPOINT_EVERY_FILES or \
+                time.monotonic() - self._committed_at >= CHECKPOINT_EVERY_SECONDS:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self._db.commit()
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    # ====================================================================================
+    # What this run saw, for writing the final preset and sidecars
+    def files(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM entries WHERE run = ?", (self.run,)).fetchone()[0]
+
+    def digests(self) -> Tuple[int, Iterator[bytes]]:
+        return self._sorted_unique("digest")
+
+    def quick_keys(self) -> Tuple[int, Iterator[bytes]]:
+        return self._sorted_unique("quick")
+
+    def _sorted_unique(self, column: str) -> Tuple[int, Iterator[bytes]]:
+        self.checkpoint()
+        count = self._db.execute(f"SELECT COUNT(DISTINCT {column}) FROM entries WHERE run = ?",
+                                 (self.run,)).fetchone()[0]
+        rows = self._db.execute(f"SELECT DISTINCT {column} FROM entries WHERE run = ? AND {column} IS NOT NULL"
+                                f" ORDER BY {column}", (self.run,))
+        return count, (row[0] for row in rows)
+
+    # (rel_path, hex digest, size, mtime_ns) in path order, for the merkle tree and the manifest
+    def entries(self) -> Iterator[Tuple[str, str, int, int]]:
+        self.checkpoint()
+        rows = self._db.execute("SELECT rel_path, digest, size, mtime_ns FROM entries WHERE run = ? ORDER BY rel_path",
+                                (self.run,))
+        return ((rel_path, digest.hex(), size, mtime_ns) for rel_path, digest, size, mtime_ns in rows)
+
+    # ====================================================================================
+    # Keeps the checkpoint for the next run (cancel, crash, error)
+    def close(self) -> None:
+        self.checkpoint()
+        self._db.close()
+
+    # The preset was committed: the checkpoint has served its purpose
+    def discard(self) -> None:
+        self._db.close()
+        self._remove_files()
+
+    def _remove_files(self) -> None:
+        for path in (self.path, f"{self.path}-wal", f"{self.path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Iterable, Iterator, Optional
+
+from PresetIndex import SortedDigestIndex
+
+
+#====================================================================================
+# Binary preset layout (little endian):
+#   magic 'HITP' | format version u16 | algorithm name 16s (NUL padded) | digest size u16 | entry count u64
+# followed by count * digest_size bytes of raw digests in ascending order. The 32 byte header keeps the
+# digest array aligned, and the sorted array is binary-searched straight from the memory map.
+BINARY_PRESET_EXTENSION = '.hitp'
+JSON_PRESET_EXTENSION = '.json'
+PRESET_EXTENSIONS = (BINARY_PRESET_EXTENSION, JSON_PRESET_EXTENSION)
+# Files kept next to a preset that carry extra data for it; they are not presets themselves
+MERKLE_SUFFIX = '.merkle.json'  # MerklePreset: hierarchical digests and stat fingerprints
+QUICK_SUFFIX = '.quick.hitp'    # QuickCheck: sorted (size, sampled-block digest) keys
+MANIFEST_SUFFIX = '.manifest.tsv'  # Manifest: relative path -> (size, mtime_ns, digest)
+PRESET_SIDECAR_SUFFIXES = (MERKLE_SUFFIX, QUICK_SUFFIX, MANIFEST_SUFFIX)
+PRESET_MAGIC = b'HITP'
+PRESET_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sH16sHQ')
+
+
+class PresetFormatError(ValueError):
+    pass
+
+
+class BinaryPreset:
+    """Memory-mapped binary preset. Lookups binary-search the mapping, nothing is parsed into the heap."""
+
+    # ====================================================================================
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with open(self.path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise PresetFormatError(f"Truncated preset header: {self.path}")
+            magic, version, algorithm, digest_size, count = _HEADER.unpack(header)
+            if magic != PRESET_MAGIC:
+                raise PresetFormatError(f"Not a binary preset: {self.path}")
+            if version != PRESET_FORMAT_VERSION:
+                raise PresetFormatError(f"Unsupported preset format version {version}: {self.path}")
+
+            self.version = version
+            self.algorithm = algorithm.rstrip(b'\0').decode('ascii')
+            self.digest_size = digest_size
+            self.count = count
+            expected_size = _HEADER.size + count * digest_size
+            if os.fstat(f.fileno()).st_size < expected_size:
+                raise PresetFormatError(f"Truncated preset body: {self.path}")
+
+            self._mmap = mmap.mmap(f.fileno(), expected_size, access=mmap.ACCESS_READ)
+        self.index = SortedDigestIndex(self._mmap, digest_size, offset=_HEADER.size, count=count)
+
+    # ====================================================================================
+    def __contains__(self, file_hash) -> bool:
+        return file_hash in self.index
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        return (digest.hex() for digest in self.index.digests())
+
+    # ====================================================================================
+    @property
+    def closed(self) -> bool:
+        return self._mmap is None
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self.index.release()  # the memoryview into the mapping must go before the mapping itself
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ====================================================================================
+# Writes hex digests as a sorted, de-duplicated binary preset. Written to a temp file then renamed,
+# so a crash never leaves a half written preset behind.
+def write_binary_preset(path: str, hex_digests: Iterable[str], algorithm: str = 'sha256',
+                        digest_size: Optional[int] = None) -> int:
+    digests = sorted({bytes.fromhex(h) for h in hex_digests})
+    if digests:
+        digest_size = len(digests[0])
+    elif digest_size is None:
+        digest_size = hashlib.new(algorithm).digest_size
+    if any(len(d) != digest_size for d in digests):
+        raise PresetFormatError("All digests in a preset must have the same width")
+    return write_sorted_digests(path, digests, len(digests), algorithm, digest_size)
+
+
+# Streams digests that are already sorted and unique (e.g. straight from an sqlite ORDER BY) into a preset,
+# so the digests never have to be held in memory together. count must match what the iterable yields.
+def write_sorted_digests(path: str, digests: Iterable[bytes], count: int, algorithm: str, digest_size: int) -> int:
+    tmp_path = f"{path}.tmp"
+    written = 0
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(PRESET_MAGIC, PRESET_FORMAT_VERSION, algorithm.encode('ascii'), digest_size, count))
+        for digest in digests:
+            if len(digest) != digest_size:
+                raise PresetFormatError("All digests in a preset must have the same width")
+            f.write(digest)
+            written += 1
+        if written != count:
+            raise PresetFormatError(f"Expected {count} digests, got {written}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return written
+
+
+# ====================================================================================
+def is_preset_filename(name: str) -> bool:
+    name = name.lower()
+    return name.endswith(PRESET_EXTENSIONS) and not name.endswith(PRESET_SIDECAR_SUFFIXES)
+
+
+# ====================================================================================
+# Reads just the header, for listings that must not map the whole file.
+def read_preset_header(path: str) -> Optional[dict]:
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, algorithm, digest_size, count = _HEADER.unpack(header)
+    if magic != PRESET_MAGIC:
+        return None
+    return {
+        "version": version,
+        "algorithm": algorithm.rstrip(b'\0').decode('ascii'),
+        "digest_size": digest_size,
+        "count": count,
+    }
+
+
+# ====================================================================================
+# Loads a preset file in either format: a BinaryPreset for .hitp, a list of hex digests for legacy .json
+def load_preset_file(path: str):
+    if path.endswith(BINARY_PRESET_EXTENSION):
+        return BinaryPreset(path)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# ====================================================================================
+# Converts a legacy JSON preset to the binary format next to it. Returns the new path.
+def convert_json_preset(json_path: str, remove_source: bool = False) -> str:
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise PresetFormatError(f"Not a JSON preset list: {json_path}")
+
+    binary_path = os.path.splitext(json_path)[0] + BINARY_PRESET_EXTENSION
+    write_binary_preset(binary_path, data)
+    if remove_source:
+        os.remove(json_path)
+    return binary_path
+
+
+#====================================================================================
+# python PresetFormat.py convert <preset.json>... [--remove-source]
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert JSON presets to the binary preset format.")
+    parser.add_argument("command", choices=["convert"])
+    parser.add_argument("paths", nargs="+", help="JSON preset files to convert")
+    parser.add_argument("--remove-source", action="store_true", help="delete the JSON file after converting")
+    args = parser.parse_args()
+
+    for json_path in args.paths:
+        try:
+            print(f"[OK] {json_path} -> {convert_json_preset(json_path, args.remove_source)}")
+        except (OSError, ValueError) as e:
+            print(f"[Error] {json_path}: {e}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,95 @@
+from typing import Iterable, List
+
+
+#====================================================================================
+# Presets with more entries than this are indexed as a sorted digest array instead of a set.
+# A set of hex strings costs ~130 bytes per entry, the sorted array costs exactly digest_size bytes.
+SORTED_INDEX_THRESHOLD = 1_000_000
+
+
+class HashSetIndex:
+    """Hash set over the hex digests of a preset."""
+
+    # ====================================================================================
+    def __init__(self, hashes: Iterable[str]):
+        self._hashes = frozenset(h.lower() for h in hashes)
+
+    def __contains__(self, file_hash: str) -> bool:
+        return file_hash.lower() in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class SortedDigestIndex:
+    """Sorted array of fixed-width raw digests, probed by binary search."""
+
+    # ====================================================================================
+    # buffer holds count * digest_size bytes of digests in ascending order (bytes, bytearray or mmap)
+    def __init__(self, buffer, digest_size: int, offset: int = 0, count: int = None):
+        self.digest_size = digest_size
+        self._view = memoryview(buffer)[offset:]
+        self._count = len(self._view) // digest_size if count is None else count
+
+    # ====================================================================================
+    # Builds the sorted array from hex digests. Duplicates are kept out.
+    @classmethod
+    def from_hex(cls, hashes: Iterable[str]) -> "SortedDigestIndex":
+        digests = sorted({bytes.fromhex(h) for h in hashes})
+        digest_size = len(digests[0]) if digests else 32
+        if any(len(d) != digest_size for d in digests):
+            raise ValueError("Digests of mixed width cannot share a sorted index")
+        return cls(b"".join(digests), digest_size)
+
+    # ====================================================================================
+    def __contains__(self, file_hash) -> bool:
+        try:
+            needle = bytes.fromhex(file_hash) if isinstance(file_hash, str) else bytes(file_hash)
+        except ValueError:
+            return False
+        if len(needle) != self.digest_size:
+            return False
+
+        size = self.digest_size
+        view = self._view
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = view[mid * size:(mid + 1) * size].tobytes()
+            if probe < needle:
+                lo = mid + 1
+            elif probe > needle:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ====================================================================================
+    # Releases the view so the underlying mmap can be closed
+    def release(self) -> None:
+        self._view.release()
+        self._count = 0
+
+    # ====================================================================================
+    def digests(self) -> Iterable[bytes]:
+        size = self.digest_size
+        for i in range(self._count):
+            yield self._view[i * size:(i + 1) * size].tobytes()
+
+
+# ====================================================================================
+# Picks the index type for a preset loaded as a list of hex digests.
+# Binary presets (PresetFormat.BinaryPreset) already carry a sorted digest index and are used as is.
+def build_preset_index(hashes: List[str]):
+    from PresetFormat import BinaryPreset  # imported here: PresetFormat imports this module
+    if isinstance(hashes, BinaryPreset):
+        return hashes.index
+    if len(hashes) > SORTED_INDEX_THRESHOLD:
+        try:
+            return SortedDigestIndex.from_hex(hashes)
+        except ValueError:
+            pass  # not all entries are hex digests of one width, fall back to a plain set
+    return HashSetIndex(hashes)
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from PresetFormat import BINARY_PRESET_EXTENSION, BinaryPreset, is_preset_filename, load_preset_file, read_preset_header
+
+
+#====================================================================================
+# Cached view of a preset folder for the UI and the Model: the sorted listing, a summary per preset and the
+# last few loaded presets. Everything is keyed by stat signatures, so nothing is re-read unless it changed:
+# the listing is revalidated against the directory's mtime (at most every LISTING_RECHECK_SECONDS, cheap
+# enough to ask for every frame), summaries and loaded presets against each file's (size, mtime_ns).
+LISTING_RECHECK_SECONDS = 1.0
+LOADED_PRESETS_MAX = 8  # parsed legacy JSON presets are lists of hex strings; keep only the recent ones
+
+
+class PresetLibrary:
+    """Thread-safe cache of a preset folder's listing, per-preset summaries and loaded presets."""
+
+    # ====================================================================================
+    def __init__(self, preset_folder: str, preset_prefix: str = "",
+                 recheck_seconds: float = LISTING_RECHECK_SECONDS, max_loaded: int = LOADED_PRESETS_MAX):
+        self.preset_folder = os.path.abspath(preset_folder)
+        self.preset_prefix = preset_prefix
+        self.recheck_seconds = recheck_seconds
+        self.max_loaded = max_loaded
+        self._lock = threading.Lock()
+        self._listing: List[str] = []
+        self._listing_mtime_ns: Optional[int] = None
+        self._listing_checked_at = float("-inf")
+        self._summaries: Dict[str, Tuple[Tuple[int, int], dict]] = {}        # path -> (signature, summary)
+        self._loaded: "OrderedDict[str, Tuple[Tuple[int, int], object]]" = OrderedDict()  # LRU, same keys
+        self.version = 0  # bumped whenever the listing changes, so callers can skip redundant UI updates
+
+    # ====================================================================================
+    # Sorted preset file names (no sidecars)
+    def filenames(self) -> List[str]:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._listing_checked_at < self.recheck_seconds:
+                return list(self._listing)
+            self._listing_checked_at = now
+
+            try:
+                mtime_ns = os.stat(self.preset_folder).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != self._listing_mtime_ns:
+                names = []
+                if mtime_ns is not None:
+                    names = sorted(n for n in os.listdir(self.preset_folder)
+                                   if n.startswith(self.preset_prefix) and is_preset_filename(n))
+                if names != self._listing:
+                    self._listing = names
+                    self.version += 1
+                    self._forget_missing(set(os.path.join(self.preset_folder, n) for n in names))
+                self._listing_mtime_ns = mtime_ns
+            return list(self._listing)
+
+    def paths(self) -> List[str]:
+        return [os.path.join(self.preset_folder, name) for name in self.filenames()]
+
+    # Forces the next filenames() to re-list, e.g. right after writing a preset
+    def invalidate(self) -> None:
+        with self._lock:
+            self._listing_checked_at = float("-inf")
+            self._listing_mtime_ns = None
+
+    def _forget_missing(self, paths: set) -> None:
+        for cache in (self._summaries, self._loaded):
+            for path in [p for p in cache if p not in paths]:
+                del cache[path]
+
+    # ====================================================================================
+    # Summary of one preset without its hashes: name, format, algorithm, entries, size and times
+    def summary(self, path: str) -> dict:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        signature = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._summaries.get(path)
+            if cached is not None and cached[0] == signature:
+                return dict(cached[1])
+
+        summary = self._read_summary(path, st)
+        with self._lock:
+            self._summaries[path] = (signature, summary)
+        return dict(summary)
+
+    def summaries(self) -> List[dict]:
+        summaries = []
+        for path in self.paths():
+            try:
+                summaries.append(self.summary(path))
+            except FileNotFoundError:
+                continue  # removed since the listing was taken
+        return summaries
+
+    def _read_summary(self, path: str, st: os.stat_result) -> dict:
+        stem, extension = os.path.splitext(os.path.basename(path))
+        # presets are written once (temp file + rename), so without a birth time the mtime is the creation time
+        created = getattr(st, "st_birthtime", st.st_mtime)
+        summary = {
+            "name": stem[len(self.preset_prefix):] if stem.startswith(self.preset_prefix) else stem,
+            "file": path,
+            "format": "binary" if extension == BINARY_PRESET_EXTENSION else "json",
+            "size_bytes": st.st_size,
+            "created_at": datetime.fromtimestamp(created).astimezone().isoformat(),
+            "modified_at": datetime.fromtimestamp(st.st_mtime).astimezone().isoformat(),
+        }
+        if extension == BINARY_PRESET_EXTENSION:
+            header = read_preset_header(path) or {}
+            summary["algorithm"] = header.get("algorithm")
+            summary["entries"] = header.get("count")
+        else:
+            try:
+                data = self.load(path)
+            except ValueError:  # json.JSONDecodeError
+                data = None
+            summary["algorithm"] = "sha256"  # legacy JSON presets predate the algorithm setting
+            summary["entries"] = len(data) if isinstance(data, list) else 0
+        return summary
+
+    # ====================================================================================
+    # The parsed preset (BinaryPreset or list of hex digests), shared between callers until the file changes.
+    # Raises what load_preset_file raises. A BinaryPreset closed by a caller is simply mapped again.
+    def load(self, path: str):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        signature = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._loaded.get(path)
+            if cached is not None and cached[0] == signature and \
+                    not (isinstance(cached[1], BinaryPreset) and cached[1].closed):
+                self._loaded.move_to_end(path)
+                return cached[1]
+
+        # a replaced preset is only dropped, not closed: a running job may still hold the old mapping
+        preset = load_preset_file(path)
+        with self._lock:
+            self._loaded[path] = (signature, preset)
+            self._loaded.move_to_end(path)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return preset
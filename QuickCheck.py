@@ -0,0 +1,55 @@
+import hashlib
+import os
+from typing import Iterable, Optional
+
+from PresetFormat import BinaryPreset, PresetFormatError, write_binary_preset, write_sorted_digests
+
+
+#====================================================================================
+# Quick tier of tiered verification. Each file gets a key made of its size and a cheap digest of a few
+# sampled blocks (head, middle, tail). Identical files always have identical keys, so a file whose key
+# is not in the preset's quick index cannot match any preset entry and is rejected without a full read.
+# The keys are stored as a binary preset (algorithm QUICK_ALGORITHM) next to the preset, as QUICK_SUFFIX.
+QUICK_ALGORITHM = 'hit-quick-v1'
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_DIGEST_SIZE = 16
+QUICK_KEY_SIZE = 8 + SAMPLE_DIGEST_SIZE  # big-endian size, then the sample digest
+
+
+# ====================================================================================
+# Returns the quick key of a file as hex. Files up to three blocks long are read whole.
+def quick_key(path: str, size: Optional[int] = None) -> str:
+    with open(path, "rb", buffering=0) as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        sample = hashlib.blake2b(digest_size=SAMPLE_DIGEST_SIZE)
+        sample.update(size.to_bytes(8, "big"))
+
+        if size <= 3 * SAMPLE_BLOCK_SIZE:
+            sample.update(f.read())
+        else:
+            for offset in (0, size // 2 - SAMPLE_BLOCK_SIZE // 2, size - SAMPLE_BLOCK_SIZE):
+                f.seek(offset)
+                sample.update(f.read(SAMPLE_BLOCK_SIZE))
+
+    return size.to_bytes(8, "big").hex() + sample.hexdigest()
+
+
+# ====================================================================================
+def write_quick_index(path: str, keys: Iterable[str]) -> int:
+    return write_binary_preset(path, keys, algorithm=QUICK_ALGORITHM, digest_size=QUICK_KEY_SIZE)
+
+
+# Same, from raw keys that are already sorted and unique (see PresetCheckpoint.quick_keys)
+def write_sorted_quick_index(path: str, keys: Iterable[bytes], count: int) -> int:
+    return write_sorted_digests(path, keys, count, QUICK_ALGORITHM, QUICK_KEY_SIZE)
+
+
+def load_quick_index(path: str) -> Optional[BinaryPreset]:
+    if not os.path.isfile(path):
+        return None
+    index = BinaryPreset(path)
+    if index.algorithm != QUICK_ALGORITHM or index.digest_size != QUICK_KEY_SIZE:
+        index.close()
+        raise PresetFormatError(f"Not a quick-check index: {path}")
+    return index
@@ -0,0 +1,139 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional
+
+
+#====================================================================================
+# Statistical spot-check: hash a seeded random sample of the folder instead of all of it, sized so that a
+# corruption rate of at least tolerated_rate would show up in the sample with the requested confidence.
+#
+# Uniform sampling rotates: every file gets a fixed pseudo-random key in [0, 1) from (seed, rel path), and
+# each run takes the files whose keys follow the previous run's end point on the circle. Each run is still a
+# uniform random sample, and ceil(files / sample) runs cover the whole tree once (a "cycle"), new files
+# included. Size or age weighting instead draws a fresh weighted sample each run (Efraimidis-Spirakis keys
+# seeded with the run number), so big or old files are checked more often and coverage is probabilistic.
+SAMPLE_WEIGHTINGS = ('uniform', 'size', 'age')
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_TOLERATED_RATE = 0.01
+SPOT_CHECK_STATE_VERSION = 1
+
+
+@dataclass
+class SpotCheckState:
+    seed: int
+    offset: float = 0.0   # where the next uniform run starts on the key circle
+    cycle: int = 0        # completed passes over the key circle
+    runs: int = 0
+    version: int = SPOT_CHECK_STATE_VERSION
+
+
+# ====================================================================================
+def load_state(path: str, seed: Optional[int] = None) -> SpotCheckState:
+    state = None
+    if os.path.isfile(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == SPOT_CHECK_STATE_VERSION:
+                state = SpotCheckState(**data)
+        except (ValueError, TypeError):
+            state = None
+    # a different seed is a different sample space: start its rotation from the beginning
+    if state is None or (seed is not None and seed != state.seed):
+        state = SpotCheckState(seed=seed if seed is not None else int.from_bytes(os.urandom(6), "big"))
+    return state
+
+
+def save_state(path: str, state: SpotCheckState) -> None:
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(asdict(state), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ====================================================================================
+# Files to check so that, if at least tolerated_rate of the population is corrupt, the sample contains at
+# least one corrupt file with probability >= confidence (sampling without replacement).
+def sample_size(population: int, confidence: float = DEFAULT_CONFIDENCE,
+                tolerated_rate: float = DEFAULT_TOLERATED_RATE) -> int:
+    if not 0 < confidence < 1 or not 0 < tolerated_rate <= 1:
+        raise ValueError("confidence must be in (0, 1) and tolerated_rate in (0, 1]")
+    if population <= 0:
+        return 0
+    corrupt = max(1, math.ceil(tolerated_rate * population))
+    # P(no corrupt file in n draws) ~ (1 - n / N) ** corrupt <= 1 - confidence
+    n = population * (1 - (1 - confidence) ** (1 / corrupt))
+    return min(population, max(1, math.ceil(n)))
+
+
+# One-sided Clopper-Pearson upper bound on the corruption rate after finding `failures` in `sample` files
+def corruption_upper_bound(failures: int, sample: int, confidence: float = DEFAULT_CONFIDENCE) -> float:
+    if sample <= 0:
+        return 1.0
+    if failures >= sample:
+        return 1.0
+    if failures == 0:
+        return 1 - (1 - confidence) ** (1 / sample)
+    alpha = 1 - confidence
+    low, high = failures / sample, 1.0
+    for _ in range(60):
+        mid = (low + high) / 2
+        if _binomial_cdf(failures, sample, mid) > alpha:
+            low = mid
+        else:
+            high = mid
+    return high
+
+
+def _binomial_cdf(k: int, n: int, p: float) -> float:
+    log_p, log_q = math.log(p), math.log1p(-p)
+    return sum(math.exp(math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) + i * log_p +
+                        (n - i) * log_q) for i in range(k + 1))
+
+
+# ====================================================================================
+def _unit_key(seed: int, salt: str, rel_path: str) -> float:
+    digest = hashlib.blake2b(f"{seed}\0{salt}\0{rel_path}".encode("utf-8", "surrogateescape"),
+                             digest_size=8).digest()
+    return (int.from_bytes(digest, "big") + 0.5) / 2 ** 64
+
+
+def _weight(entry, weighting: str, now: float) -> float:
+    if weighting == 'size':
+        return float(max(entry.stat.st_size, 1))
+    return max(now - entry.stat.st_mtime, 1.0) / 86400  # age in days
+
+
+# Picks `size` walker entries for this run and advances the state. Memory is O(size), not O(files).
+def select_sample(entries: Iterable, size: int, state: SpotCheckState, weighting: str = 'uniform',
+                  now: Optional[float] = None) -> List:
+    if weighting not in SAMPLE_WEIGHTINGS:
+        raise ValueError(f"Unknown weighting '{weighting}', expected one of {SAMPLE_WEIGHTINGS}")
+    now = time.time() if now is None else now
+    state.runs += 1
+    if size <= 0:
+        return []
+
+    if weighting == 'uniform':
+        # distance along the circle from where the last run stopped; the nearest `size` files are this run's
+        nearest = heapq.nsmallest(size, (((_unit_key(state.seed, "", e.rel_path) - state.offset) % 1.0,
+                                          e.rel_path, e) for e in entries))
+        if not nearest:
+            return []
+        farthest = nearest[-1][0]
+        if state.offset + farthest >= 1.0 or len(nearest) < size:
+            state.cycle += 1  # went all the way round (or the whole folder fit in one run)
+        state.offset = (state.offset + farthest + 1e-12) % 1.0
+        return [entry for _, _, entry in sorted(nearest, key=lambda item: item[1])]
+
+    # Efraimidis-Spirakis: key u ** (1 / w), keep the largest; a new salt per run gives a new sample
+    salt = f"run{state.runs}"
+    heaviest = heapq.nlargest(size, ((_unit_key(state.seed, salt, e.rel_path) ** (1 / _weight(e, weighting, now)),
+                                      e.rel_path, e) for e in entries))
+    return [entry for _, _, entry in sorted(heaviest, key=lambda item: item[1])]
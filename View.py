@@ -7,6 +7,9 @@ import tkinter as tk
 from tkinter import filedialog
 import pygame
 
+from LogSink import LogSink
+from PresetLibrary import PresetLibrary
+
 
 #====================================================================================
 @dataclass
@@ -20,6 +23,9 @@ class ViewHandles:
     log_box: int
     folder_dialog: int
     clear_log_btn: int
+    cancel_btn: int
+    progress_bar: int
+    progress_text: int
 
 
 class View:
@@ -28,6 +34,8 @@ class View:
     # ====================================================================================
     def __init__(self) -> None:
         self.handles: Optional[ViewHandles] = None
+        self.on_frame: Optional[Callable[[], None]] = None
+        self.log_sink = LogSink()
 
     # ====================================================================================
     def _select_verification_folder_windows(self) -> str | None:
@@ -55,7 +63,10 @@ class View:
         on_verify_clicked: Callable[[], None],
         on_folder_picked: Callable[[str | None], None],
         on_clear_log_clicked: Callable[[], None],
+        on_cancel_clicked: Callable[[], None] = lambda: None,
+        on_frame: Optional[Callable[[], None]] = None,
     ) -> None:
+        self.on_frame = on_frame
         dpg.create_context()
         dpg.create_viewport(title="(H.I.T.) - Hash Integrity Tool", width=976, height=535)
 
@@ -137,11 +148,26 @@ class View:
                 return presets_dir_script
             return presets_dir_cwd
 
-        def _list_preset_files() -> list[str]:
+        # cached listing per directory: hovering the dropdown asks every frame, the folder is re-listed only
+        # when its mtime changes (see PresetLibrary)
+        preset_libraries: dict[str, PresetLibrary] = {}
+        shown_listing: list = [None]  # (directory, listing version) currently in the combo
+
+        def _preset_library() -> PresetLibrary:
             preset_dir = _get_presets_dir()
-            if not os.path.isdir(preset_dir):
-                return []
-            return sorted([n for n in os.listdir(preset_dir) if n.lower().endswith(".json")])
+            if preset_dir not in preset_libraries:
+                preset_libraries[preset_dir] = PresetLibrary(preset_dir)
+            return preset_libraries[preset_dir]
+
+        def _list_preset_files() -> list[str]:
+            return _preset_library().filenames()
+
+        def _refresh_presets_combo() -> None:
+            library = _preset_library()
+            items = library.filenames()
+            if shown_listing[0] != (library.preset_folder, library.version):
+                shown_listing[0] = (library.preset_folder, library.version)
+                dpg.configure_item(presets_combo, items=items or ["(no presets found)"])
 
         with dpg.window(tag="primary", label="B.A.D. - H.I.T.", width=957, height=620, pos=[1.9,0], no_close=True):
             dpg.add_separator()
@@ -173,12 +199,7 @@ class View:
 
                 # Refresh preset list when the user hovers the dropdown (covers arrow-click too)
                 with dpg.item_handler_registry(tag="presets_combo_handlers"):
-                    dpg.add_item_hover_handler(
-                        callback=lambda: dpg.configure_item(
-                            presets_combo,
-                            items=_list_preset_files() or ["(no presets found)"]
-                        )
-                    )
+                    dpg.add_item_hover_handler(callback=lambda: _refresh_presets_combo())
                 dpg.bind_item_handler_registry(presets_combo, "presets_combo_handlers")
 
             current_folder_text = dpg.add_text("Verification folder: (not set)")
@@ -192,11 +213,19 @@ class View:
                 dpg.bind_item_theme(verify_btn, red_button_theme)
                 clear_log_btn = dpg.add_button(label='Clear Log', width=180, callback=lambda: on_clear_log_clicked())
                 dpg.bind_item_theme(clear_log_btn, red_button_theme)
+                cancel_btn = dpg.add_button(label='Cancel', width=180, enabled=False,
+                                            callback=lambda: on_cancel_clicked())
+                dpg.bind_item_theme(cancel_btn, red_button_theme)
+
+            # Progress of the running job (files, bytes, throughput)
+            with dpg.group(horizontal=True):
+                progress_bar = dpg.add_progress_bar(default_value=0.0, width=400, overlay="idle")
+                progress_text = dpg.add_text("")
 
             dpg.add_separator()
             dpg.add_text("Output:")
 
-            with dpg.child_window(tag="log_child",height=360, horizontal_scrollbar=True):
+            with dpg.child_window(tag="log_child",height=335, horizontal_scrollbar=True):
                 log_box = dpg.add_input_text(
                     multiline=True,
                     readonly=True,
@@ -215,6 +244,9 @@ class View:
             action_btn=action_btn,
             verify_btn=verify_btn,
             clear_log_btn=clear_log_btn,
+            cancel_btn=cancel_btn,
+            progress_bar=progress_bar,
+            progress_text=progress_text,
             log_box=log_box,
             folder_dialog=0,
         )
@@ -226,7 +258,12 @@ class View:
 
     # ===============================(UI HELPERS)=========================================
     def start(self) -> None:
-        dpg.start_dearpygui()
+        # manual render loop so queued job events can be applied on the UI thread once per frame
+        while dpg.is_dearpygui_running():
+            if self.on_frame is not None:
+                self.on_frame()
+            self.flush_log()
+            dpg.render_dearpygui_frame()
         dpg.destroy_context()
 
     def get_mode(self) -> str:
@@ -256,17 +293,26 @@ class View:
         assert self.handles is not None
         dpg.configure_item(self.handles.clear_log_btn, enabled=enabled)
 
+    def enable_cancel_button(self, enabled: bool) -> None:
+        assert self.handles is not None
+        dpg.configure_item(self.handles.cancel_btn, enabled=enabled)
+
+    def set_progress(self, fraction: float, text: str) -> None:
+        assert self.handles is not None
+        dpg.set_value(self.handles.progress_bar, fraction)
+        dpg.configure_item(self.handles.progress_bar, overlay=f"{fraction * 100:.0f}%")
+        dpg.set_value(self.handles.progress_text, text)
+
+    # Buffered: the log box itself is updated at most once per frame by flush_log()
     def log(self, msg: str, *, newline: bool = True) -> None:
+        self.log_sink.write(msg, newline)
+
+    def flush_log(self) -> None:
         assert self.handles is not None
-        current = dpg.get_value(self.handles.log_box) or ""
-        if newline and current:
-            current += "\n"
-        current += msg
-        dpg.set_value(self.handles.log_box, current)
+        self.log_sink.flush(lambda text: dpg.set_value(self.handles.log_box, text))
 
     def clear_log(self) -> None:
-        assert self.handles is not None
-        dpg.set_value(self.handles.log_box, "")
+        self.log_sink.clear()
 
     def play_sound(self, filename: str, wait: bool = True) -> None:
         path = os.path.abspath(filename)
@@ -0,0 +1,292 @@
+import fnmatch
+import os
+import stat as stat_module
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from Archives import ARCHIVE_POLICIES, is_archive
+
+
+#====================================================================================
+# Shared folder walker for create and verify. Built on os.scandir so the type of every entry comes from
+# the directory listing and each file is stat'ed at most once (DirEntry caches it); the stat is handed on
+# to the hashing stage and the cache instead of being taken again.
+IGNORE_FILENAME = '.hitignore'
+SYMLINK_POLICIES = ('files', 'skip', 'follow')  # files: follow links to files, not to dirs (os.walk default)
+HARDLINK_POLICIES = ('once', 'all')             # once: each inode is hashed once, other links reuse its digest
+SPECIAL_FILE_POLICIES = ('skip', 'error')       # fifos, sockets and devices are never opened
+
+
+class WalkError(OSError):
+    pass
+
+
+class IgnoreRules:
+    """gitignore-style rules: one glob per line, '#' comments, '!' re-includes, a trailing '/' matches
+    directories only, and a pattern containing '/' is anchored to the folder the rules belong to.
+    The last matching rule wins."""
+
+    # ====================================================================================
+    def __init__(self, rules: Sequence[Tuple[str, str, bool, bool, bool]] = ()):
+        # (base rel dir, pattern, negated, dir_only, anchored)
+        self.rules = list(rules)
+
+    @staticmethod
+    def parse(lines: Iterable[str], base: str = "") -> List[Tuple[str, str, bool, bool, bool]]:
+        rules = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            rules.append((base, line.lstrip("/"), negated, dir_only, anchored))
+        return rules
+
+    def extended(self, rules: Sequence[Tuple[str, str, bool, bool, bool]]) -> "IgnoreRules":
+        return IgnoreRules(self.rules + list(rules)) if rules else self
+
+    # ====================================================================================
+    # rel_path uses '/' separators and is relative to the walked root
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        result = False
+        name = rel_path.rsplit("/", 1)[-1]
+        for base, pattern, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if anchored:
+                if base and not rel_path.startswith(f"{base}/"):
+                    continue
+                matched = fnmatch.fnmatchcase(rel_path[len(base) + 1:] if base else rel_path, pattern)
+            else:
+                matched = fnmatch.fnmatchcase(name, pattern)
+            if matched:
+                result = not negated
+        return result
+
+
+class WalkEntry:
+    """One regular file found by the walker. stat is taken lazily and only once."""
+
+    __slots__ = ("path", "rel_path", "link_of", "_dir_entry", "_stat")
+
+    # ====================================================================================
+    def __init__(self, path: str, rel_path: str, dir_entry: Optional[os.DirEntry],
+                 st: Optional[os.stat_result] = None):
+        self.path = path
+        self.rel_path = rel_path
+        self.link_of: Optional[str] = None  # first path seen for the same inode (hardlinks='once')
+        self._dir_entry = dir_entry
+        self._stat = st
+
+    @property
+    def stat(self) -> os.stat_result:
+        if self._stat is None:
+            self._stat = self._dir_entry.stat(follow_symlinks=True)
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+
+class ArchiveEntry(WalkEntry):
+    """An archive walked with archives='members': hashing expands it into its members (see Archives)."""
+
+    __slots__ = ()
+
+
+class Walker:
+    """Yields a WalkEntry for every regular file under root, files of a folder before its subfolders,
+    in sorted order, so presets built from it are deterministic."""
+
+    # ====================================================================================
+    def __init__(self, root: str, include: Sequence[str] = (), exclude: Sequence[str] = (),
+                 symlinks: str = 'files', hardlinks: str = 'once', special_files: str = 'skip',
+                 archives: str = 'files', ignore_filename: Optional[str] = IGNORE_FILENAME,
+                 on_skip: Optional[Callable[[str, str], None]] = None):
+        for value, allowed, what in ((symlinks, SYMLINK_POLICIES, "symlink"),
+                                     (hardlinks, HARDLINK_POLICIES, "hardlink"),
+                                     (special_files, SPECIAL_FILE_POLICIES, "special file"),
+                                     (archives, ARCHIVE_POLICIES, "archive")):
+            if value not in allowed:
+                raise ValueError(f"Unknown {what} policy '{value}', expected one of {allowed}")
+        self.root = os.path.abspath(root)
+        self.include = tuple(include)
+        self.rules = IgnoreRules(IgnoreRules.parse(exclude))
+        self.symlinks = symlinks
+        self.hardlinks = hardlinks
+        self.special_files = special_files
+        self.archives = archives
+        self.ignore_filename = ignore_filename
+        self.on_skip = on_skip or (lambda path, reason: None)
+
+    # ====================================================================================
+    def __iter__(self) -> Iterator[WalkEntry]:
+        return self.walk()
+
+    # Walks the whole tree, or only the subfolder rel_dir ('/' separated) with the rules that apply there
+    def walk(self, rel_dir: str = "") -> Iterator[WalkEntry]:
+        rel_dir = rel_dir.strip("/")
+        start = self._folder_at(rel_dir)
+        if start is None:
+            return
+        folder, rules = start
+
+        inodes: Dict[Tuple[int, int], str] = {}
+        # with 'follow', the (st_dev, st_ino) of every folder entered, so each real folder is walked once
+        # and a link back to an ancestor cannot loop
+        visited = set()
+        root_st = os.stat(folder)
+        visited.add((root_st.st_dev, root_st.st_ino))
+
+        stack = [(folder, f"{rel_dir}/" if rel_dir else "", rules)]
+        while stack:
+            folder, rel_dir, rules = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    dir_entries = sorted(it, key=lambda e: e.name)
+            except OSError as e:
+                self.on_skip(folder, f"unreadable: {e.strerror}")
+                continue
+
+            subdirs = []
+            for dir_entry in dir_entries:
+                rel_path = f"{rel_dir}{dir_entry.name}"
+                if dir_entry.name == self.ignore_filename:
+                    continue  # the rules file configures the walk, it is not part of the data
+
+                is_link = dir_entry.is_symlink()
+                if is_link and self.symlinks == 'skip':
+                    self.on_skip(dir_entry.path, "symlink")
+                    continue
+                try:
+                    is_dir = dir_entry.is_dir(follow_symlinks=True)
+                except OSError:
+                    is_dir = False
+
+                if rules.ignored(rel_path, is_dir):
+                    continue
+
+                if is_dir:
+                    if is_link and self.symlinks != 'follow':
+                        self.on_skip(dir_entry.path, "symlink to a folder")
+                        continue
+                    if self.symlinks == 'follow':
+                        st = dir_entry.stat(follow_symlinks=True)
+                        if (st.st_dev, st.st_ino) in visited:
+                            self.on_skip(dir_entry.path, "folder already walked (symlink loop)")
+                            continue
+                        visited.add((st.st_dev, st.st_ino))
+                    subdirs.append((dir_entry.path, f"{rel_path}/"))
+                    continue
+
+                entry = self._file_entry(dir_entry, rel_path, is_link, inodes)
+                if entry is not None:
+                    yield entry
+
+            # pushed in reverse so they are popped (and walked) in sorted order
+            for path, sub_rel_dir in reversed(subdirs):
+                stack.append((path, sub_rel_dir, self._rules_for(path, sub_rel_dir.rstrip("/"), rules)))
+
+    # ====================================================================================
+    def _file_entry(self, dir_entry: os.DirEntry, rel_path: str, is_link: bool,
+                    inodes: Dict[Tuple[int, int], str]) -> Optional[WalkEntry]:
+        if self.include and not any(fnmatch.fnmatchcase(rel_path, p) or fnmatch.fnmatchcase(dir_entry.name, p)
+                                    for p in self.include):
+            return None
+
+        try:
+            is_file = dir_entry.is_file(follow_symlinks=True)
+        except OSError:
+            is_file = False
+        if not is_file:
+            if is_link and not os.path.exists(dir_entry.path):
+                self.on_skip(dir_entry.path, "broken symlink")
+                return None
+            try:
+                mode = dir_entry.stat(follow_symlinks=True).st_mode
+            except OSError as e:
+                self.on_skip(dir_entry.path, f"unreadable: {e.strerror}")
+                return None
+            if stat_module.S_ISFIFO(mode) or stat_module.S_ISSOCK(mode) or stat_module.S_ISCHR(mode) \
+                    or stat_module.S_ISBLK(mode):
+                if self.special_files == 'error':
+                    raise WalkError(f"Special file in the tree: {dir_entry.path}")
+                self.on_skip(dir_entry.path, "special file")
+            return None
+
+        if self.archives == 'members' and is_archive(dir_entry.name):
+            # never treated as a hardlink: each link is expanded into its own members
+            return ArchiveEntry(dir_entry.path, rel_path.replace("/", os.sep), dir_entry)
+        entry = WalkEntry(dir_entry.path, rel_path.replace("/", os.sep), dir_entry)
+        if self.hardlinks == 'once':
+            st = entry.stat
+            if st.st_nlink > 1:
+                key = (st.st_dev, st.st_ino)
+                entry.link_of = inodes.setdefault(key, entry.path)
+                if entry.link_of == entry.path:
+                    entry.link_of = None
+        return entry
+
+    # ====================================================================================
+    # The entry for one file given by its '/' separated path relative to root, or None if the walk would
+    # not yield it (missing, ignored, a folder, a link the policy skips...). Used to re-check single files.
+    def entry_for(self, rel_path: str) -> Optional[WalkEntry]:
+        rel_dir, _, name = rel_path.rpartition("/")
+        location = self._folder_at(rel_dir)
+        if location is None or name == self.ignore_filename:
+            return None
+        folder, rules = location
+        path = os.path.join(folder, name)
+        try:
+            is_link = stat_module.S_ISLNK(os.lstat(path).st_mode)
+            if is_link and self.symlinks == 'skip':
+                return None
+            st = os.stat(path)
+        except OSError:
+            return None  # gone, or a broken symlink
+
+        if stat_module.S_ISDIR(st.st_mode) or rules.ignored(rel_path, False):
+            return None
+        if self.include and not any(fnmatch.fnmatchcase(rel_path, p) or fnmatch.fnmatchcase(name, p)
+                                    for p in self.include):
+            return None
+        if not stat_module.S_ISREG(st.st_mode):
+            if self.special_files == 'error':
+                raise WalkError(f"Special file in the tree: {path}")
+            return None
+        return WalkEntry(path, rel_path.replace("/", os.sep), None, st)
+
+    # Folder path and rules for a '/' separated rel_dir, or None if the walk would not enter it
+    def _folder_at(self, rel_dir: str) -> Optional[Tuple[str, IgnoreRules]]:
+        folder, rules = self.root, self._rules_for(self.root, "", self.rules)
+        walked = ""
+        for part in rel_dir.split("/") if rel_dir else ():
+            walked = f"{walked}/{part}" if walked else part
+            folder = os.path.join(folder, part)
+            if not os.path.isdir(folder) or rules.ignored(walked, True):
+                return None
+            if self.symlinks != 'follow' and os.path.islink(folder):
+                return None
+            rules = self._rules_for(folder, walked, rules)
+        return folder, rules
+
+    # ====================================================================================
+    # Rules of a folder: the parent's rules plus the folder's own ignore file, if it has one
+    def _rules_for(self, folder: str, rel_dir: str, parent: IgnoreRules) -> IgnoreRules:
+        if not self.ignore_filename:
+            return parent
+        path = os.path.join(folder, self.ignore_filename)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return parent.extended(IgnoreRules.parse(f, base=rel_dir))
+        except FileNotFoundError:
+            return parent
+        except OSError as e:
+            # an ignore file that can't be read (permissions, a folder by that name) shouldn't end the walk
+            self.on_skip(path, f"unreadable: {e.strerror}")
+            return parent
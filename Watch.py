@@ -0,0 +1,374 @@
+import os
+import select
+import struct
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from PresetIndex import build_preset_index
+from Walker import Walker
+from WatchOptions import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_POLL_INTERVAL_SECONDS, MAX_BATCH_DELAY_FACTOR, WATCH_BACKENDS
+
+
+#====================================================================================
+# Watch mode: keeps the folder's digests in memory and, after the initial scan, re-hashes only the files
+# that changed. Changes come from Linux inotify (through ctypes, no extra package) or, where that is not
+# available, from comparing stat snapshots. Bursts of writes are debounced into one batch, and every batch
+# that changes the drift state is appended to the preset's watch journal (see Model._create_watch_metadata).
+# Backends, debounce and poll defaults are in WatchOptions.
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len, then len bytes of NUL padded name
+READ_SIZE = 64 * 1024
+
+
+@dataclass
+class Changes:
+    files: Set[str] = field(default_factory=set)  # '/' separated paths relative to the watched folder
+    dirs: Set[str] = field(default_factory=set)   # folders whose whole content must be re-checked
+    rescan: bool = False                          # events were lost, re-check everything
+
+    def update(self, other: "Changes") -> None:
+        self.files |= other.files
+        self.dirs |= other.dirs
+        self.rescan = self.rescan or other.rescan
+
+    def __bool__(self) -> bool:
+        return bool(self.files or self.dirs or self.rescan)
+
+
+class InotifyWatcher:
+    """Recursive inotify watch of a folder. poll() returns the Changes seen within timeout."""
+
+    # ====================================================================================
+    def __init__(self, root: str):
+        import ctypes  # imported lazily, ctypes.util alone noticeably slows down CLI start-up
+        import ctypes.util
+
+        self.root = os.path.abspath(root)
+        self._get_errno = ctypes.get_errno
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(self._get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> rel dir ('' for the root)
+        try:
+            self._add_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    # Adds watches for rel_dir and every folder below it (not following symlinks)
+    def _add_tree(self, rel_dir: str) -> None:
+        for folder, dirs, _ in os.walk(os.path.join(self.root, rel_dir) if rel_dir else self.root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                errno = self._get_errno()
+                if errno == 28:  # ENOSPC: out of watches (fs.inotify.max_user_watches)
+                    raise OSError(errno, "inotify watch limit reached")
+                continue  # the folder went away in the meantime
+            rel = os.path.relpath(folder, self.root)
+            self._dirs[wd] = "" if rel == "." else rel.replace(os.sep, "/")
+
+    def _remove_tree(self, rel_dir: str) -> None:
+        prefix = f"{rel_dir}/"
+        for wd, watched in list(self._dirs.items()):
+            if watched == rel_dir or watched.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._dirs[wd]
+
+    # ====================================================================================
+    def poll(self, timeout: float) -> Changes:
+        changes = Changes()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changes
+        try:
+            data = os.read(self._fd, READ_SIZE)
+        except BlockingIOError:
+            return changes
+
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                changes.rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            rel_dir = self._dirs.get(wd)
+            if rel_dir is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if rel_dir:
+                    changes.dirs.add(rel_dir)
+                else:
+                    changes.rescan = True
+                continue
+
+            rel_path = f"{rel_dir}/{os.fsdecode(name)}" if rel_dir else os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self._remove_tree(rel_path)  # its watches would keep reporting the old path
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(rel_path)  # files may already be in it before the watch exists
+                changes.dirs.add(rel_path)
+            else:
+                changes.files.add(rel_path)
+        return changes
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Fallback: compares stat snapshots of the walk every interval. Costs one stat per file per
+    interval, but only files whose stat changed are reported (and re-hashed)."""
+
+    # ====================================================================================
+    def __init__(self, walker: Walker, interval: float = DEFAULT_POLL_INTERVAL_SECONDS):
+        self.walker = walker
+        self.interval = interval
+        self._snapshot = self._take()
+        self._next = time.monotonic() + interval
+
+    def _take(self) -> Dict[str, Tuple[int, int, int]]:
+        return {entry.rel_path.replace(os.sep, "/"): (entry.stat.st_size, entry.stat.st_mtime_ns, entry.stat.st_ino)
+                for entry in self.walker}
+
+    def poll(self, timeout: float) -> Changes:
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return Changes()
+        time.sleep(max(0.0, wait))
+        self._next = time.monotonic() + self.interval
+
+        snapshot = self._take()
+        old = self._snapshot
+        self._snapshot = snapshot
+        changed = {path for path, sig in snapshot.items() if old.get(path) != sig}
+        changed |= old.keys() - snapshot.keys()
+        return Changes(files=changed)
+
+    def close(self) -> None:
+        pass
+
+
+class FolderWatch:
+    """Keeps a folder's digests in memory and re-verifies only what changed against a preset.
+
+    model supplies the walker options, hashing engine, cache and metadata journal; preset is the loaded
+    preset (BinaryPreset or list) and algorithm the one it was made with.
+    """
+
+    # ====================================================================================
+    def __init__(self, model, preset_name: str, preset, algorithm: str, backend: str = 'auto',
+                 debounce: float = DEFAULT_DEBOUNCE_SECONDS, poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS):
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"Unknown watch backend '{backend}', expected one of {WATCH_BACKENDS}")
+        self.model = model
+        self.preset_name = preset_name
+        self.preset = preset
+        self.preset_index = build_preset_index(preset)
+        self.algorithm = algorithm
+        self.debounce = debounce
+        self.walker = Walker(model.verification_folder, **model.walk_options)
+
+        self.digests: Dict[str, str] = {}   # rel path -> digest, the folder's last known state
+        self.counts: Counter = Counter()    # digest -> number of files that have it
+        self.drifted: Dict[str, str] = {}   # rel path -> digest, files whose digest is not in the preset
+        self.missing: Set[str] = set()      # preset digests no file has any more
+
+        self.backend = backend
+        self.watcher = None
+        self._poll_interval = poll_interval
+
+    # ====================================================================================
+    # Hashes the whole folder once and starts watching. Returns the initial drift state.
+    def start(self) -> dict:
+        # start watching first so nothing changed during the initial scan is missed
+        if self.backend in ('auto', 'inotify'):
+            try:
+                self.watcher = InotifyWatcher(self.model.verification_folder)
+                self.backend = 'inotify'
+            except (OSError, AttributeError):
+                if self.backend == 'inotify':
+                    raise
+        if self.watcher is None:
+            self.backend = 'poll'
+
+        for entry, digest in self.model._hash_entries(iter(self.walker), self.algorithm):
+            self._set(entry.rel_path.replace(os.sep, "/"), digest)
+        self.missing = {digest for digest in self.preset if not self.counts[digest]}
+
+        if self.backend == 'poll':
+            self.watcher = PollingWatcher(self.walker, self._poll_interval)
+        return self.state()
+
+    def state(self) -> dict:
+        return {
+            "files": len(self.digests),
+            "drifted": sorted(self.drifted),
+            "missing_digests": len(self.missing),
+        }
+
+    # ====================================================================================
+    # Runs until stop is set (or for duration seconds). on_drift(event) is called for every drift event.
+    def run(self, stop: Optional[threading.Event] = None, duration: Optional[float] = None,
+            on_drift: Optional[Callable[[dict], None]] = None) -> None:
+        stop = stop or threading.Event()
+        deadline = time.monotonic() + duration if duration is not None else None
+        pending = Changes()
+        first_change = last_change = 0.0
+
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                timeout = self.debounce if not pending else max(0.0, last_change + self.debounce - now)
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - now))
+
+                changes = self.watcher.poll(timeout)
+                now = time.monotonic()
+                if changes:
+                    if not pending:
+                        first_change = now
+                    pending.update(changes)
+                    last_change = now
+
+                quiet = now - last_change >= self.debounce
+                overdue = now - first_change >= self.debounce * MAX_BATCH_DELAY_FACTOR
+                if pending and (quiet or overdue):
+                    event = self.apply(pending)
+                    pending = Changes()
+                    if event is not None and on_drift is not None:
+                        on_drift(event)
+        finally:
+            self.watcher.close()
+
+    # ====================================================================================
+    # Re-checks the changed paths and returns the drift event written to the journal, or None when the
+    # drift state did not change.
+    def apply(self, changes: Changes) -> Optional[dict]:
+        start_time = time.perf_counter()
+        self.model._begin_action("watch")
+
+        ignore_filename = self.walker.ignore_filename
+        if changes.rescan or any(p.rsplit("/", 1)[-1] == ignore_filename for p in changes.files):
+            # lost events, or the ignore rules changed: check every known and every current path
+            self.walker = Walker(self.model.verification_folder, **self.model.walk_options)
+            if isinstance(self.watcher, PollingWatcher):
+                self.watcher.walker = self.walker
+            candidates = set(self.digests)
+            current = {entry.rel_path.replace(os.sep, "/"): entry for entry in self.walker}
+        else:
+            candidates = set(changes.files)
+            current = {}
+            for rel_dir in changes.dirs:
+                prefix = f"{rel_dir}/"
+                candidates.update(path for path in self.digests if path.startswith(prefix))
+                current.update((entry.rel_path.replace(os.sep, "/"), entry) for entry in self.walker.walk(rel_dir))
+        candidates.update(current)
+
+        before_drifted = dict(self.drifted)
+        before_missing = set(self.missing)
+
+        to_hash = []
+        removed = []
+        for rel_path in sorted(candidates):
+            entry = current.get(rel_path) or self.walker.entry_for(rel_path)
+            if entry is None:
+                if rel_path in self.digests:
+                    removed.append(rel_path)
+                    self._unset(rel_path)
+            else:
+                to_hash.append(entry)
+
+        # entries come from several walks and entry_for(), so a link's original may be missing from the batch
+        # or sort after it: such a link is hashed itself instead of waiting for a digest
+        batch_paths = {entry.path for entry in to_hash}
+        for entry in to_hash:
+            if entry.link_of is not None and entry.link_of not in batch_paths:
+                entry.link_of = None
+
+        rehashed = 0
+        for entry, digest in self.model._hash_entries(iter(to_hash), self.algorithm):
+            rehashed += 1
+            rel_path = entry.rel_path.replace(os.sep, "/")
+            if self.digests.get(rel_path) != digest:
+                self._unset(rel_path)
+                self._set(rel_path, digest)
+
+        new_drift = {p: d for p, d in self.drifted.items() if before_drifted.get(p) != d}
+        resolved = sorted(set(before_drifted) - set(self.drifted))
+        newly_missing = self.missing - before_missing
+        restored = before_missing - self.missing
+        if not (new_drift or resolved or newly_missing or restored):
+            return None
+
+        event = {
+            "drifted": [{"file": p, "digest": d} for p, d in sorted(new_drift.items())],
+            "resolved": resolved,
+            "removed": removed,
+            "missing_digests_added": sorted(newly_missing),
+            "missing_digests_restored": sorted(restored),
+            "drifted_total": len(self.drifted),
+            "missing_digests_total": len(self.missing),
+            "paths_checked": len(candidates),
+            "files_rehashed": rehashed,
+            "full_rescan": changes.rescan,
+            "watch_backend": self.backend,
+            "duration_ms": f"{(time.perf_counter() - start_time) * 1000:.4f}",
+        }
+        self.model._create_watch_metadata(self.preset_name, event)
+        return event
+
+    # ====================================================================================
+    def _set(self, rel_path: str, digest: str) -> None:
+        self.digests[rel_path] = digest
+        self.counts[digest] += 1
+        if digest in self.preset_index:
+            self.drifted.pop(rel_path, None)
+            self.missing.discard(digest)
+        else:
+            self.drifted[rel_path] = digest
+
+    def _unset(self, rel_path: str) -> None:
+        digest = self.digests.pop(rel_path, None)
+        if digest is None:
+            return
+        self.drifted.pop(rel_path, None)
+        self.counts[digest] -= 1
+        if not self.counts[digest]:
+            del self.counts[digest]
+            if digest in self.preset_index:
+                self.missing.add(digest)
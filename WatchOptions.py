@@ -0,0 +1,7 @@
+#====================================================================================
+# Settings of watch mode (see Watch), kept apart from it so the CLI's argument parser and Model's defaults
+# can use them without importing the watcher itself.
+WATCH_BACKENDS = ('auto', 'inotify', 'poll')
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+MAX_BATCH_DELAY_FACTOR = 10  # a batch is processed at the latest debounce * this after its first change
@@ -0,0 +1,56 @@
+"""Import-time benchmark for the headless CLI.
+
+Usage: python benchmarks/bench_cli_startup.py [--runs 10] [--budget-ms 100]
+
+Measures how long `import Cli` takes in a fresh interpreter (best of N runs) and checks that none of
+the GUI modules were pulled in. Exits 1 if the import is over budget or a GUI module was imported.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_MODULES = ("dearpygui", "pygame", "tkinter", "View")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import Cli
+elapsed_ms = (time.perf_counter() - start) * 1000
+gui = sorted(m for m in sys.modules if m.split('.')[0] in {gui_modules!r})
+print(json.dumps({{"import_ms": elapsed_ms, "gui_modules": gui}}))
+"""
+
+
+#====================================================================================
+def _probe_once() -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(gui_modules=set(GUI_MODULES))],
+                         cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+# ====================================================================================
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    results = [_probe_once() for _ in range(args.runs)]
+    times = sorted(r["import_ms"] for r in results)
+    gui = sorted({m for r in results for m in r["gui_modules"]})
+
+    print(json.dumps({
+        "import_ms_best": round(times[0], 2),
+        "import_ms_median": round(times[len(times) // 2], 2),
+        "budget_ms": args.budget_ms,
+        "gui_modules_imported": gui,
+    }, indent=2))
+    sys.exit(1 if times[len(times) // 2] > args.budget_ms or gui else 0)
+
+
+#====================================================================================
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Micro-benchmark of the file hashing strategies in HashEngine.
+
+Usage: python benchmarks/bench_hash_strategies.py [--huge-mb 1024] [--repeat 3]
+
+Writes small, medium and huge files to a temp folder and prints MB/s for every strategy, so the
+defaults (MMAP_THRESHOLD, buffer_size_for) can be checked on the local hardware. The OS page cache
+is warm after the first pass, so this measures the hashing path rather than the disk.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from HashEngine import HASH_STRATEGIES, hash_file  # noqa: E402
+
+
+#====================================================================================
+def _write_files(folder: str, prefix: str, count: int, size: int) -> list:
+    paths = []
+    block = os.urandom(min(size, 1024 * 1024)) if size else b""
+    for i in range(count):
+        path = os.path.join(folder, f"{prefix}_{i}")
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= len(block)
+        paths.append(path)
+    return paths
+
+
+# ====================================================================================
+def _bench(paths: list, strategy: str, repeat: int) -> float:
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            hash_file(path, strategy)
+        best = min(best, time.perf_counter() - start)
+    return total_bytes / (1024 * 1024) / best if best else float("inf")
+
+
+# ====================================================================================
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small-count", type=int, default=2000)
+    parser.add_argument("--medium-count", type=int, default=8)
+    parser.add_argument("--huge-mb", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="hit_bench_") as folder:
+        tiers = {
+            "small (4 KiB)": _write_files(folder, "small", args.small_count, 4 * 1024),
+            "medium (8 MiB)": _write_files(folder, "medium", args.medium_count, 8 * 1024 * 1024),
+            f"huge ({args.huge_mb} MiB)": _write_files(folder, "huge", 1, args.huge_mb * 1024 * 1024),
+        }
+
+        print(f"{'tier':<18}" + "".join(f"{s:>15}" for s in HASH_STRATEGIES))
+        for tier, paths in tiers.items():
+            hash_file(paths[0])  # warm the page cache
+            rates = [_bench(paths, strategy, args.repeat) for strategy in HASH_STRATEGIES]
+            print(f"{tier:<18}" + "".join(f"{rate:>10.1f} MB/s" for rate in rates))
+
+
+#====================================================================================
+if __name__ == "__main__":
+    main()
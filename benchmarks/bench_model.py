@@ -0,0 +1,213 @@
+"""Reproducible benchmark of preset creation and verification through Model.
+
+Usage:
+    python benchmarks/bench_model.py [--scenarios tiny,huge,deep,mixed] [--scale 1.0] [--output run.json]
+    python benchmarks/bench_model.py --baseline baseline.json [--threshold 0.10]
+
+Generates synthetic trees from a fixed seed (many tiny files, a few huge files, deep nesting, mixed sizes),
+then times Model._create_preset, Model._get_hashes and Model._compare_hashes_with_preset on each.
+Every scenario runs in a fresh interpreter so peak RSS is per scenario. Results are printed as JSON;
+with --baseline, any phase whose throughput dropped (or whose peak RSS grew) by more than --threshold
+is listed under "regressions" and the exit code is 1. Needs nothing from the GUI stack.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SCENARIOS = ("tiny", "huge", "deep", "mixed")
+DEFAULT_SEED = 1234
+DEFAULT_THRESHOLD = 0.10
+PHASES = ("create", "get_hashes", "compare")
+
+
+#====================================================================================
+# Scenario layouts at scale 1.0, as (rel_path, size) lists. Everything is derived from the seed.
+def _layout(scenario: str, scale: float, rng: random.Random) -> list:
+    def n(count):
+        return max(1, int(count * scale))
+
+    if scenario == "tiny":
+        return [(f"d{i // 1000:03d}/f{i:06d}", 1024) for i in range(n(5000))]
+    if scenario == "huge":
+        return [(f"huge{i}", n(128) * 1024 * 1024) for i in range(2)]
+    if scenario == "deep":
+        files = []
+        for depth in range(n(40)):
+            folder = "/".join(f"l{level}" for level in range(depth + 1))
+            files.extend((f"{folder}/f{i}", 4096) for i in range(20))
+        return files
+    if scenario == "mixed":
+        # roughly log-uniform between 100 B and 16 MiB
+        return [(f"m{i % 16:02d}/f{i:05d}", int(100 * (2 ** rng.uniform(0, 17.3)))) for i in range(n(1000))]
+    raise ValueError(f"Unknown scenario '{scenario}', expected one of {SCENARIOS}")
+
+
+def _generate(folder: str, scenario: str, scale: float, seed: int) -> dict:
+    rng = random.Random(f"{seed}:{scenario}")
+    block = rng.randbytes(1024 * 1024)
+    files, total_bytes = 0, 0
+    for rel_path, size in _layout(scenario, scale, rng):
+        path = os.path.join(folder, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            # unique prefix so files are distinct, then the shared block repeated
+            prefix = rel_path.encode() + b"\0"
+            f.write(prefix[:size])
+            remaining = size - min(size, len(prefix))
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= len(block)
+        files += 1
+        total_bytes += size
+    return {"files": files, "bytes": total_bytes}
+
+
+# ====================================================================================
+def _phase(seconds: float, files: int, total_bytes: int) -> dict:
+    return {
+        "seconds": round(seconds, 4),
+        "files_per_second": round(files / seconds, 1) if seconds else None,
+        "mb_per_second": round(total_bytes / (1024 * 1024) / seconds, 1) if seconds else None,
+    }
+
+
+# Runs one scenario in this interpreter (called in a child process by main).
+def run_scenario(scenario: str, scale: float, seed: int, workers: int, algorithm: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"hit_bench_{scenario}_") as workspace:
+        tree = os.path.join(workspace, "tree")
+        os.makedirs(tree)
+        generate_start = time.perf_counter()
+        size = _generate(tree, scenario, scale, seed)
+        generate_seconds = time.perf_counter() - generate_start
+
+        # Model keeps presets/metadata/cache relative to the working directory
+        os.chdir(workspace)
+        from Model import VERBOSITY_QUIET, Model
+
+        model = Model(verification_folder=tree, preset_folder="./presets", log_fn=lambda msg: None,
+                      hash_workers=workers, cache_mode="off", verbosity=VERBOSITY_QUIET, hash_algorithm=algorithm)
+        phases = {}
+
+        start = time.perf_counter()
+        model._create_preset("bench")
+        phases["create"] = _phase(time.perf_counter() - start, size["files"], size["bytes"])
+
+        start = time.perf_counter()
+        hashes = model._get_hashes(model._preset_algorithm("bench"))
+        phases["get_hashes"] = _phase(time.perf_counter() - start, size["files"], size["bytes"])
+
+        preset = model._load_preset("bench")
+        start = time.perf_counter()
+        result = model._compare_hashes_with_preset(hashes, preset, "bench")
+        phases["compare"] = _phase(time.perf_counter() - start, size["files"], size["bytes"])
+        preset.close()
+
+        if result is None or result.failed_files:
+            raise RuntimeError(f"{scenario}: verification of the freshly created preset failed")
+
+    return {
+        "scenario": scenario,
+        **size,
+        "generate_seconds": round(generate_seconds, 4),
+        "phases": phases,
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,  # KiB on Linux
+    }
+
+
+# ====================================================================================
+# Lists phases whose throughput fell, or peak RSS grew, by more than threshold relative to the baseline.
+def compare_with_baseline(current: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    old_scenarios = {s["scenario"]: s for s in baseline.get("scenarios", [])}
+    for scenario in current["scenarios"]:
+        old = old_scenarios.get(scenario["scenario"])
+        if old is None:
+            continue
+        for phase in PHASES:
+            new_rate = scenario["phases"][phase]["mb_per_second"]
+            old_rate = old["phases"].get(phase, {}).get("mb_per_second")
+            if new_rate and old_rate and new_rate < old_rate * (1 - threshold):
+                regressions.append({"scenario": scenario["scenario"], "metric": f"{phase}.mb_per_second",
+                                    "baseline": old_rate, "current": new_rate,
+                                    "change": round(new_rate / old_rate - 1, 4)})
+        if scenario["peak_rss_kib"] > old["peak_rss_kib"] * (1 + threshold):
+            regressions.append({"scenario": scenario["scenario"], "metric": "peak_rss_kib",
+                                "baseline": old["peak_rss_kib"], "current": scenario["peak_rss_kib"],
+                                "change": round(scenario["peak_rss_kib"] / old["peak_rss_kib"] - 1, 4)})
+    return regressions
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "commit": commit}
+
+
+# ====================================================================================
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset of " +
+                        ", ".join(SCENARIOS))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies file counts, huge file sizes, depth")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--algorithm", default="sha256")
+    parser.add_argument("--output", help="also write the results to this file (use it as a later --baseline)")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as a regression (default 0.10)")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)  # child mode: run one scenario, print JSON
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_scenario(args.run_one, args.scale, args.seed, args.workers, args.algorithm)))
+        return
+
+    scenarios = []
+    for scenario in args.scenarios.split(","):
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario '{scenario}'")
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-one", scenario,
+                              "--scale", str(args.scale), "--seed", str(args.seed), "--workers", str(args.workers),
+                              "--algorithm", args.algorithm],
+                             capture_output=True, text=True, check=True).stdout
+        scenarios.append(json.loads(out))
+
+    results = {
+        "benchmark": "model",
+        "settings": {"scale": args.scale, "seed": args.seed, "workers": args.workers, "algorithm": args.algorithm},
+        "environment": _environment(),
+        "scenarios": scenarios,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f), args.threshold)
+        results["baseline"] = os.path.abspath(args.baseline)
+        results["threshold"] = args.threshold
+        results["regressions"] = regressions
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+#====================================================================================
+if __name__ == "__main__":
+    main()
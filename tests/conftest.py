@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# the modules live at the repository root and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Model keeps ./presets, ./metadata and ./cache relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
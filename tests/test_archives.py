@@ -0,0 +1,77 @@
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from Archives import hash_members, is_archive
+from Manifest import read_manifest
+from Model import Model, VERBOSITY_QUIET
+
+MEMBERS = {"a.txt": b"alpha", "dir/b.bin": b"\0" * 5000}
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_zip(path):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("dir/", b"")
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+
+
+def _write_tar(path):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo("./link")
+        link.type, link.linkname = tarfile.SYMTYPE, "a.txt"
+        archive.addfile(link)
+
+
+@pytest.mark.parametrize("name, write", [("x.zip", _write_zip), ("x.tar.gz", _write_tar)])
+def test_members_are_hashed_without_extracting(tmp_path, name, write):
+    path = str(tmp_path / name)
+    write(path)
+    assert is_archive(name.upper())
+    result = hash_members(path)
+    assert result.error is None
+    assert [(member, st.st_size, digest) for member, st, digest in result.members] == [
+        (member, len(data), _digest(data)) for member, data in MEMBERS.items()]
+    if name.endswith(".tar.gz"):
+        assert result.skipped == [("./link", "not a regular archive member")]
+    assert os.listdir(tmp_path) == [name]  # nothing extracted
+
+
+def test_broken_archive_falls_back_to_the_whole_file(tmp_path):
+    path = tmp_path / "x.zip"
+    _write_zip(str(path))
+    path.write_bytes(path.read_bytes()[:40])
+    result = hash_members(str(path))
+    assert result.error is not None
+    assert result.digest == _digest(path.read_bytes())
+
+
+def test_create_and_verify_with_archive_members(workdir):
+    folder = workdir / "data"
+    folder.mkdir()
+    (folder / "plain.txt").write_text("plain")
+    _write_zip(str(folder / "x.zip"))
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET, archive_policy="members")
+    model._create_preset("p")
+    _, entries = read_manifest(model._manifest_path("p"))
+    assert [(rel_path, digest) for rel_path, digest, _, _ in entries] == [
+        ("plain.txt", _digest(b"plain")), ("x.zip/a.txt", _digest(MEMBERS["a.txt"])),
+        ("x.zip/dir/b.bin", _digest(MEMBERS["dir/b.bin"]))]
+    assert not model._verify_manifest("p").failed
+
+    with zipfile.ZipFile(folder / "x.zip", "a") as archive:
+        archive.writestr("c.txt", b"new")
+    assert model._verify_manifest("p").added == [("x.zip/c.txt", _digest(b"new"))]
@@ -0,0 +1,46 @@
+import json
+
+from BatchRun import BatchJob, BatchRunner, BatchSpec
+import Model as model_module
+from Model import Model, VERBOSITY_QUIET
+
+
+def _model_factory(folder):
+    def model_for(job):
+        return Model(verification_folder=job.folder if job else str(folder), log_fn=lambda msg: None,
+                     verbosity=VERBOSITY_QUIET)
+    return model_for
+
+
+def _events(workdir, preset):
+    journal = workdir / "metadata" / f"{model_module.METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX}{preset}.jsonl"
+    return [json.loads(line) for line in journal.read_text().splitlines()]
+
+
+def test_job_events_report_the_jobs_own_reads(workdir):
+    shared, other = workdir / "shared", workdir / "other"
+    shared.mkdir()
+    other.mkdir()
+    for i in range(4):
+        (shared / f"s{i}").write_text(f"shared {i}")
+    (other / "o").write_text("other")
+    for name, folder in (("s", shared), ("o", other)):
+        Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+              verbosity=VERBOSITY_QUIET)._create_preset(name)
+
+    spec = BatchSpec(jobs=[BatchJob(folder=str(shared), preset="s", name="a"),
+                           BatchJob(folder=str(shared), preset="s", name="b"),
+                           BatchJob(folder=str(other), preset="o", name="c")], max_concurrent_jobs=1)
+    report = BatchRunner(spec, _model_factory(shared)).run()
+    assert report["result"] == "pass"
+
+    events = _events(workdir, "s")[-2:] + _events(workdir, "o")[-1:]
+    hashed = [sum(device["files"] for device in event.get("io_devices", [])) for event in events]
+    shared_files = [event["instrumentation"]["counters"].get("files_shared", 0) for event in events]
+    cache_hits = [event["cache_hits"] for event in events]
+    # the second job over the same folder reads nothing itself, and the batch total is the sum of the jobs'
+    assert hashed == [4, 0, 1]
+    assert shared_files == [0, 4, 0]
+    assert cache_hits == [0, 0, 0]
+    assert sum(hashed) == report["files_hashed"]
+    assert sum(shared_files) == report["files_shared"]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import Cli
+from HashEngine import HashingCancelled
+from Model import Model
+
+
+def _run(capsys, *argv):
+    code = Cli.main(list(argv))
+    return code, json.loads(capsys.readouterr().out)
+
+
+@pytest.fixture
+def folder(workdir):
+    data = workdir / "data"
+    data.mkdir()
+    (data / "a.txt").write_text("alpha")
+    return data
+
+
+def test_create_that_writes_nothing_is_an_error(folder, capsys, monkeypatch):
+    monkeypatch.setattr(Model, "_create_preset", lambda self, *args, **kwargs: None)
+    code, out = _run(capsys, "create", "p", "--folder", str(folder))
+    assert code == Cli.EXIT_ERROR
+    assert out["result"] == "create_failed"
+
+
+def test_cancelled_create_reports_it(folder, capsys, monkeypatch):
+    def cancelled(self, *args, **kwargs):
+        raise HashingCancelled()
+    monkeypatch.setattr(Model, "_create_preset", cancelled)
+    code, out = _run(capsys, "create", "p", "--folder", str(folder))
+    assert code == Cli.EXIT_CANCELLED
+    assert out["result"] == "cancelled"
+
+
+def test_create_then_verify(folder, capsys):
+    code, out = _run(capsys, "create", "p", "--folder", str(folder), "--quick")
+    assert code == Cli.EXIT_OK
+    assert (out["command"], out["result"], out["folder"]) == ("create", "created", str(folder))
+    code, out = _run(capsys, "create", "p", "--folder", str(folder))
+    assert (code, out["result"]) == (Cli.EXIT_ALREADY_EXISTS, "already_exists")
+
+    for mode in ((), ("--tiered",), ("--manifest",)):
+        code, out = _run(capsys, "verify", "p", "--folder", str(folder), *mode)
+        assert (code, out["result"]) == (Cli.EXIT_OK, "pass")
+
+    (folder / "a.txt").write_text("changed")
+    code, out = _run(capsys, "verify", "p", "--folder", str(folder))
+    assert (code, out["result"], out["files_failed"]) == (Cli.EXIT_VERIFY_FAILED, "fail", 1)
+    assert [failed["file"] for failed in out["failed"]] == ["a.txt"]
+    code, out = _run(capsys, "verify", "p", "--folder", str(folder), "--manifest")
+    assert (code, out["mode"], out["modified"]) == (Cli.EXIT_VERIFY_FAILED, "manifest", 1)
+
+
+def test_verify_exit_codes_when_something_is_missing(folder, capsys):
+    code, out = _run(capsys, "verify", "absent", "--folder", str(folder))
+    assert (code, out["result"]) == (Cli.EXIT_NOT_FOUND, "preset_not_found")
+    code, out = _run(capsys, "verify", "p", "--folder", str(folder / "absent"))
+    assert (code, out["result"]) == (Cli.EXIT_NOT_FOUND, "folder_not_found")
+
+    _run(capsys, "create", "p", "--folder", str(folder))
+    code, out = _run(capsys, "verify", "p", "--folder", str(folder), "--tiered")
+    assert (code, out["result"]) == (Cli.EXIT_NOT_FOUND, "quick_index_not_found")
+    code, out = _run(capsys, "verify", "p", "--folder", str(folder), "--merkle")
+    assert (code, out["result"]) == (Cli.EXIT_NOT_FOUND, "merkle_tree_not_found")
+
+
+def test_options_that_do_not_combine_are_usage_errors(folder, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        Cli.main(["verify", "p", "--folder", str(folder), "--deep"])
+    assert exit_info.value.code == Cli.EXIT_USAGE
+    assert "--deep only applies to --merkle" in capsys.readouterr().err
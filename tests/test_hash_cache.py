@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from HashCache import CACHE_FILENAME, CACHE_FOLDER, RACY_MTIME_WINDOW_NS, HashCache
+from Model import Model, VERBOSITY_QUIET
+
+
+def _settled_file(path, content):
+    # older than the racy window, so the cache accepts its digest
+    path.write_text(content)
+    old = path.stat().st_mtime_ns - 2 * RACY_MTIME_WINDOW_NS
+    os.utime(path, ns=(old, old))
+    return str(path), os.stat(path)
+
+
+@pytest.fixture
+def cache_folder(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_trust_serves_the_digest_while_the_stat_matches(tmp_path, cache_folder):
+    path, st = _settled_file(tmp_path / "f", "one")
+    cache = HashCache(cache_folder, mode="trust")
+    assert cache.lookup(path, st) is None
+    cache.store(path, st, "d1")
+    cache.flush()
+    assert cache.lookup(path, st) == "d1"
+    assert cache.lookup(path, st, algorithm="blake2b") is None  # digests are kept per algorithm
+
+    _, st = _settled_file(tmp_path / "f", "two!")
+    assert cache.lookup(path, st) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.close()
+
+
+def test_racy_files_are_not_cached(tmp_path, cache_folder):
+    (tmp_path / "f").write_text("fresh")
+    path, st = str(tmp_path / "f"), os.stat(tmp_path / "f")
+    cache = HashCache(cache_folder)
+    cache.store(path, st, "d1")
+    cache.flush()
+    assert cache.lookup(path, st) is None
+    cache.close()
+
+
+def test_paranoid_rehashes_and_counts_contradictions(tmp_path, cache_folder):
+    path, st = _settled_file(tmp_path / "f", "one")
+    cache = HashCache(cache_folder, mode="paranoid")
+    cache.store(path, st, "d1")
+    cache.flush()
+
+    assert cache.lookup(path, st) is None  # always read again...
+    assert cache.store(path, st, "d1") is False
+    assert cache.lookup(path, st) is None
+    assert cache.store(path, st, "rotten") is True  # ...and a different digest under the same stat is reported
+    assert (cache.hits, cache.mismatches, cache.mismatched_paths) == (0, 1, [os.path.abspath(path)])
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, cache_folder):
+    files = [_settled_file(tmp_path / f"f{i}", str(i)) for i in range(3)]
+    cache = HashCache(cache_folder, max_entries=2)
+    for i, (path, st) in enumerate(files[:2]):
+        cache.store(path, st, f"d{i}")
+    cache.flush()
+    assert cache.lookup(*files[0]) == "d0"  # f0 is used again, so f1 is now the oldest
+
+    cache.store(*files[2], "d2")
+    cache.flush()
+    assert [cache.lookup(path, st) for path, st in files] == ["d0", None, "d2"]
+    cache.close()
+
+
+def test_unknown_mode_is_rejected(cache_folder):
+    with pytest.raises(ValueError):
+        HashCache(cache_folder, mode="sometimes")
+
+
+def test_off_keeps_no_cache(workdir):
+    (workdir / "data").mkdir()
+    (workdir / "data" / "f").write_text("content")
+    model = Model(verification_folder=str(workdir / "data"), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET)
+    model._create_preset("p")
+    assert model.hash_cache is None
+    assert model._cache_stats() == {"cache_mode": "off"}
+    assert not os.path.exists(os.path.join(CACHE_FOLDER, CACHE_FILENAME))
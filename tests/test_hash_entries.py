@@ -0,0 +1,58 @@
+import hashlib
+import os
+
+import pytest
+
+from Model import Model, VERBOSITY_QUIET
+from Walker import WalkEntry
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def tree(workdir):
+    folder = workdir / "verify"
+    folder.mkdir()
+    for name in ("f01", "f05", "f06"):
+        (folder / name).write_bytes(f"content of {name}".encode())
+    os.link(folder / "f01", folder / "zz_link")
+    return folder
+
+
+def _entry(folder, name, link_of=None):
+    path = str(folder / name)
+    entry = WalkEntry(path, name, None, os.stat(path))
+    entry.link_of = str(folder / link_of) if link_of else None
+    return entry
+
+
+def _model(folder, workers):
+    return Model(verification_folder=str(folder), log_fn=lambda msg: None, hash_workers=workers,
+                 cache_mode="off", verbosity=VERBOSITY_QUIET)
+
+
+def _expected(folder, names):
+    return [(name, _sha256((folder / name).read_bytes())) for name in names]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_link_before_original(tree, workers):
+    entries = [_entry(tree, "zz_link", link_of="f01"), _entry(tree, "f01"), _entry(tree, "f05")]
+    results = [(entry.rel_path, digest) for entry, digest in _model(tree, workers)._hash_entries(entries)]
+    assert results == _expected(tree, ["zz_link", "f01", "f05"])
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_link_whose_original_is_absent(tree, workers):
+    entries = [_entry(tree, "zz_link", link_of="f01"), _entry(tree, "f05"), _entry(tree, "f06")]
+    results = [(entry.rel_path, digest) for entry, digest in _model(tree, workers)._hash_entries(entries)]
+    assert results == _expected(tree, ["zz_link", "f05", "f06"])
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_walk_order_with_links(tree, workers):
+    model = _model(tree, workers)
+    results = {entry.rel_path: digest for entry, digest in model._hash_entries(model._iter_files())}
+    assert results == dict(_expected(tree, ["f01", "f05", "f06", "zz_link"]))
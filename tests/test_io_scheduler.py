@@ -0,0 +1,52 @@
+import threading
+
+from IoScheduler import DeviceLane, profile_for
+
+
+def _rotational_lane():
+    return DeviceLane(0, "rotational", profile_for("rotational", 2))
+
+
+def test_deferred_reads_run_in_inode_order_on_flush():
+    lane = _rotational_lane()
+    ran = []
+    futures = [lane.submit(ran.append, (inode,), 1, inode) for inode in (3, 1, 2)]
+    assert not ran
+    lane.flush()
+    assert [f.result() for f in futures] == [None] * 3
+    lane.close()
+    assert sorted(ran) == [1, 2, 3]
+
+
+def test_close_cancels_what_is_still_deferred():
+    lane = _rotational_lane()
+    future = lane.submit(lambda: "read", (), 1, 7)
+    lane.close(cancel=True)
+    assert future.cancelled()
+
+
+def test_close_without_cancel_still_runs_deferred_reads():
+    lane = _rotational_lane()
+    future = lane.submit(lambda: "read", (), 1, 7)
+    lane.close()
+    assert future.result(timeout=5) == "read"
+
+
+def test_reads_submitted_from_several_threads_are_all_settled_by_close():
+    lane = _rotational_lane()
+    futures, lock = [], threading.Lock()
+
+    def submit_many():
+        for inode in range(500):
+            future = lane.submit(lambda: None, (), 1, inode)
+            with lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=submit_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lane.close(cancel=True)
+    # every read either ran or was cancelled: none is left waiting in a window nobody flushes
+    assert all(f.done() for f in futures)
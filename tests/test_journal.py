@@ -0,0 +1,67 @@
+import json
+import os
+
+from Journal import (LEGACY_EXTENSION, MIGRATED_SUFFIX, append_event, compact, migrate_legacy, read_events,
+                     rotate)
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    journal = str(tmp_path / "j.jsonl")
+    append_event(journal, {"n": 1})
+    with open(journal, "a") as f:
+        f.write('{"n": 2, "torn')
+    assert list(read_events(journal)) == [{"n": 1}]
+    assert list(read_events(str(tmp_path / "absent.jsonl"))) == []
+
+
+def test_legacy_list_is_migrated_in_front_once(tmp_path):
+    journal = str(tmp_path / "j.jsonl")
+    legacy = str(tmp_path / f"j{LEGACY_EXTENSION}")
+    append_event(journal, {"n": 3})
+    with open(legacy, "w") as f:
+        json.dump([{"n": 1}, {"n": 2}], f)
+
+    append_event(journal, {"n": 4})  # appending migrates first
+    assert [event["n"] for event in read_events(journal)] == [1, 2, 3, 4]
+    assert not os.path.exists(legacy) and os.path.exists(legacy + MIGRATED_SUFFIX)
+    assert migrate_legacy(journal) is False
+
+
+def test_legacy_single_object_is_migrated(tmp_path):
+    journal = str(tmp_path / "j.jsonl")
+    with open(tmp_path / f"j{LEGACY_EXTENSION}", "w") as f:
+        json.dump({"n": 1}, f)
+    assert migrate_legacy(journal) is True
+    assert list(read_events(journal)) == [{"n": 1}]
+
+
+def test_rotation_keeps_the_newest(tmp_path):
+    journal = str(tmp_path / "j.jsonl")
+    for n in range(4):
+        append_event(journal, {"n": n})
+        rotate(journal, keep=2)
+    assert not os.path.exists(journal)
+    assert list(read_events(f"{journal}.1")) == [{"n": 3}]
+    assert list(read_events(f"{journal}.2")) == [{"n": 2}]
+    assert not os.path.exists(f"{journal}.3")
+
+
+def test_append_rotates_past_max_bytes(tmp_path):
+    journal = str(tmp_path / "j.jsonl")
+    append_event(journal, {"n": 1})
+    append_event(journal, {"n": 2}, max_bytes=1)
+    assert list(read_events(journal)) == [{"n": 2}]
+    assert list(read_events(f"{journal}.1")) == [{"n": 1}]
+
+
+def test_compact_drops_corrupt_lines_and_old_events(tmp_path):
+    journal = str(tmp_path / "j.jsonl")
+    for n in range(3):
+        append_event(journal, {"n": n})
+        with open(journal, "a") as f:
+            f.write("not json\n")
+    assert compact(journal) == 3
+    assert len(open(journal).read().splitlines()) == 3
+    assert compact(journal, keep_last=1) == 1
+    assert list(read_events(journal)) == [{"n": 2}]
+    assert compact(journal, keep_last=0) == 0
@@ -0,0 +1,56 @@
+import pytest
+
+from Manifest import diff_manifest, read_manifest, write_manifest
+from PresetFormat import PresetFormatError
+
+
+def _entries(pairs):
+    return [(rel_path, digest, 1, 1) for rel_path, digest in pairs]
+
+
+def test_diff_categories():
+    stored = _entries([("same", "d1"), ("edited", "d2"), ("old_name", "d3"), ("gone", "d4"), ("copy_src", "d5")])
+    current = _entries([("same", "d1"), ("edited", "d9"), ("new_name", "d3"), ("fresh", "d6"),
+                        ("copy_src", "d5"), ("copy_dst", "d5")])
+    diff = diff_manifest(stored, current)
+
+    assert diff.unchanged == 2
+    assert diff.modified == [("edited", "d2", "d9")]
+    assert diff.moved == [("old_name", "new_name", "d3")]
+    assert sorted(diff.added) == [("copy_dst", "d5"), ("fresh", "d6")]  # a copy of a file still in place
+    assert diff.missing == [("gone", "d4")]
+    assert diff.duplicates == 2
+    assert sorted(diff.failed) == ["copy_dst", "edited", "fresh", "gone"]
+    assert diff.counts() == {"unchanged": 2, "modified": 1, "added": 2, "missing": 1, "moved": 1, "duplicates": 2}
+
+
+def test_one_move_per_vanished_path():
+    diff = diff_manifest(_entries([("a", "d")]), _entries([("b", "d"), ("c", "d")]))
+    assert len(diff.moved) == 1 and len(diff.added) == 1 and not diff.missing
+
+
+def test_round_trip_with_awkward_paths(tmp_path):
+    path = str(tmp_path / "p.manifest.tsv")
+    entries = [("dir/plain", "aa", 3, 10), ("tab\there", "bb", 0, 0), ("new\nline\\back", "cc", 7, 20)]
+    assert write_manifest(path, entries, "sha256", len(entries)) == 3
+    header, read = read_manifest(path)
+    assert header["algorithm"] == "sha256" and header["entries"] == 3
+    assert list(read) == entries
+
+
+def test_not_a_manifest(tmp_path):
+    path = tmp_path / "p.manifest.tsv"
+    path.write_text("aa\t1\t1\tx\n")
+    with pytest.raises(PresetFormatError):
+        read_manifest(str(path))
+    assert read_manifest(str(tmp_path / "absent")) is None
+
+
+def test_malformed_line_names_the_line(tmp_path):
+    path = str(tmp_path / "p.manifest.tsv")
+    write_manifest(path, [("a", "aa", 1, 1)], "sha256", 1)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("bb\tnot a size\t1\tb\n")
+    _, read = read_manifest(path)
+    with pytest.raises(PresetFormatError, match="line 3"):
+        list(read)
@@ -0,0 +1,71 @@
+import json
+
+from MerklePreset import build_tree, diff_tree, load_tree, scan_tree, write_tree
+
+
+def _hash_many_from(contents, calls):
+    def hash_many(paths):
+        calls.extend(paths)
+        return ((path, contents[path]) for path in paths)
+    return hash_many
+
+
+def test_only_changed_stats_are_read(tmp_path):
+    stored = build_tree([("a/x", "dx", 1, 10), ("a/y", "dy", 2, 20), ("b/z", "dz", 3, 30)])
+    current = scan_tree([("a/x", 1, 11), ("a/y", 5, 20), ("b/z", 3, 30), ("c/new", 1, 1)])
+    calls = []
+    x = str(tmp_path / "a" / "x")
+    diff = diff_tree(stored, current, str(tmp_path), _hash_many_from({x: "dx"}, calls))
+
+    assert calls == [x]  # touched, same size: read once, content unchanged
+    assert diff.modified == ["a/y"]  # size differs, never read
+    assert diff.added == ["c/new"]
+    assert diff.missing == []
+    assert diff.dirs_skipped == 1  # b
+
+
+def test_a_touched_subtree_is_confirmed_by_its_digest(tmp_path):
+    stored = build_tree([("a/b/x", "dx", 1, 10), ("a/b/y", "dy", 1, 10), ("c/z", "dz", 1, 10)])
+    current = scan_tree([("a/b/x", 1, 99), ("a/b/y", 1, 99), ("c/z", 1, 10)])
+    contents = {str(tmp_path / "a" / "b" / "x"): "dx", str(tmp_path / "a" / "b" / "y"): "dy"}
+    diff = diff_tree(stored, current, str(tmp_path), _hash_many_from(contents, []))
+
+    assert diff.failed == []
+    assert diff.files_hashed == 2
+    assert (diff.dirs_skipped, diff.dirs_confirmed) == (1, 1)  # c skipped, a confirmed as a whole
+
+
+def test_deep_catches_content_changed_under_an_unchanged_fingerprint(tmp_path):
+    entries = [("a/b/x", "dx", 1, 10), ("a/b/y", "dy", 1, 10), ("c/z", "dz", 1, 10)]
+    stats = [(rel_path, size, mtime_ns) for rel_path, _, size, mtime_ns in entries]
+    contents = {str(tmp_path / "a" / "b" / "x"): "dx", str(tmp_path / "a" / "b" / "y"): "rotten",
+                str(tmp_path / "c" / "z"): "dz"}
+
+    shallow = diff_tree(build_tree(entries), scan_tree(stats), str(tmp_path), _hash_many_from(contents, []))
+    assert shallow.failed == [] and shallow.files_hashed == 0
+
+    deep = diff_tree(build_tree(entries), scan_tree(stats), str(tmp_path), _hash_many_from(contents, []), deep=True)
+    assert deep.modified == ["a/b/y"]
+    assert deep.files_hashed == 3
+    assert deep.dirs_confirmed == 1  # c: its digest matches, nothing below it is compared file by file
+
+
+def test_directory_nodes_carry_a_content_digest(tmp_path):
+    path = tmp_path / "p.merkle.json"
+    write_tree(str(path), build_tree([("a/x", "dx", 1, 10)]))
+    root = json.loads(path.read_text())["root"]
+    assert root["dirs"]["a"]["digest"] and root["digest"]
+    assert build_tree([("a/x", "dx", 1, 10)])["digest"] != build_tree([("a/x", "dX", 1, 10)])["digest"]
+
+
+def test_older_versions_still_load(tmp_path):
+    for version in (1, 2):
+        tree = build_tree([("a/x", "dx", 1, 10)])
+        if version == 2:  # written without directory digests
+            del tree["digest"], tree["dirs"]["a"]["digest"]
+        path = tmp_path / f"p{version}.merkle.json"
+        path.write_text(json.dumps({"version": version, "algorithm": "sha256", "root": tree}))
+        loaded, algorithm = load_tree(str(path))
+        assert algorithm == "sha256"
+        assert loaded["digest"] == build_tree([("a/x", "dx", 1, 10)])["digest"]
+        assert diff_tree(loaded, scan_tree([("a/x", 1, 10)]), str(tmp_path), _hash_many_from({}, [])).failed == []
@@ -0,0 +1,61 @@
+import hashlib
+
+from PresetCatalog import PresetCatalog
+from PresetFormat import BINARY_PRESET_EXTENSION, write_binary_preset
+
+PREFIX = "hashes_preset_"
+
+
+def _catalog(tmp_path, errors):
+    return PresetCatalog(str(tmp_path / "cache"), str(tmp_path / "presets"), PREFIX,
+                         on_error=lambda path, e: errors.append(path))
+
+
+def test_corrupt_presets_are_skipped_and_reported(tmp_path):
+    presets = tmp_path / "presets"
+    presets.mkdir()
+    good = hashlib.sha256(b"good").hexdigest()
+    write_binary_preset(str(presets / f"{PREFIX}good{BINARY_PRESET_EXTENSION}"), [good])
+    (presets / f"{PREFIX}not_json.json").write_text("[\"abc")
+    (presets / f"{PREFIX}not_hex.json").write_text("[\"zz\"]")
+    (presets / f"{PREFIX}not_a_list.json").write_text("{\"a\": 1}")
+    (presets / f"{PREFIX}truncated{BINARY_PRESET_EXTENSION}").write_bytes(b"HIT")
+
+    errors = []
+    catalog = _catalog(tmp_path, errors)
+    assert catalog.refresh() == 1
+    assert sorted(path.rsplit("/", 1)[-1] for path in errors) == sorted(
+        f"{PREFIX}{name}" for name in ("not_json.json", "not_hex.json", "not_a_list.json",
+                                       f"truncated{BINARY_PRESET_EXTENSION}"))
+    assert [m["preset"] for m in catalog.match("sha256", {good: 1})] == ["good"]
+    catalog.close()
+
+
+def test_match_only_counts_digests_of_presets_with_the_same_algorithm(tmp_path):
+    presets = tmp_path / "presets"
+    presets.mkdir()
+    digest = hashlib.sha256(b"x").hexdigest()
+    write_binary_preset(str(presets / f"{PREFIX}sha{BINARY_PRESET_EXTENSION}"), [digest], algorithm="sha256")
+    write_binary_preset(str(presets / f"{PREFIX}other{BINARY_PRESET_EXTENSION}"), [digest], algorithm="blake2s")
+
+    catalog = _catalog(tmp_path, [])
+    catalog.refresh()
+    matches = {m["preset"]: m for m in catalog.match("sha256", {digest: 1})}
+    assert set(matches) == {"sha"}
+    assert matches["sha"]["exact_match"]
+    catalog.close()
+
+
+def test_duplicate_digests_in_a_legacy_preset_are_counted_once(tmp_path):
+    presets = tmp_path / "presets"
+    presets.mkdir()
+    x, y = hashlib.sha256(b"x").hexdigest(), hashlib.sha256(b"y").hexdigest()
+    (presets / f"{PREFIX}dup.json").write_text(f'["{x}", "{x}", "{y}"]')
+
+    catalog = _catalog(tmp_path, [])
+    catalog.refresh()
+    [match] = catalog.match("sha256", {x: 2, y: 1})
+    assert (match["preset_digests"], match["preset_digests_found"]) == (2, 2)
+    assert match["preset_coverage"] == 1.0
+    assert match["exact_match"]
+    catalog.close()
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import threading
+
+import pytest
+
+from HashEngine import HashingCancelled
+from Model import Model, VERBOSITY_QUIET
+from PresetCheckpoint import PARTIAL_SUFFIX, PresetCheckpoint
+from PresetFormat import load_preset_file
+
+SETTINGS = {"folder": "/data", "algorithm": "sha256"}
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def test_rows_of_an_earlier_run_are_resumed_while_the_stat_matches(tmp_path):
+    preset_path = str(tmp_path / "p")
+    first = PresetCheckpoint(preset_path, SETTINGS)
+    first.record("a", 1, 10, _digest("a"))
+    first.record("b", 1, 10, _digest("b"))
+    first.record("gone", 1, 10, _digest("gone"))
+    first.close()
+
+    second = PresetCheckpoint(preset_path, SETTINGS)
+    assert second.resumable == 3
+    assert second.resume("a", 1, 10) == (_digest("a"), None)
+    assert second.resume("b", 2, 10) is None  # changed since
+    second.record("b", 2, 10, _digest("b2"))
+    # only what this run saw makes it into the preset
+    assert [entry[0] for entry in second.entries()] == ["a", "b"]
+    assert second.digests()[0] == second.files() == 2
+    second.discard()
+    assert not os.path.exists(preset_path + PARTIAL_SUFFIX)
+
+
+@pytest.mark.parametrize("settings, resume", [({**SETTINGS, "algorithm": "blake2b"}, True), (SETTINGS, False)])
+def test_other_settings_or_no_resume_start_over(tmp_path, settings, resume):
+    preset_path = str(tmp_path / "p")
+    first = PresetCheckpoint(preset_path, SETTINGS)
+    first.record("a", 1, 10, _digest("a"))
+    first.close()
+    second = PresetCheckpoint(preset_path, settings, resume=resume)
+    assert second.resumable == 0 and second.resume("a", 1, 10) is None
+    second.close()
+
+
+def test_create_resumes_after_a_cancel(workdir):
+    folder = workdir / "data"
+    folder.mkdir()
+    for i in range(20):
+        (folder / f"f{i:02}").write_text(str(i))
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET, hash_workers=1)
+    model.cancel_event = threading.Event()
+
+    def progress(done, total, size):
+        if done == 8:
+            model.cancel_event.set()
+    model.progress_fn = progress
+    with pytest.raises(HashingCancelled):
+        model._create_preset("p")
+    assert model._preset_path("p") is None
+
+    model.cancel_event.clear()
+    model.progress_fn = None
+    path = model._create_preset("p")
+    assert 8 <= model.instrumentation.counters["files_resumed"] < 20
+    assert sorted(load_preset_file(path)) == sorted(_digest(str(i)) for i in range(20))
+    assert not os.path.exists(path + PARTIAL_SUFFIX)
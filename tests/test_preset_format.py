@@ -0,0 +1,62 @@
+import hashlib
+
+import pytest
+
+from PresetFormat import (BINARY_PRESET_EXTENSION, BinaryPreset, PresetFormatError, convert_json_preset,
+                          load_preset_file, write_binary_preset, write_sorted_digests)
+
+
+def _digests(n, algorithm="sha256"):
+    return [hashlib.new(algorithm, str(i).encode()).hexdigest() for i in range(n)]
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "blake2b"])
+def test_round_trip(tmp_path, algorithm):
+    path = str(tmp_path / f"p{BINARY_PRESET_EXTENSION}")
+    digests = _digests(50, algorithm)
+    assert write_binary_preset(path, digests + digests[:5], algorithm=algorithm) == 50
+    with BinaryPreset(path) as preset:
+        assert preset.algorithm == algorithm
+        assert len(preset) == 50
+        assert list(preset) == sorted(digests)
+        assert all(digest in preset for digest in digests)
+        assert hashlib.new(algorithm, b"absent").hexdigest() not in preset
+
+
+def test_empty_preset_keeps_the_digest_width(tmp_path):
+    path = str(tmp_path / f"p{BINARY_PRESET_EXTENSION}")
+    write_binary_preset(path, [], algorithm="sha512")
+    with BinaryPreset(path) as preset:
+        assert (len(preset), preset.digest_size) == (0, 64)
+
+
+def test_write_sorted_digests_checks_its_input(tmp_path):
+    path = str(tmp_path / f"p{BINARY_PRESET_EXTENSION}")
+    digests = sorted(bytes.fromhex(h) for h in _digests(3))
+    with pytest.raises(PresetFormatError):
+        write_sorted_digests(path, digests, 4, "sha256", 32)
+    with pytest.raises(PresetFormatError):
+        write_sorted_digests(path, digests + [b"short"], 4, "sha256", 32)
+    assert not (tmp_path / f"p{BINARY_PRESET_EXTENSION}").exists()
+
+
+def test_truncated_and_foreign_files_are_rejected(tmp_path):
+    path = tmp_path / f"p{BINARY_PRESET_EXTENSION}"
+    write_binary_preset(str(path), _digests(10))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(PresetFormatError):
+        BinaryPreset(str(path))
+    path.write_bytes(b"x" * 200)
+    with pytest.raises(PresetFormatError):
+        BinaryPreset(str(path))
+
+
+def test_json_conversion(tmp_path):
+    json_path = tmp_path / "p.json"
+    digests = _digests(5)
+    json_path.write_text(str(digests).replace("'", '"'))
+    binary_path = convert_json_preset(str(json_path), remove_source=True)
+    assert not json_path.exists()
+    preset = load_preset_file(binary_path)
+    assert sorted(preset) == sorted(digests)
+    preset.close()
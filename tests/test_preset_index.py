@@ -0,0 +1,44 @@
+import hashlib
+
+from PresetFormat import BINARY_PRESET_EXTENSION, BinaryPreset, write_binary_preset
+import PresetIndex
+from PresetIndex import HashSetIndex, SortedDigestIndex, build_preset_index
+
+
+def _digests(n):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(n)]
+
+
+def test_binary_preset_brings_its_own_index(tmp_path):
+    path = str(tmp_path / f"p{BINARY_PRESET_EXTENSION}")
+    write_binary_preset(path, _digests(10))
+    with BinaryPreset(path) as preset:
+        assert build_preset_index(preset) is preset.index
+
+
+def test_a_list_of_digests_is_indexed():
+    # lists have an index() method of their own, which must not be mistaken for a preset's index
+    index = build_preset_index(_digests(10))
+    assert isinstance(index, HashSetIndex)
+    assert _digests(1)[0] in index
+
+
+def test_large_presets_get_the_sorted_array(monkeypatch):
+    monkeypatch.setattr(PresetIndex, "SORTED_INDEX_THRESHOLD", 5)
+    digests = _digests(10)
+    small, large = build_preset_index(digests[:5]), build_preset_index(digests)
+    assert isinstance(small, HashSetIndex) and isinstance(large, SortedDigestIndex)
+
+    # both answer the same, whatever the case of the hex digest
+    absent = hashlib.sha256(b"absent").hexdigest()
+    for index in (small, large):
+        assert digests[0].upper() in index
+        assert absent not in index
+    assert len(large) == 10 and all(digest in large for digest in digests)
+    assert "not hex" not in large and digests[0][:10] not in large
+
+
+def test_mixed_width_digests_fall_back_to_a_set(monkeypatch):
+    monkeypatch.setattr(PresetIndex, "SORTED_INDEX_THRESHOLD", 1)
+    index = build_preset_index(_digests(2) + [hashlib.md5(b"x").hexdigest()])
+    assert isinstance(index, HashSetIndex) and len(index) == 3
@@ -0,0 +1,34 @@
+import pytest
+
+from Jobs import JobProgress
+from Model import Model, VERBOSITY_QUIET
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_progress_walks_the_folder_once(workdir, monkeypatch, workers):
+    folder = workdir / "verify"
+    (folder / "sub").mkdir(parents=True)
+    for i in range(30):
+        (folder / ("sub" if i % 2 else "") / f"f{i}").write_text(str(i))
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET, hash_workers=workers)
+    calls = []
+    model.progress_fn = lambda done, total, size: calls.append((done, total))
+    walks = []
+    iter_files = model._iter_files
+    monkeypatch.setattr(model, "_iter_files", lambda **kw: walks.append(kw) or iter_files(**kw))
+
+    for action in (lambda: model._create_preset("p"), lambda: model._verify_streaming("p")):
+        walks.clear()
+        calls.clear()
+        action()
+        assert len(walks) == 1
+        assert [done for done, _ in calls] == list(range(1, 31))
+        assert calls[-1] == (30, 30)
+        assert all(total in (None, 30) for _, total in calls)
+
+
+def test_unknown_total_is_described():
+    progress = JobProgress(files_done=5, files_total=None, bytes_done=0, elapsed_seconds=1.0)
+    assert progress.fraction == 0.0
+    assert progress.describe().startswith("5/? files")
@@ -0,0 +1,80 @@
+import hashlib
+
+import pytest
+
+from Model import Model, VERBOSITY_QUIET
+from PresetFormat import BINARY_PRESET_EXTENSION, PresetFormatError, write_binary_preset
+from QuickCheck import QUICK_KEY_SIZE, SAMPLE_BLOCK_SIZE, load_quick_index, quick_key, write_quick_index
+
+LARGE = 4 * SAMPLE_BLOCK_SIZE
+
+
+def _edit(path, offset):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+def test_keys_follow_size_and_sampled_blocks(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_bytes(b"x" * LARGE)
+    b.write_bytes(b"x" * LARGE)
+    assert quick_key(str(a)) == quick_key(str(b)) == quick_key(str(a), LARGE)
+    assert len(bytes.fromhex(quick_key(str(a)))) == QUICK_KEY_SIZE
+    assert int(quick_key(str(a))[:16], 16) == LARGE
+
+    _edit(b, SAMPLE_BLOCK_SIZE + 10)  # between the head and middle samples: only the full hash sees it
+    assert quick_key(str(b)) == quick_key(str(a))
+    for offset in (0, LARGE // 2, LARGE - 1):
+        b.write_bytes(b"x" * LARGE)
+        _edit(b, offset)
+        assert quick_key(str(b)) != quick_key(str(a))
+
+
+def test_small_files_are_read_whole(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_bytes(b"x" * 3 * SAMPLE_BLOCK_SIZE)
+    b.write_bytes(b"x" * 3 * SAMPLE_BLOCK_SIZE)
+    _edit(b, SAMPLE_BLOCK_SIZE + 10)
+    assert quick_key(str(b)) != quick_key(str(a))
+
+
+def test_index_round_trip(tmp_path):
+    (tmp_path / "f").write_text("f")
+    key = quick_key(str(tmp_path / "f"))
+    path = str(tmp_path / "p.quick")
+    assert write_quick_index(path, [key, key]) == 1
+    index = load_quick_index(path)
+    assert key in index and len(index) == 1
+    index.close()
+    assert load_quick_index(str(tmp_path / "absent")) is None
+
+    preset = str(tmp_path / f"p{BINARY_PRESET_EXTENSION}")
+    write_binary_preset(preset, [hashlib.sha256(b"f").hexdigest()])
+    with pytest.raises(PresetFormatError):
+        load_quick_index(preset)
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_tiered_verify(workdir, strict):
+    folder = workdir / "data"
+    folder.mkdir()
+    for name in ("same", "sampled", "unsampled"):
+        (folder / name).write_bytes(b"y" * LARGE)
+    (folder / "other").write_text("other")
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET)
+    model._create_preset("p", quick=True)
+    assert not model._verify_tiered("p", strict=strict).failed_files
+
+    (folder / "other").write_text("other, changed")
+    _edit(folder / "sampled", 0)
+    _edit(folder / "unsampled", SAMPLE_BLOCK_SIZE + 10)
+    result = model._verify_tiered("p", strict=strict)
+    failed = dict(result.failed_files)
+    assert sorted(result.verified_files) == ["same"]
+    assert sorted(failed) == ["other", "sampled", "unsampled"]
+    assert failed["unsampled"] == hashlib.sha256((folder / "unsampled").read_bytes()).hexdigest()
+    # rejected by the quick tier: only strict mode reads them in full
+    assert bool(failed["sampled"]) == bool(failed["other"]) == strict
+    assert model._verify_tiered("absent") is None
@@ -0,0 +1,74 @@
+import math
+import os
+
+import pytest
+
+from Model import Model, VERBOSITY_QUIET
+from SpotCheck import (SpotCheckState, corruption_upper_bound, load_state, sample_size, save_state,
+                       select_sample)
+
+
+class _Entry:
+    def __init__(self, rel_path):
+        self.rel_path = rel_path
+
+
+def test_sample_size_detects_the_tolerated_rate():
+    n = sample_size(10_000, confidence=0.95, tolerated_rate=0.01)
+    corrupt = 100
+    # chance that a sample of n misses all corrupt files (without replacement) is at most 1 - confidence
+    miss = math.prod((10_000 - corrupt - i) / (10_000 - i) for i in range(n))
+    assert miss <= 0.05
+    assert sample_size(10, 0.95, 0.01) == 10
+    assert sample_size(0) == 0
+
+
+def test_upper_bound():
+    assert corruption_upper_bound(0, 300, 0.95) == pytest.approx(1 - 0.05 ** (1 / 300))
+    # one-sided Clopper-Pearson for 3 failures in 300 at 95%
+    assert corruption_upper_bound(3, 300, 0.95) == pytest.approx(0.02564, abs=1e-4)
+    assert corruption_upper_bound(5, 5, 0.95) == 1.0
+
+
+def test_uniform_rotation_covers_every_file_once_per_cycle():
+    files = [_Entry(f"f{i}") for i in range(2000)]
+    state = SpotCheckState(seed=3)
+    runs = math.ceil(2000 / 279)
+    seen = []
+    for _ in range(runs):
+        seen += [entry.rel_path for entry in select_sample(iter(files), 279, state)]
+    assert set(seen) == {entry.rel_path for entry in files}
+    assert len(seen) - len(set(seen)) < 279  # only the last run may wrap into the next cycle
+    assert state.cycle == 1 and state.runs == runs
+
+
+def test_same_seed_same_sample(tmp_path):
+    files = [_Entry(f"f{i}") for i in range(500)]
+    first = select_sample(iter(files), 50, SpotCheckState(seed=11))
+    second = select_sample(iter(files), 50, SpotCheckState(seed=11))
+    assert [e.rel_path for e in first] == [e.rel_path for e in second]
+
+    path = str(tmp_path / "state.json")
+    state = SpotCheckState(seed=11)
+    select_sample(iter(files), 50, state)
+    save_state(path, state)
+    assert load_state(path) == state
+    assert load_state(path, seed=12).offset == 0.0  # another seed starts its own rotation
+
+
+def test_verify_sample_checks_every_sampled_file_with_hardlinks(workdir):
+    folder = workdir / "verify"
+    folder.mkdir()
+    for i in range(12):
+        (folder / f"file{i:02}").write_text(f"content {i}")
+    os.link(folder / "file03", folder / "aa_link")  # sorts before its original
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET)
+    model._create_preset("p")
+
+    for _ in range(3):
+        result = model._verify_sample("p", confidence=0.99, tolerated_rate=0.5)
+        assert result.files_checked == sample_size(13, 0.99, 0.5)
+        assert not result.failed_files
+    assert os.path.isfile(model._spot_check_state_path("p"))
+    assert not [name for name in os.listdir(workdir / "metadata") if name.endswith(".json")]
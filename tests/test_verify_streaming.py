@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import Cli
+import Model as model_module
+from Model import Model, VERBOSITY_QUIET
+
+
+def test_metadata_counts_every_failure_not_only_the_kept_ones(workdir, monkeypatch):
+    folder = workdir / "verify"
+    folder.mkdir()
+    for i in range(5):
+        (folder / f"f{i}").write_text(f"original {i}")
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET)
+    model._create_preset("p")
+    for i in range(5):
+        (folder / f"f{i}").write_text(f"changed {i}")
+
+    monkeypatch.setattr(model_module, "MAX_FAILURES_KEPT", 2)
+    result = model._verify_streaming("p")
+    assert (result.files_failed, len(result.failed_files)) == (5, 2)
+    journal = workdir / "metadata" / f"{model_module.METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX}p.jsonl"
+    event = json.loads(journal.read_text().splitlines()[-1])
+    assert event["hashes_that_failed_verification"] == 5
+
+
+@pytest.mark.parametrize("mode", ["--merkle", "--manifest", "--sample", "--tiered", "--strict"])
+@pytest.mark.parametrize("stop", [["--fail-fast"], ["--max-failures", "3"]])
+def test_early_stop_is_a_usage_error_outside_streaming_verify(workdir, mode, stop):
+    with pytest.raises(SystemExit) as exit_info:
+        Cli.main(["verify", "p", "--folder", str(workdir), mode, *stop])
+    assert exit_info.value.code == 2
+
+
+def test_ms_fields_are_milliseconds(workdir):
+    folder = workdir / "verify"
+    folder.mkdir()
+    for i in range(20):
+        (folder / f"f{i}").write_bytes(bytes(64 * 1024))
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET)
+    model._create_preset("p")
+    model._verify_streaming("p")
+
+    def last_event(prefix):
+        return json.loads((workdir / "metadata" / f"{prefix}p.jsonl").read_text().splitlines()[-1])
+
+    # each total includes its hashing span, which the instrumentation reports in ms
+    created = last_event(model_module.METADATA_FOR_HASHES_PREFIX)
+    assert float(created["duration_ms"]) >= created["instrumentation"]["spans_ms"]["hashing_wall"]
+    verified = last_event(model_module.METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX)
+    assert float(verified["comparison_duration_ms"]) >= float(verified["hashing_duration_ms"]) > 0
+
+
+def test_io_devices_only_describe_a_scheduled_run(workdir):
+    folder = workdir / "verify"
+    folder.mkdir()
+    for i in range(4):
+        (folder / f"f{i}").write_text(str(i))
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET, hash_workers=4)
+    model._create_preset("p")
+    journal = workdir / "metadata" / f"{model_module.METADATA_FOR_HASH_COMPARISON_WITH_PRESET_PREFIX}p.jsonl"
+
+    model._verify_streaming("p")
+    assert sum(lane["files"] for lane in json.loads(journal.read_text().splitlines()[-1])["io_devices"]) == 4
+    model.engine.io_scheduler = "off"
+    model._verify_streaming("p")
+    assert "io_devices" not in json.loads(journal.read_text().splitlines()[-1])
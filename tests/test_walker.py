@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from Walker import IGNORE_FILENAME, WalkError, Walker
+
+
+def _paths(walker):
+    return [entry.rel_path.replace("\\", "/") for entry in walker]
+
+
+def test_unreadable_ignore_file_keeps_the_parents_rules(tmp_path):
+    (tmp_path / IGNORE_FILENAME).write_text("*.log\n")
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / IGNORE_FILENAME).mkdir()  # opening it fails with an OSError other than FileNotFoundError
+    (sub / "keep.txt").write_text("keep")
+    (sub / "drop.log").write_text("drop")
+    skipped = []
+
+    paths = _paths(Walker(str(tmp_path), on_skip=lambda path, reason: skipped.append((path, reason))))
+    assert paths == ["sub/keep.txt"]
+    assert [(path, reason.split(":")[0]) for path, reason in skipped] == [(str(sub / IGNORE_FILENAME), "unreadable")]
+
+
+def _tree(root, files):
+    for rel_path in files:
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel_path)
+
+
+def test_ignore_rules(tmp_path):
+    _tree(tmp_path, ["a.log", "keep.log", "notes.txt", "build/out.bin", "src/build", "src/x.tmp",
+                     "src/deep/x.tmp", "src/deep/y.txt", "docs/x.tmp"])
+    (tmp_path / IGNORE_FILENAME).write_text("# comment\n*.log\n!keep.log\nbuild/\n")
+    (tmp_path / "src" / IGNORE_FILENAME).write_text("/x.tmp\n")  # anchored to src/, not to src/deep/
+
+    assert _paths(Walker(str(tmp_path))) == ["keep.log", "notes.txt", "docs/x.tmp", "src/build",
+                                             "src/deep/x.tmp", "src/deep/y.txt"]
+    # without an ignore filename the rules files are data like any other
+    assert _paths(Walker(str(tmp_path), exclude=["*.txt"], ignore_filename=None)) == [
+        IGNORE_FILENAME, "a.log", "keep.log", "build/out.bin", "docs/x.tmp", f"src/{IGNORE_FILENAME}",
+        "src/build", "src/x.tmp", "src/deep/x.tmp"]
+    assert _paths(Walker(str(tmp_path), include=["*.tmp"])) == ["docs/x.tmp", "src/deep/x.tmp"]
+
+
+def test_walk_and_entry_for_agree(tmp_path):
+    _tree(tmp_path, ["a.log", "notes.txt", "sub/b.txt"])
+    (tmp_path / IGNORE_FILENAME).write_text("*.log\n")
+    walker = Walker(str(tmp_path))
+    assert _paths(walker.walk("sub")) == ["sub/b.txt"]
+    assert walker.entry_for("notes.txt") is not None
+    assert walker.entry_for("a.log") is None
+    assert walker.entry_for(IGNORE_FILENAME) is None
+
+
+def test_symlink_policies(tmp_path):
+    _tree(tmp_path, ["real/f.txt", "target.txt"])
+    os.symlink(tmp_path / "target.txt", tmp_path / "link.txt")
+    os.symlink(tmp_path / "real", tmp_path / "linked_dir")
+    os.symlink(tmp_path, tmp_path / "real" / "loop")
+    os.symlink(tmp_path / "gone", tmp_path / "broken")
+
+    def walk(symlinks):
+        skipped = []
+        paths = _paths(Walker(str(tmp_path), symlinks=symlinks,
+                              on_skip=lambda path, reason: skipped.append((os.path.basename(path), reason))))
+        return paths, sorted(skipped)
+
+    assert walk("files") == (["link.txt", "target.txt", "real/f.txt"],
+                             [("broken", "broken symlink"), ("linked_dir", "symlink to a folder"),
+                              ("loop", "symlink to a folder")])
+    assert walk("skip") == (["target.txt", "real/f.txt"],
+                            [("broken", "symlink"), ("link.txt", "symlink"), ("linked_dir", "symlink"),
+                             ("loop", "symlink")])
+    # each real folder once, under whichever path reaches it first
+    assert walk("follow") == (["link.txt", "target.txt", "linked_dir/f.txt"],
+                              [("broken", "broken symlink"), ("loop", "folder already walked (symlink loop)"),
+                               ("real", "folder already walked (symlink loop)")])
+
+
+def test_hardlink_policies(tmp_path):
+    _tree(tmp_path, ["a.txt"])
+    os.link(tmp_path / "a.txt", tmp_path / "b.txt")
+    once = list(Walker(str(tmp_path)))
+    assert [(entry.rel_path, entry.link_of) for entry in once] == [("a.txt", None), ("b.txt", once[0].path)]
+    assert [entry.link_of for entry in Walker(str(tmp_path), hardlinks="all")] == [None, None]
+
+
+def test_special_file_policies(tmp_path):
+    _tree(tmp_path, ["a.txt"])
+    os.mkfifo(tmp_path / "pipe")
+    skipped = []
+    assert _paths(Walker(str(tmp_path), on_skip=lambda path, reason: skipped.append(reason))) == ["a.txt"]
+    assert skipped == ["special file"]
+    with pytest.raises(WalkError):
+        list(Walker(str(tmp_path), special_files="error"))
+    with pytest.raises(ValueError):
+        Walker(str(tmp_path), symlinks="sometimes")
@@ -0,0 +1,25 @@
+import hashlib
+import os
+
+from Model import Model, VERBOSITY_QUIET
+from Watch import Changes
+
+
+def test_edit_next_to_a_hardlink_records_the_right_digests(workdir):
+    folder = workdir / "verify"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "sub" / "m_original").write_text("original")
+    (folder / "sub" / "z_plain").write_text("plain")
+    os.link(folder / "sub" / "m_original", folder / "sub" / "a_link")  # sorts before its original
+    model = Model(verification_folder=str(folder), log_fn=lambda msg: None, cache_mode="off",
+                  verbosity=VERBOSITY_QUIET)
+    model._create_preset("p")
+    watch = model._watch("p", backend="poll")
+
+    (folder / "sub" / "z_plain").write_text("edited")
+    watch.apply(Changes(files={"sub/a_link", "sub/z_plain"}, dirs={"sub"}))
+
+    expected = {name: hashlib.sha256((folder / "sub" / name).read_bytes()).hexdigest()
+                for name in ("a_link", "m_original", "z_plain")}
+    assert {path: watch.digests[f"sub/{path}"] for path in expected} == expected
+    assert set(watch.drifted) == {"sub/z_plain"}